@@ -0,0 +1,359 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from .config import settings
+from .play_history_store import DOCUMENTS, BUCKETS, bucket_day
+
+# Every synthetic user logs in with this password (hashed once per run)
+SYNTHETIC_PASSWORD = "synthetic-password"
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.example.com"
+
+
+@dataclass
+class ActivityProfile:
+    """Shape of the generated activity"""
+    plays_per_user: float = 200.0       # mean; per-user counts are lognormal
+    activity_sigma: float = 1.2         # spread of per-user activity (heavy users)
+    genre_concentration: float = 0.3    # Dirichlet alpha: lower = narrower taste
+    popularity_exponent: float = 1.0    # Zipf exponent of track popularity within a genre
+    session_length: float = 12.0        # mean plays per session
+    session_gap_s: float = 8.0          # silence between consecutive plays in a session
+    skip_rate: float = 0.25
+    like_rate: float = 0.06             # per completed play (likes are unique per track)
+    days: int = 60                      # histories span roughly this window
+
+
+def _python_datetimes(values: pd.DatetimeIndex) -> np.ndarray:
+    """datetime objects (what BSON encodes), as an object array"""
+    return np.array(values.to_pydatetime(), dtype=object)
+
+
+def _event_ids(rng: np.random.Generator, count: int) -> List[str]:
+    """32-hex-digit ids shaped like the journal's uuid4().hex, drawn from the batch RNG (reruns reproduce them)"""
+    raw = rng.bytes(16 * count).hex()
+    return [raw[i:i + 32] for i in range(0, 32 * count, 32)]
+
+
+def _records(**columns: List) -> List[Dict]:
+    """Column lists -> row dicts"""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+class TrackPool:
+    """Track ids, durations and per-genre Zipf popularity for sampling"""
+
+    def __init__(self, tracks: pd.DataFrame, exponent: float, seed: int):
+        rng = np.random.default_rng([seed, 1])
+        tracks = tracks.reset_index(drop=True)
+        self.track_ids = tracks["track_id"].to_numpy(dtype=object)
+        self.durations = pd.to_numeric(tracks["duration"], errors="coerce").fillna(210.0).clip(30, 900).to_numpy()
+
+        genres = tracks["genre"].fillna("Unknown")
+        self.genres = sorted(genres.unique())
+        self.members = []
+        self.cdfs = []
+        for genre in self.genres:
+            # Popularity rank is random within the genre, weight 1/rank^s
+            members = rng.permutation(np.flatnonzero((genres == genre).to_numpy()))
+            weights = 1.0 / np.arange(1, len(members) + 1) ** exponent
+            self.members.append(members)
+            self.cdfs.append(np.cumsum(weights) / weights.sum())
+
+    def sample(self, rng: np.random.Generator, genre_idx: np.ndarray) -> np.ndarray:
+        """One track index per entry of genre_idx"""
+        picks = np.empty(len(genre_idx), dtype=np.int64)
+        draws = rng.random(len(genre_idx))
+        for g in range(len(self.genres)):
+            mask = genre_idx == g
+            local = np.searchsorted(self.cdfs[g], draws[mask], side="right")
+            picks[mask] = self.members[g][np.minimum(local, len(self.members[g]) - 1)]
+        return picks
+
+
+class ActivityGenerator:
+    """
+    Synthetic plays, likes and skips written straight to MongoDB
+    Users are generated in batches from (seed, batch index), so a seed
+    always yields the same users (use a new seed to add more); each batch is
+    built with NumPy in a worker thread and written with insert_many, with
+    up to `concurrency` batches in flight. Works against any motor-compatible
+    database (a local mongod, or an in-process stand-in)
+    """
+
+    def __init__(
+        self,
+        tracks: pd.DataFrame,
+        profile: Optional[ActivityProfile] = None,
+        seed: int = 0,
+        storage: str = DOCUMENTS,
+        now: Optional[datetime] = None
+    ):
+        self.profile = profile or ActivityProfile()
+        self.seed = seed
+        self.storage = storage
+        self.now = now or datetime.utcnow()
+        self.pool = TrackPool(tracks, self.profile.popularity_exponent, seed)
+        self.hashed_password = None
+        self.stats = {"users": 0, "plays": 0, "likes": 0, "skips": 0}
+
+    def user_id(self, n: int) -> str:
+        return f"synth-{self.seed}-{n:07d}"
+
+    def generate_batch(self, index: int, first_user: int, count: int) -> Dict[str, List[Dict]]:
+        """Documents per collection for users [first_user, first_user + count)"""
+
+        p = self.profile
+        rng = np.random.default_rng([self.seed, 2, index])
+        genre_count = len(self.pool.genres)
+
+        # Heavy-tailed activity: lognormal with the requested mean
+        mu = np.log(p.plays_per_user) - p.activity_sigma ** 2 / 2
+        plays_per_user = np.maximum(1, rng.lognormal(mu, p.activity_sigma, size=count).round().astype(np.int64))
+        user_of_play = np.repeat(np.arange(count), plays_per_user)
+        total = len(user_of_play)
+
+        # Genre per play from the user's Dirichlet taste, track by popularity
+        affinity = np.cumsum(rng.dirichlet(np.full(genre_count, p.genre_concentration), size=count), axis=1)
+        genre_idx = (rng.random(total)[:, None] > affinity[user_of_play]).sum(axis=1)
+        genre_idx = np.minimum(genre_idx, genre_count - 1)
+        track_idx = self.pool.sample(rng, genre_idx)
+        durations = self.pool.durations[track_idx]
+
+        skipped = rng.random(total) < p.skip_rate
+        listened = np.where(skipped, rng.uniform(0.02, 0.5, size=total) * durations, durations)
+
+        # Timing: back-to-back plays within a session; sessions spread
+        # over the window so each history spans about `days`
+        sessions = np.maximum(1, plays_per_user / p.session_length)
+        session_gap_mean = p.days * 86400 / sessions
+        new_session = rng.random(total) < 1.0 / p.session_length
+        gaps = np.where(
+            new_session,
+            rng.exponential(session_gap_mean[user_of_play]),
+            listened + p.session_gap_s
+        )
+        # Squeeze inter-session gaps of users whose history would overrun the window
+        window = p.days * 86400.0
+        session_time = np.bincount(user_of_play, weights=np.where(new_session, gaps, 0.0), minlength=count)
+        span = np.bincount(user_of_play, weights=gaps, minlength=count)
+        squeeze = np.clip((window - (span - session_time)) / np.maximum(session_time, 1e-9), 0.0, 1.0)
+        squeeze = np.where(span > window, squeeze, 1.0)
+        gaps = np.where(new_session, gaps * squeeze[user_of_play], gaps)
+
+        elapsed = np.cumsum(gaps)
+        user_start = np.concatenate([[0], np.cumsum(plays_per_user)[:-1]])
+        user_end = elapsed[user_start + plays_per_user - 1]
+        # Last play of each user lands somewhere in the last two days
+        recency = rng.uniform(0, 2 * 86400, size=count)
+        seconds_ago = (user_end[user_of_play] - elapsed) + recency[user_of_play]
+        now = pd.Timestamp(self.now)
+        played_at = (now - pd.to_timedelta(seconds_ago, unit="s")).floor("ms")
+        ended_at = (played_at + pd.to_timedelta(listened, unit="s")).floor("ms")
+
+        user_ids = [self.user_id(n) for n in range(first_user, first_user + count)]
+        play_users = np.array(user_ids, dtype=object)[user_of_play]
+        play_tracks = self.pool.track_ids[track_idx]
+        ended_at = _python_datetimes(ended_at)
+        listened = listened.round(1)
+
+        plays = _records(
+            user_id=play_users.tolist(),
+            track_id=play_tracks.tolist(),
+            played_at=_python_datetimes(played_at).tolist(),
+            duration_played=listened.tolist(),
+            completed=(~skipped).tolist(),
+            event_id=_event_ids(rng, total),
+        )
+
+        skips = _records(
+            user_id=play_users[skipped].tolist(),
+            track_id=play_tracks[skipped].tolist(),
+            skipped_at=ended_at[skipped].tolist(),
+            position=listened[skipped].tolist(),
+            event_id=_event_ids(rng, int(skipped.sum())),
+        )
+
+        # Likes are unique per (user, track): keep the first
+        like = np.flatnonzero(~skipped & (rng.random(total) < p.like_rate))
+        _, first = np.unique(user_of_play[like] * len(self.pool.track_ids) + track_idx[like], return_index=True)
+        like = like[np.sort(first)]
+        likes = _records(
+            user_id=play_users[like].tolist(),
+            track_id=play_tracks[like].tolist(),
+            liked_at=ended_at[like].tolist(),
+        )
+
+        created_at = self.now - timedelta(days=p.days + 1)
+        documents = {
+            "users": [
+                {
+                    "user_id": user_id,
+                    "email": f"{user_id}@{SYNTHETIC_EMAIL_DOMAIN}",
+                    "username": user_id,
+                    "hashed_password": self.hashed_password,
+                    "created_at": created_at,
+                    "synthetic": True
+                }
+                for user_id in user_ids
+            ],
+            "likes": likes,
+            "skips": skips,
+        }
+
+        if self.storage == BUCKETS:
+            documents["play_buckets"] = self._buckets(plays)
+        else:
+            documents["play_history"] = plays
+
+        return documents
+
+    @staticmethod
+    def _buckets(plays: List[Dict]) -> List[Dict]:
+        """One play_buckets document per user-day (plays are already in time order per user)"""
+        buckets: Dict = {}
+        for play in plays:
+            key = (play["user_id"], bucket_day(play["played_at"]))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    "user_id": key[0], "day": key[1], "count": 0,
+                    "track_ids": [], "played_at": [], "duration_played": [], "completed": [], "event_ids": []
+                }
+            bucket["track_ids"].append(play["track_id"])
+            bucket["played_at"].append(play["played_at"])
+            bucket["duration_played"].append(play["duration_played"])
+            bucket["completed"].append(play["completed"])
+            bucket["event_ids"].append(play["event_id"])
+            bucket["count"] += 1
+        return list(buckets.values())
+
+    async def _write(self, db: AsyncIOMotorDatabase, documents: Dict[str, List[Dict]], write_size: int):
+        for collection, docs in documents.items():
+            for start in range(0, len(docs), write_size):
+                await db[collection].insert_many(docs[start:start + write_size], ordered=False)
+
+        plays = documents.get("play_history") or documents.get("play_buckets", [])
+        self.stats["users"] += len(documents["users"])
+        self.stats["plays"] += sum(doc.get("count", 1) for doc in plays)
+        self.stats["likes"] += len(documents["likes"])
+        self.stats["skips"] += len(documents["skips"])
+
+    async def run(
+        self,
+        db: AsyncIOMotorDatabase,
+        users: int,
+        batch_users: int = 500,
+        concurrency: int = 4,
+        write_size: int = 5000
+    ) -> Dict[str, int]:
+        """Generate and write `users` users' activity; returns counts written"""
+
+        from .auth import pwd_context
+        self.hashed_password = pwd_context.hash(SYNTHETIC_PASSWORD)
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        batches = (users + batch_users - 1) // batch_users
+
+        async def batch(index: int):
+            async with semaphore:
+                first = index * batch_users
+                documents = await loop.run_in_executor(
+                    None, self.generate_batch, index, first, min(batch_users, users - first)
+                )
+                await self._write(db, documents, write_size)
+                elapsed = time.perf_counter() - started
+                events = self.stats["plays"] + self.stats["likes"] + self.stats["skips"]
+                print(f"  ✅ {self.stats['users']}/{users} users, {events} events, {events / elapsed:.0f} events/s")
+
+        await asyncio.gather(*(batch(index) for index in range(batches)))
+        return dict(self.stats)
+
+
+async def load_track_pool(source: Optional[str]) -> pd.DataFrame:
+    """(track_id, genre, duration) from a Parquet catalog, or from Postgres"""
+
+    columns = ["track_id", "genre", "duration"]
+    if source:
+        return pd.read_parquet(Path(source), columns=columns)
+
+    import asyncpg
+    conn = await asyncpg.connect(settings.POSTGRES_URL)
+    try:
+        rows = await conn.fetch("SELECT track_id, genre, duration FROM tracks")
+    finally:
+        await conn.close()
+    return pd.DataFrame([dict(row) for row in rows], columns=columns)
+
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic user activity into MongoDB")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--plays-per-user", type=float, default=ActivityProfile.plays_per_user)
+    parser.add_argument("--days", type=int, default=ActivityProfile.days)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracks", default=None, help="Parquet catalog to sample from (default: PostgreSQL tracks)")
+    parser.add_argument("--storage", choices=[DOCUMENTS, BUCKETS], default=settings.PLAY_HISTORY_STORAGE)
+    parser.add_argument("--batch-users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--in-memory", action="store_true", help="Use an in-process mongomock stand-in (dry run)")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("👥 SYNTHETIC ACTIVITY GENERATOR")
+    print("="*50)
+
+    tracks = await load_track_pool(args.tracks)
+    if tracks.empty:
+        print("❌ No tracks to sample from; load a catalog first")
+        return
+
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            print("❌ --in-memory needs mongomock-motor (pip install mongomock-motor)")
+            return
+        client = AsyncMongoMockClient()
+    else:
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+
+    profile = ActivityProfile(plays_per_user=args.plays_per_user, days=args.days)
+    generator = ActivityGenerator(tracks, profile, seed=args.seed, storage=args.storage)
+    print(f"🎵 Sampling from {len(tracks)} tracks in {len(generator.pool.genres)} genres")
+    print(f"👥 Generating ~{int(args.users * args.plays_per_user)} plays for {args.users} users (seed {args.seed})...\n")
+
+    started = time.perf_counter()
+    try:
+        stats = await generator.run(
+            client.music_recommender,
+            args.users,
+            batch_users=args.batch_users,
+            concurrency=args.concurrency
+        )
+    finally:
+        client.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n" + "="*50)
+    print(f"✅ Generated in {elapsed:.1f}s: {stats}")
+    print(f"🔑 Synthetic users log in as <user_id>@{SYNTHETIC_EMAIL_DOMAIN} / {SYNTHETIC_PASSWORD}")
+    # Histories reach back `days` plus up to two days of recency
+    history_days = args.days + 2
+    print("💡 Refresh analytics over the new history:")
+    print(f"   python -m app.rollups --rebuild-days {history_days}")
+    print(f"   python -m app.sketches --days {min(history_days, 30)}")
+    print("="*50)
+
+if __name__ == "__main__":
+    asyncio.run(main())
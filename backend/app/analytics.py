@@ -1,33 +1,113 @@
 from datetime import datetime, timedelta
 from typing import Dict, List
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from .play_history_store import get_play_history_store
+from .catalog import get_catalog
+from .sketches import get_activity_sketches
+from .rollups import get_rollup_compactor
+from .event_buffer import ALGORITHM_COUNTERS
+
+# Per-track play counts returned by the user stats $facet: the whole
+# result is one document (16 MB cap), so only the most played tracks
+# come back; top genres are computed over these
+USER_STATS_TRACK_LIMIT = 1000
 
 class AnalyticsEngine:
     """Track and analyze user behavior and system performance"""
     
+    def _user_activity_pipeline(self, user_id: str, week_ago: datetime) -> List[Dict]:
+        """
+        One pipeline over a user's plays, likes and skips
+        Plays come from the play history store; likes and skips are
+        folded in with $unionWith, then $facet computes every statistic
+        The per-track branch is capped at USER_STATS_TRACK_LIMIT tracks; the
+        number of distinct tracks is counted separately
+        """
+
+        play_store = get_play_history_store()
+
+        def union(collection: str, kind: str) -> Dict:
+            return {"$unionWith": {"coll": collection, "pipeline": [
+                {"$match": {"user_id": user_id}},
+                {"$project": {"_id": 0, "kind": {"$literal": kind}}}
+            ]}}
+
+        return play_store.play_stages(user_id=user_id) + [
+            {"$project": {
+                "_id": 0,
+                "kind": {"$literal": "play"},
+                "track_id": 1,
+                "played_at": 1,
+                "duration_played": 1
+            }},
+            union("likes", "like"),
+            union("skips", "skip"),
+            {"$facet": {
+                "totals": [
+                    {"$group": {"_id": "$kind", "count": {"$sum": 1}}}
+                ],
+                "plays": [
+                    {"$match": {"kind": "play"}},
+                    {"$group": {
+                        "_id": None,
+                        "recent": {"$sum": {"$cond": [{"$gte": ["$played_at", week_ago]}, 1, 0]}},
+                        "seconds": {"$sum": {"$ifNull": ["$duration_played", 0]}}
+                    }}
+                ],
+                "tracks": [
+                    {"$match": {"kind": "play"}},
+                    {"$group": {"_id": "$track_id", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": USER_STATS_TRACK_LIMIT}
+                ],
+                "distinct_tracks": [
+                    {"$match": {"kind": "play"}},
+                    {"$group": {"_id": "$track_id"}},
+                    {"$count": "tracks"}
+                ]
+            }}
+        ]
+
     async def get_user_stats(self, user_id: str, db: AsyncIOMotorDatabase) -> Dict:
         """Get comprehensive user statistics"""
         
-        # Count activities
-        total_plays = await db.play_history.count_documents({"user_id": user_id})
-        total_likes = await db.likes.count_documents({"user_id": user_id})
-        total_skips = await db.skips.count_documents({"user_id": user_id})
+        play_store = get_play_history_store()
+        catalog = get_catalog()
         
-        # Get recent activity (last 7 days)
+        # Single scan over the user's history
         week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_plays = await db.play_history.count_documents({
-            "user_id": user_id,
-            "played_at": {"$gte": week_ago}
-        })
-        
-        # Get top genres
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            {"$group": {"_id": "$track_id", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
+        pipeline = self._user_activity_pipeline(user_id, week_ago)
+        result = await play_store.collection(db).aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {"totals": [], "plays": [], "tracks": [], "distinct_tracks": []}
+        
+        totals = {row["_id"]: row["count"] for row in facets["totals"]}
+        total_plays = totals.get("play", 0)
+        total_likes = totals.get("like", 0)
+        total_skips = totals.get("skip", 0)
+        
+        play_summary = facets["plays"][0] if facets["plays"] else {}
+        recent_plays = play_summary.get("recent", 0)
+        distinct_tracks = facets["distinct_tracks"][0]["tracks"] if facets["distinct_tracks"] else 0
+        
+        # Track ids -> titles and genres from the in-memory catalog
+        top_tracks = []
+        genre_counts = {}
+        for row in facets["tracks"]:
+            track = catalog.get_track(row["_id"])
+            if len(top_tracks) < 10:
+                top_tracks.append({
+                    "track_id": row["_id"],
+                    "title": track.get("title") if track else None,
+                    "artist": track.get("artist") if track else None,
+                    "play_count": row["count"]
+                })
+            if track and track.get("genre"):
+                genre_counts[track["genre"]] = genre_counts.get(track["genre"], 0) + row["count"]
+        
+        top_genres = [
+            {"genre": genre, "play_count": count}
+            for genre, count in sorted(genre_counts.items(), key=lambda g: -g[1])[:10]
         ]
-        top_tracks = await db.play_history.aggregate(pipeline).to_list(length=10)
         
         # Calculate engagement score
         if total_plays > 0:
@@ -43,94 +123,134 @@ class AnalyticsEngine:
             "total_likes": total_likes,
             "total_skips": total_skips,
             "recent_plays_7d": recent_plays,
+            "listening_seconds": round(play_summary.get("seconds", 0), 1),
+            "distinct_tracks": distinct_tracks,
             "engagement_score": round(engagement_score, 2),
             "like_rate": round(like_rate * 100, 2) if total_plays > 0 else 0,
             "skip_rate": round(skip_rate * 100, 2) if total_plays > 0 else 0,
-            "top_tracks_count": len(top_tracks)
+            "top_tracks": top_tracks,
+            "top_tracks_count": len(top_tracks),
+            "top_genres": top_genres
         }
     
     async def get_system_stats(self, db: AsyncIOMotorDatabase) -> Dict:
         """Get overall system statistics"""
         
-        total_users = await db.users.count_documents({})
-        total_plays = await db.play_history.count_documents({})
-        total_likes = await db.likes.count_documents({})
+        play_store = get_play_history_store()
+        sketches = get_activity_sketches()
+        rollups = get_rollup_compactor()
         
-        # Active users (played in last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_users = len(await db.play_history.distinct(
-            "user_id",
-            {"played_at": {"$gte": week_ago}}
-        ))
+        # Totals from the daily/hourly rollups (up to their watermark, so
+        # no scan of the raw events); exact counts only before the first
+        # compaction has run
+        total_users = await db.users.estimated_document_count()
+        all_time = await rollups.window(db)
+        if all_time is not None:
+            total_plays = all_time["plays"]
+            total_likes = all_time["likes"]
+        else:
+            total_plays = await play_store.count_all(db)
+            total_likes = await db.likes.count_documents({})
         
-        # Most popular tracks (last 30 days)
+        week_ago = datetime.utcnow() - timedelta(days=7)
         month_ago = datetime.utcnow() - timedelta(days=30)
-        pipeline = [
-            {"$match": {"played_at": {"$gte": month_ago}}},
-            {"$group": {"_id": "$track_id", "play_count": {"$sum": 1}}},
-            {"$sort": {"play_count": -1}},
-            {"$limit": 10}
-        ]
-        popular_tracks = await db.play_history.aggregate(pipeline).to_list(length=10)
+        
+        # Active users (played in last 7 days) and most popular tracks
+        # (last 30 days) from merged daily sketches: cost is independent
+        # of traffic. Exact queries only before any sketch exists
+        week = await sketches.window(db, since=week_ago)
+        month = await sketches.window(db, since=month_ago)
+        
+        if week is not None:
+            active_users = week.users.count()
+        else:
+            active_users = len(await play_store.active_user_ids(db, since=week_ago))
+        
+        if month is not None:
+            popular_tracks = sketches.top_tracks(month, n=10)
+        else:
+            pipeline = play_store.play_stages(since=month_ago) + [
+                {"$group": {"_id": "$track_id", "play_count": {"$sum": 1}}},
+                {"$sort": {"play_count": -1}},
+                {"$limit": 10}
+            ]
+            rows = await play_store.collection(db).aggregate(pipeline).to_list(length=10)
+            popular_tracks = [{"track_id": row["_id"], "play_count": row["play_count"]} for row in rows]
+        
+        # 30-day activity from the daily/hourly rollups
+        rollup = await rollups.window(db, since=month_ago)
+        if rollup is not None:
+            activity_30d = {
+                "plays": rollup["plays"],
+                "likes": rollup["likes"],
+                "skips": rollup["skips"],
+                "top_genres": [
+                    {"genre": genre, "play_count": count}
+                    for genre, count in sorted(rollup["genres"].items(), key=lambda g: -g[1])[:10]
+                ],
+                "daily": rollup["days"],
+                "as_of": rollup["until"].isoformat()
+            }
+        else:
+            activity_30d = None
         
         return {
             "total_users": total_users,
             "active_users_7d": active_users,
             "total_plays": total_plays,
             "total_likes": total_likes,
+            "totals_as_of": all_time["until"].isoformat() if all_time is not None else None,
             "avg_plays_per_user": round(total_plays / total_users, 2) if total_users > 0 else 0,
+            "popular_tracks": popular_tracks,
             "popular_tracks_count": len(popular_tracks),
+            "approximate": week is not None,
+            "activity_30d": activity_30d,
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    async def track_recommendation_feedback(
-        self,
-        user_id: str,
-        track_id: str,
-        action: str,  # 'play', 'like', 'skip'
-        algorithm: str,
-        db: AsyncIOMotorDatabase
-    ):
-        """Track how users interact with recommendations"""
-        
-        feedback = {
-            "user_id": user_id,
-            "track_id": track_id,
-            "action": action,
-            "algorithm": algorithm,
-            "timestamp": datetime.utcnow()
-        }
-        
-        await db.recommendation_feedback.insert_one(feedback)
-    
     async def get_algorithm_performance(self, db: AsyncIOMotorDatabase) -> Dict:
         """Analyze which recommendation algorithms perform best"""
         
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "algorithm": "$algorithm",
-                        "action": "$action"
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"count": -1}}
-        ]
-        
-        results = await db.recommendation_feedback.aggregate(pipeline).to_list(length=100)
-        
+        # Incremental counters maintained by the event buffer
         algorithm_stats = {}
-        for result in results:
-            algo = result['_id']['algorithm']
-            action = result['_id']['action']
-            count = result['count']
-            
-            if algo not in algorithm_stats:
-                algorithm_stats[algo] = {"plays": 0, "likes": 0, "skips": 0}
+        async for counter in db[ALGORITHM_COUNTERS].find({}):
+            algorithm_stats[counter["_id"]] = {
+                "impressions": counter.get("impressions", 0),
+                "tracks_shown": counter.get("tracks_shown", 0),
+                "plays": counter.get("plays", 0),
+                "likes": counter.get("likes", 0),
+                "skips": counter.get("skips", 0)
+            }
+        
+        if not algorithm_stats:
+            # Feedback recorded before the counters existed: rollups, or a
+            # raw scan before the first compaction
+            rollup = await get_rollup_compactor().window(db)
+            if rollup is not None:
+                counts = rollup["algorithms"]
+            else:
+                pipeline = [
+                    {
+                        "$group": {
+                            "_id": {
+                                "algorithm": "$algorithm",
+                                "action": "$action"
+                            },
+                            "count": {"$sum": 1}
+                        }
+                    }
+                ]
+                results = await db.recommendation_feedback.aggregate(pipeline).to_list(length=100)
+                counts = {
+                    (result['_id']['algorithm'], result['_id']['action']): result['count']
+                    for result in results
+                }
             
-            algorithm_stats[algo][action + "s"] = count
+            for (algo, action), count in sorted(counts.items(), key=lambda c: -c[1]):
+                if algo not in algorithm_stats:
+                    algorithm_stats[algo] = {"plays": 0, "likes": 0, "skips": 0}
+                
+                algorithm_stats[algo][action + "s"] = count
         
         # Calculate success rates
         for algo, stats in algorithm_stats.items():
@@ -139,6 +259,10 @@ class AnalyticsEngine:
                 stats['like_rate'] = round((stats['likes'] / total) * 100, 2)
                 stats['skip_rate'] = round((stats['skips'] / total) * 100, 2)
                 stats['total_interactions'] = total
+            # Click-through: plays per recommended track shown
+            if stats.get('tracks_shown'):
+                stats['ctr'] = round((stats['plays'] / stats['tracks_shown']) * 100, 2)
+                stats['like_through_rate'] = round((stats['likes'] / stats['tracks_shown']) * 100, 2)
         
         return algorithm_stats
 
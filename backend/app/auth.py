@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -7,7 +12,15 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .config import settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = default rounds: hashes made with any other cost are
+# flagged by needs_update and transparently rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 # JWT token bearer
 security = HTTPBearer()
@@ -18,6 +31,112 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated thread pool so hashing never blocks the
+    event loop (bcrypt releases the GIL while it works)
+    A semaphore bounds how many calls are handed to the executor at once
+    (max_pending); callers waiting for a slot are capped at max_waiting,
+    beyond which calls fail fast with a 503 instead of queueing without
+    limit. Queue time (waiting for a slot and a thread) is tracked
+    separately from hashing time
+    """
+
+    def __init__(self, threads: int = 2, max_pending: int = 32, max_waiting: int = 256):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="bcrypt")
+        self.threads = threads
+        self.max_pending = max_pending
+        self.max_waiting = max_waiting
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats = {
+            "calls": 0,
+            "rehashed": 0,
+            "rejected": 0,
+            "queue_ms_total": 0.0,
+            "queue_ms_max": 0.0,
+            "hash_ms_total": 0.0
+        }
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        async with self._slots:
+            self.waiting -= 1
+            self.in_flight += 1
+            started = {}
+
+            def timed():
+                started["at"] = time.perf_counter()
+                return fn(*args)
+
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+            finally:
+                self.in_flight -= 1
+
+        finished = time.perf_counter()
+        queue_ms = (started.get("at", finished) - queued_at) * 1000
+        self.stats["calls"] += 1
+        self.stats["queue_ms_total"] += queue_ms
+        self.stats["queue_ms_max"] = max(self.stats["queue_ms_max"], queue_ms)
+        self.stats["hash_ms_total"] += (finished - started.get("at", finished)) * 1000
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new hash): new hash is set when the stored cost is outdated"""
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.stats["rehashed"] += 1
+        return valid, new_hash
+
+    def get_stats(self) -> Dict:
+        calls = self.stats["calls"]
+        return {
+            "calls": calls,
+            "rehashed": self.stats["rehashed"],
+            "rejected": self.stats["rejected"],
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "threads": self.threads,
+            "max_pending": self.max_pending,
+            "max_waiting": self.max_waiting,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "avg_queue_ms": round(self.stats["queue_ms_total"] / calls, 2) if calls else 0,
+            "max_queue_ms": round(self.stats["queue_ms_max"], 2),
+            "avg_hash_ms": round(self.stats["hash_ms_total"] / calls, 2) if calls else 0
+        }
+
+
+# Singleton instance
+_password_hasher_instance = None
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create password hasher instance"""
+    global _password_hasher_instance
+    if _password_hasher_instance is None:
+        _password_hasher_instance = PasswordHasher(
+            threads=settings.BCRYPT_THREADS,
+            max_pending=settings.BCRYPT_MAX_PENDING,
+            max_waiting=settings.BCRYPT_MAX_WAITING
+        )
+    return _password_hasher_instance
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,9 +155,82 @@ def decode_access_token(token: str):
     except JWTError:
         return None
 
+class TokenCache:
+    """
+    Bounded LRU of verified tokens: sha256(token) -> claims
+    Entries expire at the token's own exp, so a cached token is never
+    accepted longer than the JWT itself would be
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Cached claims for a token verified earlier, or None"""
+
+        key = self._digest(token)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return claims
+
+    def put(self, token: str, claims: Dict):
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return
+
+        self.entries[self._digest(token)] = (claims, float(expires_at))
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0
+        }
+
+
+# Singleton instance
+_token_cache_instance = None
+
+def get_token_cache() -> TokenCache:
+    """Get or create verified-token cache instance"""
+    global _token_cache_instance
+    if _token_cache_instance is None:
+        _token_cache_instance = TokenCache(max_size=settings.TOKEN_CACHE_SIZE)
+    return _token_cache_instance
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_access_token(token)
+    token_cache = get_token_cache()
+    
+    # Skip signature verification for tokens we've already verified
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload is not None:
+            token_cache.put(token, payload)
     
     if payload is None:
         raise HTTPException(
@@ -0,0 +1,233 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Tuple, TypeVar
+import asyncpg
+from .config import settings
+
+T = TypeVar("T")
+
+# Column order shared by the loaders' transforms, COPY and the merge statement
+TRACK_COLUMNS = [
+    "track_id", "title", "artist", "album", "genre", "year", "duration",
+    "tempo", "energy", "danceability", "valence", "acousticness",
+    "instrumentalness", "liveness", "speechiness", "loudness"
+]
+
+# One row per loaded chunk; a job is resumed by skipping its recorded chunks
+LOAD_JOBS_DDL = """
+    CREATE TABLE IF NOT EXISTS load_jobs (
+        job_id VARCHAR(255) NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        total_chunks INTEGER,
+        rows INTEGER NOT NULL,
+        loaded INTEGER NOT NULL,
+        completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (job_id, chunk_index)
+    )
+"""
+
+# Returned by next() once the chunk iterator runs out
+_EXHAUSTED = object()
+
+ChunkLoad = Callable[[asyncpg.Connection, List[Tuple]], Awaitable[int]]
+
+
+async def copy_tracks(conn: asyncpg.Connection, records: List[Tuple], columns: List[str] = TRACK_COLUMNS) -> int:
+    """
+    Bulk load: COPY into a session temp table, then one
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING into tracks
+    Returns the number of new tracks
+    """
+
+    await conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS tracks_staging (LIKE tracks INCLUDING DEFAULTS)"
+    )
+
+    column_list = ", ".join(columns)
+    async with conn.transaction():
+        await conn.execute("TRUNCATE tracks_staging")
+        await conn.copy_records_to_table("tracks_staging", records=records, columns=columns)
+        status = await conn.execute(f"""
+            INSERT INTO tracks ({column_list})
+            SELECT {column_list} FROM tracks_staging
+            ON CONFLICT (track_id) DO NOTHING
+        """)
+
+    # Status is "INSERT 0 <rows>"
+    return int(status.split()[-1])
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BulkLoader:
+    """
+    Parallel, resumable chunked loading into PostgreSQL
+    Input is a deterministic sequence of chunks; up to `concurrency` chunks
+    are read and prepared (in worker threads) and loaded at once over a
+    connection pool. Each chunk's load and its load_jobs checkpoint commit in one
+    transaction, so a rerun of the same job skips exactly the loaded chunks
+    """
+
+    def __init__(self, job_id: str, concurrency: int = 4, total_chunks: Optional[int] = None, total_rows: Optional[int] = None):
+        self.job_id = job_id
+        self.concurrency = max(1, concurrency)
+        self.total_chunks = total_chunks
+        self.total_rows = total_rows
+        self.rows = 0
+        self.loaded = 0
+        self.chunks = 0
+        self.skipped_chunks = 0
+
+    @staticmethod
+    async def ensure_table(conn: asyncpg.Connection):
+        await conn.execute(LOAD_JOBS_DDL)
+
+    @staticmethod
+    async def find_unfinished(conn: asyncpg.Connection, prefix: str) -> Optional[str]:
+        """Most recent job with this id prefix that has chunks left to load"""
+        await BulkLoader.ensure_table(conn)
+        return await conn.fetchval("""
+            SELECT job_id FROM load_jobs
+            WHERE job_id LIKE $1 || '%'
+            GROUP BY job_id
+            HAVING COUNT(*) < MAX(total_chunks)
+            ORDER BY MAX(completed_at) DESC
+            LIMIT 1
+        """, prefix)
+
+    async def completed_chunks(self, conn: asyncpg.Connection) -> Set[int]:
+        rows = await conn.fetch(
+            "SELECT chunk_index, rows, loaded FROM load_jobs WHERE job_id = $1", self.job_id
+        )
+        # Earlier runs' rows count towards the totals and the ETA
+        self.rows = sum(row["rows"] for row in rows)
+        self.loaded = sum(row["loaded"] for row in rows)
+        return {row["chunk_index"] for row in rows}
+
+    async def reset(self, pool: asyncpg.Pool):
+        """Forget this job's checkpoints (a full reload)"""
+        async with pool.acquire() as conn:
+            await self.ensure_table(conn)
+            await conn.execute("DELETE FROM load_jobs WHERE job_id = $1", self.job_id)
+
+    async def _load_chunk(self, pool: asyncpg.Pool, index: int, records: List[Tuple], load: ChunkLoad) -> int:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                loaded = await load(conn, records)
+                await conn.execute("""
+                    INSERT INTO load_jobs (job_id, chunk_index, total_chunks, rows, loaded)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (job_id, chunk_index) DO NOTHING
+                """, self.job_id, index, self.total_chunks, len(records), loaded)
+        return loaded
+
+    def _report(self, index: int, started: float, resumed_rows: int):
+        elapsed = time.perf_counter() - started
+        rate = (self.rows - resumed_rows) / elapsed if elapsed > 0 else 0.0
+
+        progress = f"chunk {index + 1}"
+        if self.total_chunks:
+            progress += f"/{self.total_chunks}"
+
+        eta = ""
+        if self.total_rows and rate > 0:
+            eta = f", ETA {format_eta(max(self.total_rows - self.rows, 0) / rate)}"
+        elif self.total_chunks and self.chunks:
+            remaining = self.total_chunks - self.skipped_chunks - self.chunks
+            eta = f", ETA {format_eta(remaining * elapsed / self.chunks)}"
+
+        print(f"  ✅ {progress}: {self.rows} rows, {rate:.0f} rows/s{eta}")
+
+    async def run(
+        self,
+        pool: asyncpg.Pool,
+        chunks: Iterable[T],
+        prepare: Callable[[T], List[Tuple]],
+        load: ChunkLoad = copy_tracks
+    ) -> int:
+        """
+        Load every not-yet-checkpointed chunk; returns rows inserted by this run
+        The chunk iterator is consumed lazily, at most `concurrency` chunks ahead,
+        and advanced in the executor: in stream mode that is CSV parsing
+        """
+
+        async with pool.acquire() as conn:
+            await self.ensure_table(conn)
+            done = await self.completed_chunks(conn)
+
+        if done:
+            print(f"⏩ Resuming job {self.job_id}: {len(done)} chunks ({self.rows} rows) already loaded")
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        resumed_rows = self.rows
+        loaded_before = self.loaded
+        started = time.perf_counter()
+
+        failures: List[BaseException] = []
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if failures:
+                    continue  # drain: the run is being abandoned
+                index, chunk = item
+                try:
+                    records = await loop.run_in_executor(None, prepare, chunk)
+                    loaded = await self._load_chunk(pool, index, records, load)
+                except Exception as e:
+                    failures.append(e)
+                    continue
+                self.rows += len(records)
+                self.loaded += loaded
+                self.chunks += 1
+                self._report(index, started, resumed_rows)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        iterator = iter(chunks)
+        try:
+            index = -1
+            while not failures:
+                chunk = await loop.run_in_executor(None, next, iterator, _EXHAUSTED)
+                if chunk is _EXHAUSTED:
+                    break
+                index += 1
+                if index in done:
+                    self.skipped_chunks += 1
+                    continue
+                await queue.put((index, chunk))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        if failures:
+            print(f"❌ Job {self.job_id} stopped after {self.chunks} chunks; rerun to resume")
+            raise failures[0]
+
+        elapsed = time.perf_counter() - started
+        print(f"📊 Job {self.job_id}: {self.chunks} chunks in {elapsed:.1f}s "
+              f"({(self.rows - resumed_rows) / max(elapsed, 1e-9):.0f} rows/s), "
+              f"{self.skipped_chunks} skipped as already loaded")
+        return self.loaded - loaded_before
+
+
+async def create_loader_pool(concurrency: int) -> asyncpg.Pool:
+    """A dedicated pool sized to the loader's concurrency"""
+    return await asyncpg.create_pool(
+        settings.POSTGRES_URL,
+        min_size=1,
+        max_size=max(1, concurrency),
+        command_timeout=600
+    )
@@ -1,6 +1,7 @@
 from typing import Optional, Dict, Any
 import json
 import hashlib
+import uuid
 from datetime import datetime, timedelta
 
 class CacheManager:
@@ -12,6 +13,11 @@ class CacheManager:
     def __init__(self, ttl_minutes: int = 30):
         self.cache: Dict[str, Dict[str, Any]] = {}
         self.ttl_minutes = ttl_minutes
+        # Per-user generation, bumped whenever the user's activity changes
+        # Prefixed with an instance id so tokens never repeat across
+        # restarts or between worker processes
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.generations: Dict[str, int] = {}
     
     def _get_key(self, prefix: str, identifier: str) -> str:
         """Generate cache key"""
@@ -46,8 +52,23 @@ class CacheManager:
             'timestamp': datetime.utcnow()
         }
     
+    def get_generation(self, user_id: str) -> str:
+        """
+        Opaque token that changes whenever the user's cached data goes stale
+        Generations are per process: with several workers, activity written
+        by one worker does not bump another's, so a client alternating
+        between workers can get a 304 for a list that predates its latest
+        plays. Run one worker or route each user to the same worker
+        """
+        return f"{self.instance_id}.{self.generations.get(user_id, 0)}"
+    
+    def bump_generation(self, user_id: str):
+        """Invalidate everything derived from a user's activity"""
+        self.generations[user_id] = self.generations.get(user_id, 0) + 1
+    
     def clear_user_cache(self, user_id: str):
         """Clear all cache entries for a user"""
+        self.bump_generation(user_id)
         keys_to_remove = [
             k for k in self.cache.keys() 
             if user_id in k
@@ -72,6 +93,7 @@ class CacheManager:
             "total_entries": total_entries,
             "active_entries": total_entries - expired,
             "expired_entries": expired,
+            "tracked_generations": len(self.generations),
             "cache_ttl_minutes": self.ttl_minutes
         }
 
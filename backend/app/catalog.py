@@ -0,0 +1,122 @@
+import asyncio
+from typing import Dict, List, Optional
+import asyncpg
+from .recommender import get_recommender
+
+
+class CatalogService:
+    """
+    Read-only catalog lookups served from the recommender's in-memory tracks
+    (scored ones and those without audio features alike)
+    Postgres is only consulted for tracks created after the catalog was
+    loaded, selecting the same columns as the catalog holds
+    """
+
+    def __init__(self):
+        self.recommender = get_recommender()
+        self._load_lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.recommender.tracks_cache is not None
+
+    @property
+    def version(self) -> int:
+        """Bumped every time the catalog is (re)loaded"""
+        return self.recommender.catalog_version
+
+    @property
+    def watermark(self):
+        """Newest created_at seen when the catalog was loaded"""
+        return self.recommender.catalog_watermark
+
+    async def ensure_loaded(self, pool: asyncpg.Pool):
+        """Load the catalog once; later calls don't touch the pool"""
+
+        if self.loaded:
+            return
+
+        async with self._load_lock:
+            if not self.loaded:
+                async with pool.acquire() as conn:
+                    await self.recommender.load_all_tracks(conn)
+
+    def get_track(self, track_id: str) -> Optional[Dict]:
+        """Track from the in-memory catalog, or None"""
+        idx = self.recommender.track_index.get(track_id)
+        if idx is None:
+            return self.recommender.unscored_tracks.get(track_id)
+        return self.recommender.tracks_cache[idx]
+
+    async def fetch_track(self, track_id: str, pool: asyncpg.Pool) -> Optional[Dict]:
+        """Catalog lookup with a Postgres fallback for tracks newer than the watermark"""
+
+        await self.ensure_loaded(pool)
+
+        track = self.get_track(track_id)
+        if track is not None:
+            return track
+
+        columns = self.recommender.track_columns
+        async with pool.acquire() as conn:
+            if self.watermark is None:
+                row = await conn.fetchrow(f"SELECT {columns} FROM tracks WHERE track_id = $1", track_id)
+            else:
+                row = await conn.fetchrow(
+                    f"SELECT {columns} FROM tracks WHERE track_id = $1 AND created_at > $2",
+                    track_id, self.watermark
+                )
+
+        return dict(row) if row else None
+
+    async def fetch_tracks(self, track_ids: List[str], pool: asyncpg.Pool) -> Dict[str, Dict]:
+        """
+        Multi-get: one pass over the catalog index, then a single
+        = ANY($1) query for misses newer than the watermark
+        Returns {track_id: track} for the ids that exist
+        """
+
+        await self.ensure_loaded(pool)
+
+        found = {}
+        missing = []
+        for track_id in track_ids:
+            track = self.get_track(track_id)
+            if track is not None:
+                found[track_id] = track
+            else:
+                missing.append(track_id)
+
+        if missing:
+            columns = self.recommender.track_columns
+            async with pool.acquire() as conn:
+                if self.watermark is None:
+                    rows = await conn.fetch(f"SELECT {columns} FROM tracks WHERE track_id = ANY($1)", missing)
+                else:
+                    rows = await conn.fetch(
+                        f"SELECT {columns} FROM tracks WHERE track_id = ANY($1) AND created_at > $2",
+                        missing, self.watermark
+                    )
+            for row in rows:
+                found[row['track_id']] = dict(row)
+
+        return found
+
+    def genres(self) -> List[str]:
+        """Sorted genre names (precomputed at load)"""
+        return list(self.recommender.genre_counts)
+
+    def genre_counts(self) -> Dict[str, int]:
+        """Tracks per genre (precomputed at load)"""
+        return self.recommender.genre_counts
+
+
+# Singleton instance
+_catalog_instance = None
+
+def get_catalog() -> CatalogService:
+    """Get or create catalog service instance"""
+    global _catalog_instance
+    if _catalog_instance is None:
+        _catalog_instance = CatalogService()
+    return _catalog_instance
@@ -17,6 +17,16 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # Password hashing (bcrypt runs in its own thread pool)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_THREADS: int = int(os.getenv("BCRYPT_THREADS", "2"))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", "32"))
+    # Callers allowed to wait for a bcrypt slot before sign-ins get a 503
+    BCRYPT_MAX_WAITING: int = int(os.getenv("BCRYPT_MAX_WAITING", "256"))
+
+    # Verified JWT cache (entries expire with the token)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
     # Supabase
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
@@ -30,6 +40,40 @@ class Settings(BaseSettings):
     # Spotify API
     SPOTIFY_CLIENT_ID: str = os.getenv("SPOTIFY_CLIENT_ID", "")
     SPOTIFY_CLIENT_SECRET: str = os.getenv("SPOTIFY_CLIENT_SECRET", "")
+
+    # Event ingestion (write-behind buffer)
+    EVENT_BUFFER_MAX_SIZE: int = int(os.getenv("EVENT_BUFFER_MAX_SIZE", "10000"))
+    EVENT_BUFFER_FLUSH_SIZE: int = int(os.getenv("EVENT_BUFFER_FLUSH_SIZE", "500"))
+    EVENT_BUFFER_FLUSH_INTERVAL_MS: int = int(os.getenv("EVENT_BUFFER_FLUSH_INTERVAL_MS", "250"))
+
+    # Event journal (durable local log of every event)
+    EVENT_JOURNAL_ENABLED: bool = os.getenv("EVENT_JOURNAL_ENABLED", "true").lower() == "true"
+    EVENT_JOURNAL_DIR: str = os.getenv("EVENT_JOURNAL_DIR", "")
+    EVENT_JOURNAL_SEGMENT_MB: int = int(os.getenv("EVENT_JOURNAL_SEGMENT_MB", "64"))
+    EVENT_JOURNAL_FSYNC_INTERVAL_MS: int = int(os.getenv("EVENT_JOURNAL_FSYNC_INTERVAL_MS", "5"))
+
+    # Play history storage: "documents" (one per play) or "buckets" (one per user-day)
+    PLAY_HISTORY_STORAGE: str = os.getenv("PLAY_HISTORY_STORAGE", "documents")
+
+    # Approximate analytics sketches (persisted per day and worker)
+    SKETCH_FLUSH_INTERVAL_S: int = int(os.getenv("SKETCH_FLUSH_INTERVAL_S", "60"))
+
+    # Hourly/daily analytics rollups (periodic compaction of closed hours)
+    ROLLUP_INTERVAL_S: int = int(os.getenv("ROLLUP_INTERVAL_S", "300"))
+    ROLLUP_LAG_S: int = int(os.getenv("ROLLUP_LAG_S", "120"))
+    ROLLUP_BACKFILL_DAYS: int = int(os.getenv("ROLLUP_BACKFILL_DAYS", "90"))
+    
+    # Bulk loaders: chunks loaded concurrently (one pool connection each)
+    LOADER_CONCURRENCY: int = int(os.getenv("LOADER_CONCURRENCY", "4"))
+
+    # Tracks without real audio features in similarity results:
+    # "exclude", "downweight" (scale similarity by FEATURELESS_WEIGHT) or "include"
+    FEATURELESS_TRACKS: str = os.getenv("FEATURELESS_TRACKS", "downweight")
+    FEATURELESS_WEIGHT: float = float(os.getenv("FEATURELESS_WEIGHT", "0.5"))
+
+    # Request timing: Prometheus /metrics and Server-Timing response headers
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
     
     class Config:
         env_file = ".env"
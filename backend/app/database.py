@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional
 from .config import settings
+from .metrics import TimedConnection, MongoCommandTimer
 import asyncpg
 
 # MongoDB Connection
@@ -10,7 +11,10 @@ mongodb_db = None
 async def connect_mongodb():
     global mongodb_client, mongodb_db
     try:
-        mongodb_client = AsyncIOMotorClient(settings.MONGODB_URL)
+        mongodb_client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            event_listeners=[MongoCommandTimer()] if settings.METRICS_ENABLED else []
+        )
         mongodb_db = mongodb_client.music_recommender
         await mongodb_client.admin.command('ping')
         print("✅ Connected to MongoDB")
@@ -37,7 +41,8 @@ async def connect_postgres():
             settings.POSTGRES_URL,
             min_size=1,
             max_size=10,
-            command_timeout=60
+            command_timeout=60,
+            connection_class=TimedConnection if settings.METRICS_ENABLED else asyncpg.Connection
         )
         async with postgres_pool.acquire() as conn:
             await conn.fetchval('SELECT 1')
@@ -0,0 +1,329 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from .cache_manager import get_cache_manager
+from .config import settings
+from .database import get_mongodb
+from .play_history_store import get_play_history_store
+
+# Event kind -> MongoDB collection
+EVENT_COLLECTIONS = {
+    "play": "play_history",
+    "like": "likes",
+    "skip": "skips",
+    "impression": "recommendation_impressions",
+    "feedback": "recommendation_feedback",
+}
+
+ALGORITHM_COUNTERS = "algorithm_counters"
+
+# Events that change what a user's recommendations are computed from
+ACTIVITY_KINDS = ("play", "like", "skip")
+
+# When each activity event happened (its feedback's timestamp)
+EVENT_TIME_FIELDS = {"play": "played_at", "like": "liked_at", "skip": "skipped_at"}
+
+_STOP = object()
+
+
+class EventBuffer:
+    """
+    Write-behind buffer for user activity events
+    Handlers enqueue and return immediately, a background flusher
+    bulk-writes batches to MongoDB by size or time threshold
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        flush_size: int = 500,
+        flush_interval: float = 0.25
+    ):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # Attributed events whose impression was not found yet: retried with the next batch
+        self._unattributed: List[Tuple[str, Dict]] = []
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "write_errors": 0,
+            "dropped": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self):
+        """Start the background flusher (called from the app lifespan)"""
+
+        if self.running:
+            return
+
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self._batch_ready = asyncio.Event()
+        self._flusher = asyncio.create_task(self._run())
+        print(f"✅ Event buffer started (max {self.max_size}, flush {self.flush_size} / {self.flush_interval}s)")
+
+    async def stop(self):
+        """Drain everything still queued, then stop the flusher"""
+
+        if not self.running:
+            return
+
+        print(f"🔄 Draining event buffer ({self.queue.qsize()} queued)...")
+        await self.queue.put(_STOP)
+        self._batch_ready.set()
+        await self._flusher
+        self._flusher = None
+        self.queue = None
+        print("✅ Event buffer drained")
+
+    async def enqueue(self, kind: str, document: Dict):
+        """
+        Queue an event for writing
+        Waits when the queue is full (backpressure); writes
+        synchronously if the buffer isn't running (scripts, tests)
+        """
+
+        if kind not in EVENT_COLLECTIONS:
+            raise ValueError(f"Unknown event kind: {kind}")
+
+        if not self.running:
+            await self._write([(kind, document)])
+            return
+
+        await self.queue.put((kind, document))
+        self.stats["enqueued"] += 1
+
+        if self.queue.qsize() >= self.flush_size:
+            self._batch_ready.set()
+
+    def offer(self, kind: str, document: Dict) -> bool:
+        """
+        Queue an event without waiting, for best-effort telemetry on hot
+        paths; the event is dropped (and counted) when the buffer is full
+        or not running
+        """
+
+        if kind not in EVENT_COLLECTIONS:
+            raise ValueError(f"Unknown event kind: {kind}")
+
+        if not self.running or self.queue.full():
+            self.stats["dropped"] += 1
+            return False
+
+        self.queue.put_nowait((kind, document))
+        self.stats["enqueued"] += 1
+
+        if self.queue.qsize() >= self.flush_size:
+            self._batch_ready.set()
+        return True
+
+    async def _run(self):
+        """Flusher loop: collect a batch by size or time, then write it"""
+
+        while True:
+            item = await self.queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+
+            # Wait for a full batch or the flush interval, whichever is first
+            if self.queue.qsize() < self.flush_size - 1:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            stopping = False
+            while len(batch) < self.flush_size and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+            if stopping:
+                # Anything queued behind the stop marker still gets written
+                while not self.queue.empty():
+                    rest = []
+                    while len(rest) < self.flush_size and not self.queue.empty():
+                        rest.append(self.queue.get_nowait())
+                    await self._write(rest)
+                return
+
+    def _collection_name(self, kind: str) -> str:
+        if kind == "play":
+            return get_play_history_store().collection_name
+        return EVENT_COLLECTIONS[kind]
+
+    def _build_operations(self, kind: str, documents: List[Dict]) -> List:
+        """Translate queued events into bulk write operations"""
+
+        if kind == "play":
+            # One document per play, or one $push upsert per user-day bucket
+            return get_play_history_store().write_operations(documents)
+
+        if kind == "like":
+            # Idempotent like: one document per (user, track)
+            return [
+                UpdateOne(
+                    {"user_id": doc["user_id"], "track_id": doc["track_id"]},
+                    {"$setOnInsert": doc},
+                    upsert=True
+                )
+                for doc in documents
+            ]
+
+        return [InsertOne(doc) for doc in documents]
+
+    def _counter_operations(self, impressions: List[Dict], feedback: List[Dict]) -> List:
+        """Per-algorithm $inc upserts for a batch's impressions and feedback"""
+
+        counters = defaultdict(lambda: defaultdict(int))
+        for doc in impressions:
+            counters[doc["algorithm"]]["impressions"] += 1
+            counters[doc["algorithm"]]["tracks_shown"] += len(doc["track_ids"])
+        for doc in feedback:
+            counters[doc["algorithm"]][doc["action"] + "s"] += 1
+
+        return [
+            UpdateOne({"_id": algorithm}, {"$inc": dict(counts)}, upsert=True)
+            for algorithm, counts in counters.items()
+        ]
+
+    async def _attribute(self, db, events: List[Tuple[str, Dict]]) -> List[Dict]:
+        """
+        Feedback documents for written events whose impression checks out
+        An impression found nowhere may still sit in another worker's
+        buffer, so it gets one more chance with the next batch
+        """
+
+        # Imported here: impressions hands its events to this module
+        from .impressions import get_impression_verifier
+
+        verifier = get_impression_verifier()
+        retried, self._unattributed = self._unattributed, []
+        unknown = await verifier.load(db, {doc["impression_id"] for _, doc in retried + events})
+
+        feedback = []
+        for last_chance, (kind, doc) in [(True, event) for event in retried] + [(False, event) for event in events]:
+            impression_id = doc["impression_id"]
+            if impression_id in unknown and not last_chance:
+                self._unattributed.append((kind, doc))
+                continue
+            if impression_id in unknown:
+                verifier.mark_unknown(impression_id)
+            algorithm = verifier.attribute(impression_id, doc["user_id"], doc["track_id"])
+            if algorithm:
+                feedback.append({
+                    "user_id": doc["user_id"],
+                    "track_id": doc["track_id"],
+                    "action": kind,
+                    "algorithm": algorithm,
+                    "impression_id": impression_id,
+                    "timestamp": doc[EVENT_TIME_FIELDS[kind]]
+                })
+        return feedback
+
+    async def _write_counters(self, db, operations: List):
+        try:
+            await db[ALGORITHM_COUNTERS].bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"❌ Algorithm counter write error: {e}")
+
+    async def _write(self, batch: List[Tuple[str, Dict]]):
+        """Bulk-write a batch, one unordered bulk_write per collection"""
+
+        db = get_mongodb()
+
+        by_kind = defaultdict(list)
+        for kind, document in batch:
+            by_kind[kind].append(document)
+
+        async def write_collection(kind: str, documents: List[Dict]) -> Set[int]:
+            """Returns the indexes of documents that were upserted (new)"""
+            operations = self._build_operations(kind, documents)
+            collection = db[self._collection_name(kind)]
+            try:
+                result = await collection.bulk_write(operations, ordered=False)
+                self.stats["written"] += len(documents)
+                return set(result.upserted_ids or {})
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                self.stats["written"] += len(documents) - failed
+                self.stats["write_errors"] += failed
+                print(f"⚠️ {failed} {kind} events failed to write: {e.details.get('writeErrors', [])[:1]}")
+                return {upserted["index"] for upserted in e.details.get("upserted", [])}
+            except Exception as e:
+                self.stats["write_errors"] += len(documents)
+                print(f"❌ Event buffer write error ({kind}, {len(documents)} events): {e}")
+                return set()
+
+        kinds = list(by_kind)
+        upserted = dict(zip(kinds, await asyncio.gather(*(
+            write_collection(kind, by_kind[kind]) for kind in kinds
+        ))))
+
+        # Feedback is checked only now that this batch's impressions are
+        # written; a like counts only when it is a new like
+        attributed = [
+            (kind, doc) for kind in ("play", "skip")
+            for doc in by_kind.get(kind, []) if doc.get("impression_id")
+        ] + [
+            ("like", doc) for index, doc in enumerate(by_kind.get("like", []))
+            if index in upserted.get("like", ()) and doc.get("impression_id")
+        ]
+        feedback = await self._attribute(db, attributed) if attributed or self._unattributed else []
+
+        followups = []
+        if feedback:
+            followups.append(write_collection("feedback", feedback))
+        counter_operations = self._counter_operations(by_kind.get("impression", []), feedback)
+        if counter_operations:
+            followups.append(self._write_counters(db, counter_operations))
+        await asyncio.gather(*followups)
+        self.stats["batches"] += 1
+
+        # Only now is the activity visible to readers: anything computed
+        # (and cached or ETagged) before this point stops matching
+        cache = get_cache_manager()
+        for user_id in {doc["user_id"] for kind in ACTIVITY_KINDS for doc in by_kind.get(kind, [])}:
+            cache.bump_generation(user_id)
+
+    def get_stats(self) -> Dict:
+        """Get buffer statistics"""
+        return {
+            **self.stats,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "unattributed": len(self._unattributed),
+            "max_size": self.max_size,
+            "running": self.running
+        }
+
+
+# Singleton instance
+_event_buffer_instance = None
+
+def get_event_buffer() -> EventBuffer:
+    """Get or create event buffer instance"""
+    global _event_buffer_instance
+    if _event_buffer_instance is None:
+        _event_buffer_instance = EventBuffer(
+            max_size=settings.EVENT_BUFFER_MAX_SIZE,
+            flush_size=settings.EVENT_BUFFER_FLUSH_SIZE,
+            flush_interval=settings.EVENT_BUFFER_FLUSH_INTERVAL_MS / 1000
+        )
+    return _event_buffer_instance
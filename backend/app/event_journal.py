@@ -0,0 +1,461 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from .config import settings
+from .event_buffer import EVENT_COLLECTIONS
+from .play_history_store import DUPLICATE_KEY, get_play_history_store
+
+# Record layout: [payload length: u32][crc32 of payload: u32][payload: JSON]
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+COMPACT_SUFFIX = ".compact"
+NEW_SUFFIX = ".new"
+COMPACT_LOCK = "compact.lock"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+
+def _decode_object(obj: Dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_record(event: Dict) -> bytes:
+    """Serialize one event as a length-prefixed, checksummed record"""
+    payload = json.dumps(event, default=_encode_value, separators=(",", ":")).encode("utf-8")
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: Path) -> Iterator[Dict]:
+    """
+    Yield the events stored in a segment file
+    Stops at the first truncated or corrupt record (torn write on crash)
+    """
+
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                print(f"⚠️ Truncated record header in {path.name}, stopping")
+                return
+
+            length, checksum = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                print(f"⚠️ Corrupt record in {path.name} at offset {f.tell() - len(payload) - RECORD_HEADER.size}, stopping")
+                return
+
+            yield json.loads(payload, object_hook=_decode_object)
+
+
+def _try_lock(path: Path, flags: int = os.O_RDONLY) -> Optional[int]:
+    """Open `path` and take a non-blocking exclusive flock; None if another holder has it"""
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class EventJournal:
+    """
+    Append-only, segmented local journal of user activity events
+    Records are fsynced in batches (group commit): append() returns
+    once the fsync covering its record has completed
+    Every writer (worker process) appends to its own stream of segments,
+    named segment-<writer>-<seq>.log, and holds an flock on its active
+    segment; compaction only merges segments nobody holds
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync_interval: float = 0.005,
+        enabled: bool = True
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.enabled = enabled
+
+        self._fd: Optional[int] = None
+        self.writer_id: Optional[str] = None
+        self._segment_seq = 0
+        self._segment_size = 0
+        self._pending: List[asyncio.Future] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._committer: Optional[asyncio.Task] = None
+        self._closing = False
+        self.stats = {"appended": 0, "fsyncs": 0, "rotations": 0}
+
+    def _segment_path(self, seq: int, suffix: str = SEGMENT_SUFFIX) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{self.writer_id}-{seq:08d}{suffix}"
+
+    def segments(self) -> List[Path]:
+        """All segment files, oldest first"""
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    @contextlib.contextmanager
+    def _compaction_lock(self, wait: bool = True):
+        """
+        Directory-wide lock held while compacting or recovering a compaction
+        Yields False (without waiting) when wait is off and it is taken
+        """
+        fd = os.open(self.directory / COMPACT_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def _recover_compaction(self):
+        """Finish a compaction that crashed before its final rename (caller holds the compaction lock)"""
+        for tmp in self.directory.glob(f"{SEGMENT_PREFIX}*{COMPACT_SUFFIX}"):
+            target = tmp.with_suffix(SEGMENT_SUFFIX)
+            if target.exists():
+                tmp.unlink()
+            else:
+                tmp.rename(target)
+
+    def _open_segment(self, seq: int):
+        """
+        Create and lock the next segment of this writer's stream
+        It is created under a temporary name and renamed once locked, so
+        compaction never sees it unlocked
+        """
+        path = self._segment_path(seq)
+        staging = self._segment_path(seq, SEGMENT_SUFFIX + NEW_SUFFIX)
+        fd = os.open(staging, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.rename(staging, path)
+        self._fd = fd
+        self._segment_seq = seq
+        self._segment_size = 0
+
+    def _rotate(self):
+        # Records appended during the last fsync are still unsynced here
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._open_segment(self._segment_seq + 1)
+        self.stats["rotations"] += 1
+
+    async def open(self):
+        """Open the active segment and start the fsync committer"""
+
+        if not self.enabled or self._committer is not None:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # A compaction running elsewhere finishes (or recovers) on its own
+        with self._compaction_lock(wait=False) as locked:
+            if locked:
+                self._recover_compaction()
+
+        # A new stream per open: other workers never append to our
+        # segments, and a torn tail never sits mid-file
+        self.writer_id = f"{int(time.time() * 1000):013d}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._open_segment(1)
+
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._committer = asyncio.create_task(self._run())
+        print(f"✅ Event journal open: {self._segment_path(1)}")
+
+    async def close(self):
+        """Commit outstanding records and close the active segment"""
+
+        if self._committer is None:
+            return
+
+        self._closing = True
+        self._wakeup.set()
+        await self._committer
+        self._committer = None
+
+        await self._commit()
+        os.close(self._fd)
+        self._fd = None
+        print("Event journal closed")
+
+    async def append(self, kind: str, document: Dict) -> str:
+        """
+        Durably record an event and return its event id
+        The id is also set on the document so MongoDB writes carry it
+        """
+
+        event_id = document.get("event_id") or uuid.uuid4().hex
+        document["event_id"] = event_id
+
+        if self._committer is None:
+            return event_id
+
+        record = encode_record({"id": event_id, "kind": kind, "doc": document})
+        os.write(self._fd, record)
+        self._segment_size += len(record)
+        self.stats["appended"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._wakeup.set()
+        await future
+
+        return event_id
+
+    async def _commit(self):
+        """fsync everything written so far and release the waiting appends"""
+
+        if not self._pending:
+            return
+
+        waiting, self._pending = self._pending, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, self._fd)
+            self.stats["fsyncs"] += 1
+        except Exception as e:
+            for future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+        for future in waiting:
+            if not future.done():
+                future.set_result(None)
+
+        # Rotate only between commits so a segment is always fully synced
+        if self._segment_size >= self.segment_bytes:
+            self._rotate()
+
+    async def _run(self):
+        """Committer loop: gather appends for fsync_interval, then fsync once"""
+
+        while not self._closing:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._closing:
+                await asyncio.sleep(self.fsync_interval)
+            try:
+                await self._commit()
+            except Exception as e:
+                print(f"❌ Event journal fsync error: {e}")
+
+    def read(self, segments: Optional[List[Path]] = None) -> Iterator[Dict]:
+        """Yield every journaled event in append order"""
+        for path in segments if segments is not None else self.segments():
+            yield from read_segment(path)
+
+    def lock_closed_segments(self) -> Dict[Path, int]:
+        """
+        Lock every segment no writer holds (closed ones, in any stream)
+        Returns path -> locked fd, oldest first; release with os.close
+        """
+        locked = {}
+        for path in self.segments():
+            fd = _try_lock(path)
+            if fd is not None:
+                locked[path] = fd
+        return locked
+
+    def compact(self, drop_before: Optional[datetime] = None) -> Dict:
+        """
+        Merge all closed segments into one, dropping duplicate event ids
+        (and events older than drop_before, if given)
+        Segments that a running writer holds open are left alone
+        """
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._compaction_lock():
+            self._recover_compaction()
+            locked = self.lock_closed_segments()
+            try:
+                return self._compact(list(locked), drop_before)
+            finally:
+                for fd in locked.values():
+                    os.close(fd)
+
+    def _compact(self, closed: List[Path], drop_before: Optional[datetime]) -> Dict:
+        if not closed or (len(closed) < 2 and drop_before is None):
+            return {"segments": len(closed), "kept": 0, "dropped": 0}
+
+        seen = set()
+        kept = dropped = 0
+        # The merged segment takes the oldest segment's name
+        tmp_path = closed[0].with_suffix(COMPACT_SUFFIX)
+
+        with open(tmp_path, "wb") as out:
+            for event in self.read(closed):
+                timestamp = _event_time(event)
+                if event["id"] in seen or (drop_before and timestamp and timestamp < drop_before):
+                    dropped += 1
+                    continue
+                seen.add(event["id"])
+                out.write(encode_record(event))
+                kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+
+        for path in closed:
+            path.unlink()
+        tmp_path.rename(closed[0])
+
+        print(f"✅ Compacted {len(closed)} segments: kept {kept}, dropped {dropped}")
+        return {"segments": len(closed), "kept": kept, "dropped": dropped}
+
+    def get_stats(self) -> Dict:
+        """Get journal statistics"""
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "writer": self.writer_id,
+            "segment": self._segment_seq,
+            "segment_bytes": self._segment_size,
+            "pending": len(self._pending)
+        }
+
+
+def _event_time(event: Dict) -> Optional[datetime]:
+    doc = event.get("doc", {})
+    for field in ("played_at", "liked_at", "skipped_at"):
+        if isinstance(doc.get(field), datetime):
+            return doc[field]
+    return None
+
+
+def replay_operations(events: List[Dict]) -> Dict[str, List]:
+    """
+    Build idempotent bulk operations for a batch of journaled events
+    Plays go through the play history store (documents or buckets),
+    skips upsert on event_id, likes on (user_id, track_id)
+    """
+    store = get_play_history_store()
+    operations: Dict[str, List] = {}
+    for event in events:
+        doc = event["doc"]
+        if event["kind"] == "play":
+            play = {**doc, "event_id": doc.get("event_id") or event["id"]}
+            operations.setdefault(store.collection_name, []).append(store.replay_operation(play))
+            continue
+        if event["kind"] == "like":
+            key = {"user_id": doc["user_id"], "track_id": doc["track_id"]}
+        else:
+            key = {"event_id": event["id"]}
+        operations.setdefault(EVENT_COLLECTIONS[event["kind"]], []).append(
+            UpdateOne(key, {"$setOnInsert": doc}, upsert=True)
+        )
+    return operations
+
+
+async def replay_journal(journal: EventJournal, db, batch_size: int = 1000) -> Dict[str, int]:
+    """Bulk-load every journaled event into MongoDB (safe to re-run)"""
+
+    counts: Dict[str, int] = {}
+
+    async def flush(batch: List[Dict]):
+        for collection, operations in replay_operations(batch).items():
+            try:
+                result = await db[collection].bulk_write(operations, ordered=False)
+                applied = result.upserted_count + result.modified_count
+            except BulkWriteError as e:
+                # Duplicate keys are events that were already loaded (in
+                # bucket mode: a bucket already holding the event id)
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                    raise
+                applied = e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+            counts[collection] = counts.get(collection, 0) + applied
+
+    batch = []
+    for event in journal.read():
+        batch.append(event)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    return counts
+
+
+def default_journal_dir() -> Path:
+    if settings.EVENT_JOURNAL_DIR:
+        return Path(settings.EVENT_JOURNAL_DIR)
+    return Path(__file__).parent.parent / "data" / "journal"
+
+
+# Singleton instance
+_journal_instance = None
+
+def get_event_journal() -> EventJournal:
+    """Get or create event journal instance"""
+    global _journal_instance
+    if _journal_instance is None:
+        _journal_instance = EventJournal(
+            directory=default_journal_dir(),
+            segment_bytes=settings.EVENT_JOURNAL_SEGMENT_MB * 1024 * 1024,
+            fsync_interval=settings.EVENT_JOURNAL_FSYNC_INTERVAL_MS / 1000,
+            enabled=settings.EVENT_JOURNAL_ENABLED
+        )
+    return _journal_instance
+
+
+async def main():
+    import argparse
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Event journal tools")
+    parser.add_argument("command", choices=["replay", "compact", "stats"])
+    parser.add_argument("--dir", default=None, help="Journal directory")
+    parser.add_argument("--drop-before", default=None, help="ISO date; compaction drops older events")
+    args = parser.parse_args()
+
+    journal = EventJournal(Path(args.dir) if args.dir else default_journal_dir())
+
+    if args.command == "stats":
+        segments = journal.segments()
+        total = sum(1 for _ in journal.read(segments))
+        size = sum(path.stat().st_size for path in segments)
+        print(f"📊 {len(segments)} segments, {total} events, {size / 1024 / 1024:.1f} MB")
+
+    elif args.command == "compact":
+        drop_before = datetime.fromisoformat(args.drop_before) if args.drop_before else None
+        journal.compact(drop_before=drop_before)
+
+    elif args.command == "replay":
+        print("🔄 Connecting to MongoDB...")
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        try:
+            counts = await replay_journal(journal, client.music_recommender)
+            print(f"✅ Replay complete, newly applied: {counts}")
+        finally:
+            client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
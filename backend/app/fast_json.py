@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from .metrics import span
+from .recommender import get_recommender
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _static_fragment(idx: int) -> bytes:
+    """Pre-encoded JSON for a catalog track's static metadata (cached per track)"""
+    recommender = get_recommender()
+    fragment = recommender.track_fragments.get(idx)
+    if fragment is None:
+        fragment = orjson.dumps(recommender.tracks_cache[idx], option=ORJSON_OPTIONS)
+        recommender.track_fragments[idx] = fragment
+    return fragment
+
+
+def encode_track(track: Dict) -> bytes:
+    """
+    Encode a track dict, reusing the cached catalog fragment and only
+    serializing the per-request fields (scores, reasons) added on top
+    """
+
+    recommender = get_recommender()
+    idx = recommender.track_index.get(track.get('track_id'))
+    if idx is None:
+        return orjson.dumps(track, option=ORJSON_OPTIONS)
+
+    static = recommender.tracks_cache[idx]
+    extras = {key: value for key, value in track.items() if key not in static}
+    fragment = _static_fragment(idx)
+    if not extras:
+        return fragment
+
+    # '{...static}' + '{...extras}' -> '{...static,...extras}'
+    return fragment[:-1] + b"," + orjson.dumps(extras, option=ORJSON_OPTIONS)[1:]
+
+
+def encode_track_list(tracks: List[Dict]) -> bytes:
+    return b"[" + b",".join(encode_track(track) for track in tracks) + b"]"
+
+
+def track_list_response(
+    payload: Dict,
+    key: str = "recommendations",
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    JSON response for a payload holding a list of tracks under `key`
+    Bypasses jsonable_encoder; the list is spliced in from track fragments
+    """
+
+    with span("serialize"):
+        rest = {k: v for k, v in payload.items() if k != key}
+        head = orjson.dumps(rest, option=ORJSON_OPTIONS)
+        separator = b"," if rest else b""
+        body = head[:-1] + separator + orjson.dumps(key) + b":" + encode_track_list(payload[key]) + b"}"
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """The app's default response class; encoding time goes to the `serialize` span"""
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return super().render(content)
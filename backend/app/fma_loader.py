@@ -1,197 +1,498 @@
 import pandas as pd
+import numpy as np
 import asyncpg
 from .config import settings
+from .bulk_loader import BulkLoader, TRACK_COLUMNS, create_loader_pool
 import asyncio
+import csv
+import resource
+import time
 from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# Candidate source columns (flattened two-level FMA headers), in priority order
+TITLE_COLUMNS = ['track_title', 'title', 'track_name']
+ARTIST_COLUMNS = ['artist_name', 'track_artist_name', 'album_artist_name']
+ALBUM_COLUMNS = ['album_title', 'album_name']
+GENRE_COLUMNS = ['track_genre_top', 'track_genres', 'genre']
+YEAR_COLUMNS = ['album_date_released', 'track_date_created', 'year']
+DURATION_COLUMNS = ['track_duration', 'duration']
+
+# 0-1 audio features: (source column, default when missing or out of range)
+UNIT_FEATURES = {
+    "energy": ('track_energy', 0.5),
+    "danceability": ('track_danceability', 0.5),
+    "valence": ('track_valence', 0.5),
+    "acousticness": ('track_acousticness', 0.3),
+    "instrumentalness": ('track_instrumentalness', 0.1),
+    "liveness": ('track_liveness', 0.15),
+    "speechiness": ('track_speechiness', 0.05),
+}
+
+BATCH_SIZE = 10000
+STREAM_CHUNK_SIZE = 20000
+
+# Echo Nest audio features (echonest.csv, three header rows) -> tracks columns
+ECHONEST_FEATURES = {
+    "tempo": 'echonest_audio_features_tempo',
+    "energy": 'echonest_audio_features_energy',
+    "danceability": 'echonest_audio_features_danceability',
+    "valence": 'echonest_audio_features_valence',
+    "acousticness": 'echonest_audio_features_acousticness',
+    "instrumentalness": 'echonest_audio_features_instrumentalness',
+    "liveness": 'echonest_audio_features_liveness',
+    "speechiness": 'echonest_audio_features_speechiness',
+}
+
+# Echo Nest has no loudness; features.csv (librosa) has mean RMS energy
+RMSE_COLUMN = 'rmse_mean_01'
+
+FEATURE_COLUMNS = ["track_id"] + list(ECHONEST_FEATURES) + ["loudness", "has_audio_features"]
+
+# Every source column transform_tracks may read
+SOURCE_COLUMNS = (
+    TITLE_COLUMNS + ARTIST_COLUMNS + ALBUM_COLUMNS + GENRE_COLUMNS + YEAR_COLUMNS
+    + DURATION_COLUMNS + ['track_tempo', 'track_loudness']
+    + [column for column, _ in UNIT_FEATURES.values()]
+)
+
+
+def _first_present(df: pd.DataFrame, candidates: List[str], parse=None) -> pd.Series:
+    """Per row, the first non-null value among the candidate columns"""
+    result = pd.Series(np.nan, index=df.index, dtype=object)
+    for col in candidates:
+        if col in df.columns:
+            values = parse(df[col]) if parse else df[col]
+            result = result.where(result.notna(), values)
+    return result
+
+
+def _text(df: pd.DataFrame, candidates: List[str], max_length: int) -> pd.Series:
+    values = _first_present(df, candidates)
+    return values.where(values.isna(), values.astype(str).str[:max_length])
+
+
+def _numeric(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors='coerce')
+
+
+def transform_tracks(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    FMA rows (flattened columns, track index) -> tracks table columns
+    Column selection, coercion, clamping and defaults as column operations
+    """
+
+    track_ids = pd.Series(df.index.astype(str), index=df.index).str.zfill(6)
+    out = pd.DataFrame(index=df.index)
+    out["track_id"] = "fma_" + track_ids
+
+    out["title"] = _text(df, TITLE_COLUMNS, 500).fillna("Track " + track_ids)
+    out["artist"] = _text(df, ARTIST_COLUMNS, 500).fillna("Unknown Artist")
+    out["album"] = _text(df, ALBUM_COLUMNS, 500).fillna("Unknown Album")
+    out["genre"] = _text(df, GENRE_COLUMNS, 100).fillna("Unknown")
+
+    # First parseable 4-digit year, kept only within 1900-2025
+    year = pd.to_numeric(
+        _first_present(df, YEAR_COLUMNS, parse=lambda s: pd.to_numeric(s.astype(str).str[:4], errors='coerce')),
+        errors='coerce'
+    )
+    out["year"] = year.where((year >= 1900) & (year <= 2025)).astype("Int64")
+
+    # First positive duration, default 3 minutes
+    duration = pd.to_numeric(
+        _first_present(df, DURATION_COLUMNS, parse=lambda s: pd.to_numeric(s, errors='coerce').where(lambda v: v > 0)),
+        errors='coerce'
+    )
+    out["duration"] = duration.fillna(180.0).astype(float)
+
+    out["tempo"] = _numeric(df, 'track_tempo').fillna(120.0)
+    for feature, (column, default) in UNIT_FEATURES.items():
+        values = _numeric(df, column)
+        out[feature] = values.where((values >= 0) & (values <= 1), default)
+
+    # Loudness is typically -60 to 0 dB
+    loudness = _numeric(df, 'track_loudness')
+    out["loudness"] = loudness.where(loudness <= 0, -8.0).fillna(-8.0)
+
+    return out[TRACK_COLUMNS].reset_index(drop=True)
+
+
+def to_records(df: pd.DataFrame) -> List[Tuple]:
+    """Rows as tuples of plain Python values (None for nulls) for COPY"""
+    columns = [
+        df[col].astype(object).where(df[col].notna(), None).tolist()
+        for col in df.columns
+    ]
+    return list(zip(*columns))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_csv_header(path: Path, header_rows: int = 2) -> Tuple[List[str], int]:
+    """
+    Flattened column names of a multi-row-header CSV (FMA style) and the
+    number of lines before the data; a trailing index-name line such as
+    'track_id,,,' is detected and skipped
+    """
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        rows = [next(reader) for _ in range(header_rows + 1)]
+
+    names = ['_'.join(parts).strip('_') for parts in zip(*rows[:header_rows])]
+    index_line = rows[header_rows]
+    skip = header_rows + (1 if index_line[0] and not any(index_line[1:]) else 0)
+    return names, skip
+
+
+def stream_csv_chunks(
+    path: Path,
+    columns: List[str],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    limit: Optional[int] = None,
+    header_rows: int = 2
+) -> Iterator[pd.DataFrame]:
+    """
+    Parse stage: fixed-size chunks holding only the wanted columns
+    (the first column is the index); other columns are never materialized
+    """
+
+    names, skip = read_csv_header(path, header_rows)
+    wanted = [0] + [i for i, name in enumerate(names) if name in set(columns) and i != 0]
+
+    reader = pd.read_csv(
+        path,
+        header=None,
+        skiprows=skip,
+        usecols=wanted,
+        names=names,
+        index_col=0,
+        chunksize=chunk_size,
+        low_memory=True
+    )
+
+    remaining = limit
+    with reader:
+        for chunk in reader:
+            if remaining is not None:
+                chunk = chunk.head(remaining)
+                remaining -= len(chunk)
+            yield chunk
+            if remaining is not None and remaining <= 0:
+                return
+
+
+def read_columns(path: Path, columns: List[str], header_rows: int) -> pd.DataFrame:
+    """The wanted columns of a whole multi-row-header CSV, indexed by track"""
+    chunks = list(stream_csv_chunks(path, columns, header_rows=header_rows))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks)
+
+
+def transform_features(echonest: pd.DataFrame, rmse: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Echo Nest features (plus loudness from RMS energy) joined on the
+    track index -> feature columns of the tracks table
+    Values outside their range become null; has_audio_features is set
+    only when all Echo Nest features are present
+    """
+
+    out = pd.DataFrame(index=echonest.index)
+    for feature, column in ECHONEST_FEATURES.items():
+        out[feature] = _numeric(echonest, column)
+
+    unit = [feature for feature in ECHONEST_FEATURES if feature != "tempo"]
+    out[unit] = out[unit].where((out[unit] >= 0) & (out[unit] <= 1))
+    out["tempo"] = out["tempo"].where(out["tempo"] > 0)
+    out["has_audio_features"] = out[list(ECHONEST_FEATURES)].notna().all(axis=1)
+
+    if rmse is not None:
+        # Outer join: tracks without Echo Nest data still get a real loudness
+        out = out.join(rmse.rename("rmse"), how="outer")
+        out["has_audio_features"] = out["has_audio_features"].fillna(False).astype(bool)
+        rms = pd.to_numeric(out.pop("rmse"), errors='coerce')
+        out["loudness"] = (20 * np.log10(rms.where(rms > 0))).clip(lower=-60.0, upper=0.0)
+    else:
+        out["loudness"] = np.nan
+
+    out.index = out.index.astype(int)
+    out["track_id"] = "fma_" + pd.Series(out.index.astype(str), index=out.index).str.zfill(6)
+    return out[FEATURE_COLUMNS].reset_index(drop=True)
+
+
+async def copy_features(conn: asyncpg.Connection, records: List[Tuple]) -> int:
+    """
+    Bulk update: COPY feature rows into a temp table, then one
+    UPDATE ... FROM join into tracks (missing values keep the current ones)
+    Returns the number of tracks updated
+    """
+
+    await conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS features_staging (
+            track_id VARCHAR(255),
+            tempo FLOAT, energy FLOAT, danceability FLOAT, valence FLOAT,
+            acousticness FLOAT, instrumentalness FLOAT, liveness FLOAT,
+            speechiness FLOAT, loudness FLOAT,
+            has_audio_features BOOLEAN
+        )
+    """)
+
+    assignments = ",\n                ".join(
+        f"{column} = COALESCE(s.{column}, t.{column})"
+        for column in FEATURE_COLUMNS[1:-1]
+    )
+    async with conn.transaction():
+        await conn.execute("TRUNCATE features_staging")
+        await conn.copy_records_to_table("features_staging", records=records, columns=FEATURE_COLUMNS)
+        status = await conn.execute(f"""
+            UPDATE tracks t SET
+                {assignments},
+                has_audio_features = t.has_audio_features OR s.has_audio_features,
+                updated_at = CURRENT_TIMESTAMP
+            FROM features_staging s
+            WHERE t.track_id = s.track_id
+        """)
+
+    # Status is "UPDATE <rows>"
+    return int(status.split()[-1])
+
+
+def prepare_chunk(chunk: pd.DataFrame) -> List[Tuple]:
+    """Transform stage: raw chunk -> COPY-ready records"""
+    return to_records(transform_tracks(chunk))
+
+
+def estimate_rows(path: Path, header_lines: int) -> int:
+    """Data line count (quoted multi-line fields make it approximate; ETA only)"""
+    with open(path, "rb") as f:
+        return max(sum(1 for _ in f) - header_lines, 0)
+
+
+def job_id_for(path: Path, mode: str, chunk_size: int, limit: Optional[int]) -> str:
+    """Checkpoint key: same file, mode and chunking -> same chunk boundaries"""
+    stat = path.stat()
+    return f"fma:{path.name}:{stat.st_size}:{int(stat.st_mtime)}:{mode}:{chunk_size}:{limit or 'all'}"
+
 
 class FMADatasetLoader:
     """Load Free Music Archive dataset into PostgreSQL"""
-    
+
     def __init__(self):
         self.data_path = Path(__file__).parent.parent.parent / "data" / "fma_metadata"
-        
-    async def load_tracks(self, limit=None):
+
+    async def load_tracks(
+        self,
+        limit=None,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = settings.LOADER_CONCURRENCY,
+        restart: bool = False
+    ):
         """
         Load real track data from FMA dataset
+        Batches are copied concurrently and checkpointed; an interrupted
+        run resumes from the first batch that wasn't loaded
         """
         print("🔄 Loading FMA dataset CSV files...")
-        
+
         try:
             # Load tracks metadata
             tracks_file = self.data_path / "tracks.csv"
-            
+
             if not tracks_file.exists():
                 print(f"❌ File not found: {tracks_file}")
                 print("📥 Please download the dataset first:")
                 print("   python download_dataset.py")
                 return
-            
+
             print("📖 Reading tracks.csv...")
             tracks_df = pd.read_csv(tracks_file, header=[0, 1], index_col=0)
-            
+
             # Flatten multi-level columns
             tracks_df.columns = ['_'.join(col).strip() for col in tracks_df.columns.values]
-            
+
             print(f"✅ Found {len(tracks_df)} tracks in dataset")
-            
+
             if limit:
                 tracks_df = tracks_df.head(limit)
                 print(f"📊 Loading first {limit} tracks...")
-            
-            print("🔄 Connecting to PostgreSQL...")
-            conn = await asyncpg.connect(settings.POSTGRES_URL)
-            
-            loaded_count = 0
-            skipped_count = 0
-            
+
+            started = time.perf_counter()
+            tracks = transform_tracks(tracks_df)
+            print(f"⚡ Transformed {len(tracks)} tracks in {time.perf_counter() - started:.2f}s")
+
+            batches = [tracks.iloc[start:start + batch_size] for start in range(0, len(tracks), batch_size)]
+            loader = BulkLoader(
+                job_id_for(tracks_file, "batch", batch_size, limit),
+                concurrency=concurrency,
+                total_chunks=len(batches),
+                total_rows=len(tracks)
+            )
+
+            print(f"🔄 Connecting to PostgreSQL ({loader.concurrency} connections)...")
+            pool = await create_loader_pool(loader.concurrency)
+
             try:
-                print("\n🎵 Inserting tracks into database...\n")
-                
-                for idx, row in tracks_df.iterrows():
-                    try:
-                        # Extract track information
-                        track_id = str(idx).zfill(6)
-                        
-                        # Get title (try multiple column names)
-                        title = None
-                        for col in ['track_title', 'title', 'track_name']:
-                            if col in row and pd.notna(row[col]):
-                                title = str(row[col])[:500]
-                                break
-                        
-                        if not title:
-                            title = f"Track {track_id}"
-                        
-                        # Get artist
-                        artist = "Unknown Artist"
-                        for col in ['artist_name', 'track_artist_name', 'album_artist_name']:
-                            if col in row and pd.notna(row[col]):
-                                artist = str(row[col])[:500]
-                                break
-                        
-                        # Get album
-                        album = "Unknown Album"
-                        for col in ['album_title', 'album_name']:
-                            if col in row and pd.notna(row[col]):
-                                album = str(row[col])[:500]
-                                break
-                        
-                        # Get genre (top level genre)
-                        genre = "Unknown"
-                        for col in ['track_genre_top', 'track_genres', 'genre']:
-                            if col in row and pd.notna(row[col]):
-                                genre = str(row[col])[:100]
-                                break
-                        
-                        # Get year
-                        year = None
-                        for col in ['album_date_released', 'track_date_created', 'year']:
-                            if col in row and pd.notna(row[col]):
-                                try:
-                                    year_str = str(row[col])[:4]
-                                    year = int(year_str)
-                                    if year < 1900 or year > 2025:
-                                        year = None
-                                    break
-                                except:
-                                    continue
-                        
-                        # Get duration
-                        duration = None
-                        for col in ['track_duration', 'duration']:
-                            if col in row and pd.notna(row[col]):
-                                try:
-                                    duration = float(row[col])
-                                    if duration > 0:
-                                        break
-                                except:
-                                    continue
-                        
-                        if not duration:
-                            duration = 180.0  # default 3 minutes
-                        
-                        # Audio features (with safe defaults)
-                        tempo = float(row.get('track_tempo', 120.0)) if pd.notna(row.get('track_tempo')) else 120.0
-                        
-                        # For features that should be 0-1, normalize if needed
-                        def get_feature(feature_name, default=0.5):
-                            val = row.get(feature_name, default)
-                            if pd.isna(val):
-                                return default
-                            val = float(val)
-                            # If value is outside 0-1, normalize it
-                            if val < 0 or val > 1:
-                                return default
-                            return val
-                        
-                        energy = get_feature('track_energy', 0.5)
-                        danceability = get_feature('track_danceability', 0.5)
-                        valence = get_feature('track_valence', 0.5)
-                        acousticness = get_feature('track_acousticness', 0.3)
-                        instrumentalness = get_feature('track_instrumentalness', 0.1)
-                        liveness = get_feature('track_liveness', 0.15)
-                        speechiness = get_feature('track_speechiness', 0.05)
-                        
-                        # Loudness (typically -60 to 0 dB)
-                        loudness = float(row.get('track_loudness', -8.0)) if pd.notna(row.get('track_loudness')) else -8.0
-                        if loudness > 0:
-                            loudness = -8.0
-                        
-                        # Insert into database
-                        await conn.execute("""
-                            INSERT INTO tracks (
-                                track_id, title, artist, album, genre, year, duration,
-                                tempo, energy, danceability, valence, acousticness,
-                                instrumentalness, liveness, speechiness, loudness
-                            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
-                            ON CONFLICT (track_id) DO NOTHING
-                        """,
-                            f"fma_{track_id}",
-                            title, artist, album, genre, year, duration,
-                            tempo, energy, danceability, valence, acousticness,
-                            instrumentalness, liveness, speechiness, loudness
-                        )
-                        
-                        loaded_count += 1
-                        
-                        if loaded_count % 500 == 0:
-                            print(f"  ✅ {loaded_count} tracks loaded...")
-                    
-                    except Exception as e:
-                        skipped_count += 1
-                        if skipped_count < 10:  # Only show first few errors
-                            print(f"  ⚠️ Skipped track {idx}: {e}")
-                        continue
-                
-                total_count = await conn.fetchval("SELECT COUNT(*) FROM tracks")
-                
+                if restart:
+                    await loader.reset(pool)
+
+                print("\n🎵 Copying tracks into database...\n")
+                loaded_count = await loader.run(pool, batches, to_records)
+
+                total_count = await pool.fetchval("SELECT COUNT(*) FROM tracks")
+                elapsed = time.perf_counter() - started
+
                 print(f"\n" + "="*50)
-                print(f"✅ Loading complete!")
+                print(f"✅ Loading complete in {elapsed:.1f}s")
                 print(f"📊 New tracks loaded: {loaded_count}")
-                print(f"⏭️  Skipped: {skipped_count}")
+                print(f"⏭️  Already present or loaded earlier: {len(tracks) - loaded_count}")
                 print(f"🎵 Total tracks in database: {total_count}")
                 print("="*50)
-            
+
             finally:
-                await conn.close()
-        
+                await pool.close()
+
         except Exception as e:
             print(f"\n❌ Error: {e}")
             import traceback
             traceback.print_exc()
             raise
 
+    async def load_tracks_streaming(
+        self,
+        limit=None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        tracks_file: Optional[Path] = None,
+        concurrency: int = settings.LOADER_CONCURRENCY,
+        restart: bool = False
+    ):
+        """
+        Bounded-memory load for large metadata dumps (e.g. fma_full):
+        parse -> transform -> copy, a few fixed-size chunks at a time,
+        reading only the columns the transform uses; resumable like load_tracks
+        """
+
+        tracks_file = tracks_file or self.data_path / "tracks.csv"
+        if not tracks_file.exists():
+            print(f"❌ File not found: {tracks_file}")
+            return
+
+        _, header_lines = read_csv_header(tracks_file)
+        total_rows = min(limit, estimate_rows(tracks_file, header_lines)) if limit else estimate_rows(tracks_file, header_lines)
+        loader = BulkLoader(
+            job_id_for(tracks_file, "stream", chunk_size, limit),
+            concurrency=concurrency,
+            total_rows=total_rows
+        )
+
+        print(f"📖 Streaming {tracks_file.name} (~{total_rows} rows) in chunks of {chunk_size}...")
+        pool = await create_loader_pool(loader.concurrency)
+        started = time.perf_counter()
+
+        try:
+            if restart:
+                await loader.reset(pool)
+
+            chunks = stream_csv_chunks(tracks_file, SOURCE_COLUMNS, chunk_size=chunk_size, limit=limit)
+            loaded_count = await loader.run(pool, chunks, prepare_chunk)
+
+            total_count = await pool.fetchval("SELECT COUNT(*) FROM tracks")
+        finally:
+            await pool.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"\n" + "="*50)
+        print(f"✅ Streaming load complete in {elapsed:.1f}s")
+        print(f"📊 New tracks loaded: {loaded_count} of {loader.rows}")
+        print(f"💾 Peak RSS: {peak_rss_mb():.0f} MB")
+        print(f"🎵 Total tracks in database: {total_count}")
+        print("="*50)
+
+    async def load_audio_features(self, batch_size: int = BATCH_SIZE):
+        """
+        Join echonest.csv (and loudness from features.csv) onto the loaded
+        tracks and mark which tracks have real audio features
+        Run after load_tracks; only the needed columns are parsed
+        """
+
+        echonest_file = self.data_path / "echonest.csv"
+        features_file = self.data_path / "features.csv"
+        if not echonest_file.exists():
+            print(f"❌ File not found: {echonest_file}")
+            return
+
+        started = time.perf_counter()
+        print("📖 Reading echonest.csv...")
+        echonest = read_columns(echonest_file, list(ECHONEST_FEATURES.values()), header_rows=3)
+
+        rmse = None
+        if features_file.exists():
+            print("📖 Reading features.csv (RMS energy only)...")
+            rmse = read_columns(features_file, [RMSE_COLUMN], header_rows=3)[RMSE_COLUMN]
+
+        features = transform_features(echonest, rmse)
+        print(f"⚡ Joined {len(features)} feature rows in {time.perf_counter() - started:.2f}s "
+              f"({int(features['has_audio_features'].sum())} with Echo Nest features)")
+
+        conn = await asyncpg.connect(settings.POSTGRES_URL)
+        updated = 0
+
+        try:
+            for start in range(0, len(features), batch_size):
+                updated += await copy_features(conn, to_records(features.iloc[start:start + batch_size]))
+                print(f"  ✅ {min(start + batch_size, len(features))}/{len(features)} feature rows processed...")
+
+            with_features = await conn.fetchval("SELECT COUNT(*) FROM tracks WHERE has_audio_features")
+            total_count = await conn.fetchval("SELECT COUNT(*) FROM tracks")
+        finally:
+            await conn.close()
+
+        print(f"\n" + "="*50)
+        print(f"✅ Audio features joined in {time.perf_counter() - started:.1f}s")
+        print(f"📊 Tracks updated: {updated}")
+        print(f"🎛️  Tracks with real audio features: {with_features}/{total_count}")
+        print("="*50)
+
 async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load the FMA dataset into PostgreSQL")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--stream", action="store_true", help="Bounded-memory chunked load")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE)
+    parser.add_argument("--file", default=None, help="tracks.csv to stream (default: data/fma_metadata)")
+    parser.add_argument("--skip-features", action="store_true", help="Don't join echonest.csv/features.csv")
+    parser.add_argument("--concurrency", type=int, default=settings.LOADER_CONCURRENCY, help="Chunks loaded in parallel")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints from an earlier run")
+    args = parser.parse_args()
+
     print("="*50)
     print("🎵 FMA DATASET LOADER (REAL DATA)")
     print("="*50)
-    
+
     loader = FMADatasetLoader()
-    
-    # Load ALL tracks (change this line)
-    await loader.load_tracks(limit=None)  # No limit = ALL tracks!
-    
+
+    # No limit = ALL tracks!
+    if args.stream:
+        await loader.load_tracks_streaming(
+            limit=args.limit,
+            chunk_size=args.chunk_size,
+            tracks_file=Path(args.file) if args.file else None,
+            concurrency=args.concurrency,
+            restart=args.restart
+        )
+    else:
+        await loader.load_tracks(limit=args.limit, concurrency=args.concurrency, restart=args.restart)
+
+    if not args.skip_features:
+        await loader.load_audio_features()
+
     print("\n✅ All done! Real tracks are loaded.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+import hashlib
+from typing import Dict, Optional
+from fastapi import Request, Response
+
+# Cache-Control policies per kind of resource. Everything sits behind
+# auth, so responses are private (browser cache only, never shared)
+CATALOG_CACHE_CONTROL = "private, max-age=300"
+POPULAR_CACHE_CONTROL = "private, max-age=60"
+PERSONALIZED_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the versions a response was derived from"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2)"""
+
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_headers(etag: str, cache_control: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """304 response when the client already holds this ETag, else None"""
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag, cache_control))
+    return None
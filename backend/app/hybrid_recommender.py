@@ -6,6 +6,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Dict, Optional
 from .recommender import get_recommender
 from .user_profiler import get_profiler
+from .play_history_store import get_play_history_store
 
 class HybridRecommender:
     """
@@ -39,7 +40,8 @@ class HybridRecommender:
         print(f"🔄 Generating hybrid recommendations for user: {user_id}")
         
         # Check if user has enough history
-        play_count = await db.play_history.count_documents({"user_id": user_id})
+        play_store = get_play_history_store()
+        play_count = await play_store.count_plays(user_id, db)
         like_count = await db.likes.count_documents({"user_id": user_id})
         
         print(f"📊 User history: {play_count} plays, {like_count} likes")
@@ -47,7 +49,7 @@ class HybridRecommender:
         # Get played tracks to exclude
         played_track_ids = []
         if exclude_played:
-            played_track_ids = await db.play_history.distinct("track_id", {"user_id": user_id})
+            played_track_ids = await play_store.played_track_ids(user_id, db)
             print(f"🚫 Excluding {len(played_track_ids)} already played tracks")
         
         # Strategy selection based on user history
@@ -135,9 +137,7 @@ class HybridRecommender:
         """
         
         # Get user's recent plays
-        recent_plays = await db.play_history.find(
-            {"user_id": user_id}
-        ).sort("played_at", -1).limit(5).to_list(length=5)
+        recent_plays = await get_play_history_store().recent_plays(user_id, db, limit=5)
         
         if not recent_plays:
             return await self._cold_start_recommendations(conn, exclude_ids, limit)
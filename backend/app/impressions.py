@@ -0,0 +1,132 @@
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from .event_buffer import get_event_buffer
+
+# Short codes embedded in impression ids: ids that aren't ours are
+# rejected without a lookup
+ALGORITHM_CODES = {
+    "content_based_similarity": "sim",
+    "genre_based": "gen",
+    "popularity_based": "pop",
+    "personalized_content_based": "pcb",
+    "cold_start_popular": "csp",
+    "hybrid_multi_strategy": "hyb",
+}
+CODE_ALGORITHMS = {code: algorithm for algorithm, code in ALGORITHM_CODES.items()}
+
+
+def new_impression_id(algorithm: str) -> str:
+    """Compact impression id: '<algorithm code>.<random hex>'"""
+    return f"{ALGORITHM_CODES.get(algorithm, 'unk')}.{uuid.uuid4().hex[:16]}"
+
+
+def algorithm_of(impression_id: Optional[str]) -> Optional[str]:
+    """Algorithm an impression id was issued for, or None if it isn't one of ours"""
+    if not impression_id or "." not in impression_id:
+        return None
+    return CODE_ALGORITHMS.get(impression_id.split(".", 1)[0])
+
+
+class ImpressionVerifier:
+    """
+    Checks that feedback names an impression that was really served to
+    that user and included that track, before it is attributed
+    Runs in the event buffer's flusher, never on the request path.
+    Impressions served by this process are known immediately; the rest of
+    a batch's impression ids are fetched with one $in query and kept in a
+    bounded LRU, along with ids found nowhere (cached as unknown)
+    """
+
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max_size
+        self.impressions: "OrderedDict[str, Optional[Tuple[str, str, FrozenSet[str]]]]" = OrderedDict()
+        self.stats = {"verified": 0, "rejected": 0, "lookups": 0, "unknown": 0}
+
+    def _cache(self, impression_id: str, entry: Optional[Tuple[str, str, FrozenSet[str]]]):
+        self.impressions[impression_id] = entry
+        self.impressions.move_to_end(impression_id)
+        while len(self.impressions) > self.max_size:
+            self.impressions.popitem(last=False)
+
+    def remember(self, impression_id: str, user_id: str, algorithm: str, track_ids: List[str]):
+        self._cache(impression_id, (user_id, algorithm, frozenset(track_ids)))
+
+    def mark_unknown(self, impression_id: str):
+        """Cache an impression id that was looked up and never found"""
+        self.stats["unknown"] += 1
+        self._cache(impression_id, None)
+
+    async def load(self, db, impression_ids: Iterable[str]) -> Set[str]:
+        """
+        Fetch every impression not cached yet in one query
+        Returns the ids (of ours) that were not found
+        """
+
+        missing = {
+            impression_id for impression_id in impression_ids
+            if algorithm_of(impression_id) is not None and impression_id not in self.impressions
+        }
+        if not missing or db is None:
+            return missing
+
+        self.stats["lookups"] += 1
+        cursor = db.recommendation_impressions.find(
+            {"impression_id": {"$in": list(missing)}},
+            {"_id": 0, "impression_id": 1, "user_id": 1, "algorithm": 1, "track_ids": 1}
+        )
+        async for impression in cursor:
+            self.remember(impression["impression_id"], impression["user_id"], impression["algorithm"], impression["track_ids"])
+            missing.discard(impression["impression_id"])
+        return missing
+
+    def attribute(self, impression_id: str, user_id: str, track_id: str) -> Optional[str]:
+        """Algorithm to attribute the feedback to, or None if it doesn't check out (call load first)"""
+
+        entry = self.impressions.get(impression_id)
+        if entry is None:
+            self.stats["rejected"] += 1
+            return None
+
+        served_to, algorithm, track_ids = entry
+        if served_to != user_id or track_id not in track_ids:
+            self.stats["rejected"] += 1
+            return None
+
+        self.stats["verified"] += 1
+        return algorithm
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "size": len(self.impressions), "max_size": self.max_size}
+
+
+def log_impression(user_id: str, algorithm: str, recommendations: List[Dict]) -> str:
+    """
+    Record that a list of recommendations was served and return its id
+    Best effort and non-blocking: handed to the event buffer without
+    waiting, so the recommendation path never waits on MongoDB
+    """
+
+    impression_id = new_impression_id(algorithm)
+    track_ids = [track["track_id"] for track in recommendations]
+    get_impression_verifier().remember(impression_id, user_id, algorithm, track_ids)
+    get_event_buffer().offer("impression", {
+        "impression_id": impression_id,
+        "user_id": user_id,
+        "algorithm": algorithm,
+        "track_ids": track_ids,
+        "created_at": datetime.utcnow()
+    })
+    return impression_id
+
+
+# Singleton instance
+_impression_verifier_instance = None
+
+def get_impression_verifier() -> ImpressionVerifier:
+    """Get or create the impression verifier"""
+    global _impression_verifier_instance
+    if _impression_verifier_instance is None:
+        _impression_verifier_instance = ImpressionVerifier()
+    return _impression_verifier_instance
@@ -0,0 +1,21 @@
+from typing import Dict
+from .event_buffer import get_event_buffer
+from .event_journal import get_event_journal
+from .sketches import get_activity_sketches
+
+
+async def record_event(kind: str, document: Dict) -> str:
+    """
+    Ingest one user activity event
+    Journaled durably first, then queued for the bulk MongoDB writer,
+    which bumps the user's cache generation once the event is written
+    (so ETags and cached recommendations never outlive stale history).
+    Events carrying an impression id are attributed to the recommendation
+    algorithm that served the track by the event buffer, once written and
+    checked against the impression (likes only when new)
+    """
+
+    event_id = await get_event_journal().append(kind, document)
+    await get_event_buffer().enqueue(kind, document)
+    get_activity_sketches().record(kind, document)
+    return event_id
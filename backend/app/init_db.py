@@ -1,6 +1,7 @@
 import asyncpg
 from dotenv import load_dotenv
 from .config import settings
+from .bulk_loader import LOAD_JOBS_DDL
 import asyncio
 import os
 
@@ -33,9 +34,22 @@ async def init_postgres_tables():
                 liveness FLOAT,
                 speechiness FLOAT,
                 loudness FLOAT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                has_audio_features BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # Existing tables: tracks without real (Echo Nest) features hold defaults
+        await conn.execute("""
+            ALTER TABLE tracks ADD COLUMN IF NOT EXISTS has_audio_features BOOLEAN NOT NULL DEFAULT FALSE
+        """)
+        # Existing tables: tracks count as last changed when created
+        # (the Parquet export's watermark)
+        await conn.execute("""
+            ALTER TABLE tracks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+            UPDATE tracks SET updated_at = created_at WHERE updated_at IS NULL;
+            ALTER TABLE tracks ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+        """)
         print("✅ Tracks table created")
         
         # Artists table
@@ -50,6 +64,10 @@ async def init_postgres_tables():
         """)
         print("✅ Artists table created")
         
+        # Bulk loader checkpoints (one row per loaded chunk)
+        await conn.execute(LOAD_JOBS_DDL)
+        print("✅ Load jobs table created")
+        
         # Create indexes for faster queries
         await conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_tracks_artist ON tracks(artist);
@@ -60,6 +78,9 @@ async def init_postgres_tables():
         await conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_tracks_year ON tracks(year);
         """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tracks_updated_at ON tracks(updated_at);
+        """)
         print("✅ Indexes created")
         
         print("✅ PostgreSQL tables created successfully!")
@@ -13,7 +13,11 @@ async def init_mongodb_collections():
         print("🔄 Creating collections...")
         
         # Create collections
-        collections = ['users', 'play_history', 'likes', 'skips', 'user_vectors']
+        collections = [
+            'users', 'play_history', 'play_buckets', 'likes', 'skips', 'user_vectors',
+            'analytics_sketches', 'analytics_hourly', 'analytics_daily',
+            'recommendation_impressions', 'recommendation_feedback', 'algorithm_counters'
+        ]
         
         existing_collections = await db.list_collection_names()
         
@@ -30,9 +34,29 @@ async def init_mongodb_collections():
         await db.users.create_index("email", unique=True)
         await db.users.create_index("user_id", unique=True)
         await db.play_history.create_index([("user_id", 1), ("played_at", -1)])
+        await db.play_buckets.create_index([("user_id", 1), ("day", -1)], unique=True)
         await db.likes.create_index([("user_id", 1), ("track_id", 1)], unique=True)
         await db.skips.create_index([("user_id", 1), ("track_id", 1)])
+        # Event ids from the journal make replays idempotent
+        await db.play_history.create_index("event_id", unique=True, sparse=True)
+        await db.skips.create_index("event_id", unique=True, sparse=True)
         await db.user_vectors.create_index("user_id", unique=True)
+        await db.analytics_sketches.create_index([("day", 1)])
+        await db.analytics_daily.create_index([("start", 1)])
+        # Time-range scans used by rollup compaction
+        await db.play_history.create_index([("played_at", 1)])
+        await db.play_buckets.create_index([("day", 1)])
+        # Buckets written to since the last Parquet export
+        await db.play_buckets.create_index([("updated_at", 1)])
+        await db.likes.create_index([("liked_at", 1)])
+        await db.skips.create_index([("skipped_at", 1)])
+        await db.recommendation_feedback.create_index([("timestamp", 1)])
+        # Impression -> feedback joins for offline CTR analysis
+        await db.recommendation_impressions.create_index("impression_id", unique=True)
+        await db.recommendation_impressions.create_index([("created_at", 1)])
+        await db.recommendation_feedback.create_index("impression_id", sparse=True)
+        # Hourly rollups are only read for the current day; daily ones are kept
+        await db.analytics_hourly.create_index([("start", 1)], expireAfterSeconds=35 * 24 * 3600)
         
         print("✅ MongoDB collections and indexes created successfully!")
         
@@ -1,8 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from .config import settings
-from .database import connect_mongodb, close_mongodb, connect_postgres, close_postgres
+from .database import connect_mongodb, close_mongodb, connect_postgres, close_postgres, get_postgres
+from .auth import get_password_hasher, get_token_cache
+from .cache_manager import get_cache_manager
+from .impressions import get_impression_verifier
+from .search_index import get_search_index
+from .fast_json import TimedORJSONResponse
+from .metrics import TimingMiddleware, get_metrics_registry, pool_stats
+from .event_buffer import get_event_buffer
+from .event_journal import get_event_journal
+from .sketches import get_activity_sketches
+from .rollups import get_rollup_compactor
 from .routes import auth_routes, music_routes, recommendation_routes, analytics_routes
 
 @asynccontextmanager
@@ -11,9 +22,17 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting Music Recommender API...")
     await connect_mongodb()
     await connect_postgres()
+    await get_event_journal().open()
+    await get_event_buffer().start()
+    await get_activity_sketches().start()
+    await get_rollup_compactor().start()
     yield
     # Shutdown
     print("🛑 Shutting down...")
+    await get_event_journal().close()
+    await get_event_buffer().stop()
+    await get_activity_sketches().stop()
+    await get_rollup_compactor().stop()
     await close_mongodb()
     await close_postgres()
 
@@ -21,7 +40,8 @@ app = FastAPI(
     title="Music Recommender API",
     description="Hybrid music recommendation system with analytics",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedORJSONResponse
 )
 
 # CORS
@@ -33,6 +53,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing (outermost, so it covers every other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+    metrics = get_metrics_registry()
+    metrics.register("postgres_pool", lambda: pool_stats(get_postgres()))
+    metrics.register("cache", lambda: get_cache_manager().get_stats())
+    metrics.register("password_hasher", lambda: get_password_hasher().get_stats())
+    metrics.register("token_cache", lambda: get_token_cache().get_stats())
+    metrics.register("event_buffer", lambda: get_event_buffer().get_stats())
+    metrics.register("impressions", lambda: get_impression_verifier().get_stats())
+    metrics.register("search_index", lambda: get_search_index().get_stats())
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus text exposition (per worker process)"""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(auth_routes.router)
 app.include_router(music_routes.router)
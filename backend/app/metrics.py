@@ -0,0 +1,290 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncpg
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Seconds; roughly Prometheus' defaults with finer steps under 100ms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Span name -> Server-Timing description
+SPAN_DESCRIPTIONS = {
+    "pg": "PostgreSQL",
+    "mongo": "MongoDB",
+    "score": "Recommendation scoring",
+    "search": "Search index",
+    "serialize": "Response serialization",
+}
+
+
+class RequestSpans:
+    """
+    Time per span name for one request
+    Motor runs commands on its executor threads (with a copy of the
+    request's context), so additions are locked
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.durations[name] += seconds
+
+
+_current_spans: ContextVar[Optional[RequestSpans]] = ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(name: str, exclude: Tuple[str, ...] = ()):
+    """
+    Add the block's wall time to the current request's `name` span (no-op
+    outside a request); time recorded meanwhile in the `exclude` spans is
+    subtracted, e.g. the queries a scoring call makes
+    """
+    spans = _current_spans.get()
+    if spans is None:
+        yield
+        return
+    excluded = sum(spans.durations.get(other, 0.0) for other in exclude)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        elapsed -= sum(spans.durations.get(other, 0.0) for other in exclude) - excluded
+        spans.add(name, max(elapsed, 0.0))
+
+
+def scoring():
+    """Span for recommender work, net of its database time"""
+    return span("score", exclude=("pg", "mongo"))
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Per-process request metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.span_latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+        # name -> callable returning a stats dict, sampled at scrape time
+        self.collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, spans: RequestSpans):
+        self.requests[(method, route, str(status))] += 1
+        key = (method, route)
+        if key not in self.latency:
+            self.latency[key] = Histogram()
+        self.latency[key].observe(seconds)
+
+        for name, duration in spans.durations.items():
+            span_key = (method, route, name)
+            if span_key not in self.span_latency:
+                self.span_latency[span_key] = Histogram()
+            self.span_latency[span_key].observe(duration)
+
+    def register(self, name: str, collector: Callable[[], Dict]):
+        self.collectors[name] = collector
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        escaped = []
+        for key, value in labels.items():
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def _histogram_lines(self, name: str, histograms: Dict[Tuple, Histogram], label_names: Tuple[str, ...]) -> Iterable[str]:
+        yield f"# TYPE {name} histogram"
+        for key, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                yield f"{name}_bucket{self._labels(**labels, le=bound)} {cumulative}"
+            yield f"{name}_bucket{self._labels(**labels, le='+Inf')} {histogram.count}"
+            yield f"{name}_sum{self._labels(**labels)} {histogram.sum:.6f}"
+            yield f"{name}_count{self._labels(**labels)} {histogram.count}"
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{self._labels(method=method, route=route, status=status)} {count}")
+
+        lines.append("# TYPE http_requests_in_flight gauge")
+        for (method, route), count in sorted(self.in_flight.items()):
+            lines.append(f"http_requests_in_flight{self._labels(method=method, route=route)} {count}")
+
+        lines.extend(self._histogram_lines("http_request_duration_seconds", self.latency, ("method", "route")))
+        lines.extend(self._histogram_lines("http_request_span_seconds", self.span_latency, ("method", "route", "span")))
+
+        # Component stats: every numeric field becomes a gauge
+        for component, collector in self.collectors.items():
+            try:
+                stats = collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector {component} failed: {e}")
+                continue
+            for key, value in (stats or {}).items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    lines.append(f"music_{component}_{key} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware: per-route latency, status counts and in-flight
+    gauges, plus a Server-Timing header built from the request's spans
+    Routes are labelled by their path template, never the raw path
+    """
+
+    def __init__(self, app, registry: Optional["MetricsRegistry"] = None, server_timing: bool = True):
+        self.app = app
+        self.registry = registry or get_metrics_registry()
+        self.server_timing = server_timing
+
+    @staticmethod
+    def _route(scope) -> str:
+        router = scope["app"].router
+        partial = None
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or "unmatched"
+
+    def _server_timing(self, spans: RequestSpans, total: float) -> bytes:
+        entries = [
+            f'{name};dur={duration * 1000:.2f};desc="{SPAN_DESCRIPTIONS.get(name, name)}"'
+            for name, duration in spans.durations.items()
+        ]
+        entries.append(f'app;dur={total * 1000:.2f};desc="Total"')
+        return ", ".join(entries).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        key = (method, route)
+        spans = RequestSpans()
+        token = _current_spans.set(spans)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", self._server_timing(spans, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        self.registry.in_flight[key] += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.registry.in_flight[key] -= 1
+            self.registry.observe_request(method, route, status, time.perf_counter() - started, spans)
+            _current_spans.reset(token)
+
+
+class TimedConnection(asyncpg.Connection):
+    """asyncpg connection class that records query time in the `pg` span"""
+
+    async def execute(self, *args, **kwargs):
+        with span("pg"):
+            return await super().execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        with span("pg"):
+            return await super().executemany(*args, **kwargs)
+
+    async def fetch(self, *args, **kwargs):
+        with span("pg"):
+            return await super().fetch(*args, **kwargs)
+
+    async def fetchrow(self, *args, **kwargs):
+        with span("pg"):
+            return await super().fetchrow(*args, **kwargs)
+
+    async def fetchval(self, *args, **kwargs):
+        with span("pg"):
+            return await super().fetchval(*args, **kwargs)
+
+    async def copy_records_to_table(self, *args, **kwargs):
+        with span("pg"):
+            return await super().copy_records_to_table(*args, **kwargs)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener that records server round trips in the `mongo` span"""
+
+    def started(self, event):
+        pass
+
+    def _record(self, event):
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.add("mongo", event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+
+def pool_stats(pool: Optional[asyncpg.Pool]) -> Dict:
+    if pool is None:
+        return {}
+    return {
+        "size": pool.get_size(),
+        "idle": pool.get_idle_size(),
+        "in_use": pool.get_size() - pool.get_idle_size(),
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+    }
+
+
+# Singleton instance
+_metrics_registry_instance = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get or create the metrics registry"""
+    global _metrics_registry_instance
+    if _metrics_registry_instance is None:
+        _metrics_registry_instance = MetricsRegistry()
+    return _metrics_registry_instance
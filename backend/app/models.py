@@ -36,6 +36,9 @@ class Track(BaseModel):
     danceability: Optional[float] = None
     valence: Optional[float] = None
 
+class TrackBatchRequest(BaseModel):
+    track_ids: List[str] = Field(..., min_length=1, max_length=500)
+
 # User Activity Models
 class PlayEvent(BaseModel):
     user_id: str
@@ -43,17 +46,20 @@ class PlayEvent(BaseModel):
     played_at: datetime = Field(default_factory=datetime.utcnow)
     duration_played: float  # seconds
     completed: bool = False
+    impression_id: Optional[str] = None  # set when played from a recommendation list
 
 class LikeEvent(BaseModel):
     user_id: str
     track_id: str
     liked_at: datetime = Field(default_factory=datetime.utcnow)
+    impression_id: Optional[str] = None
 
 class SkipEvent(BaseModel):
     user_id: str
     track_id: str
     skipped_at: datetime = Field(default_factory=datetime.utcnow)
     position: float  # where in the track they skipped
+    impression_id: Optional[str] = None
 
 # Recommendation Models
 class RecommendationRequest(BaseModel):
@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Optional
+from fastapi import HTTPException
+
+
+def encode_cursor(position: Dict) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor"""
+
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$date": value.isoformat()}
+        return str(value)
+
+    raw = json.dumps(position, default=default, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """Decode a cursor produced by encode_cursor (400 if it's malformed)"""
+
+    if not cursor:
+        return None
+
+    def object_hook(obj):
+        if len(obj) == 1 and "$date" in obj:
+            return datetime.fromisoformat(obj["$date"])
+        return obj
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw, object_hook=object_hook)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return position
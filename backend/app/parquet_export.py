@@ -0,0 +1,327 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+import asyncpg
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from .config import settings
+from .play_history_store import get_play_history_store
+
+WATERMARK_FILE = "_watermarks.json"
+
+# Only export rows written this long ago, so writes still in flight (and
+# clock skew between workers) are picked up by the next run
+EXPORT_LAG = timedelta(minutes=5)
+
+# dataset -> (timestamp column, arrow schema, dictionary-encoded columns)
+# Rows are partitioned and sorted by the timestamp column, but selected by
+# when they were written: the ObjectId's creation time for MongoDB documents
+# (per-play ingested_at in bucket mode) and updated_at for tracks. Events
+# that arrive late (journal replays, imports) land in their date's
+# partition as a new part; a re-exported track's newest row wins
+DATASETS = {
+    "play_history": ("played_at", pa.schema([
+        ("event_id", pa.string()),
+        ("user_id", pa.string()),
+        ("track_id", pa.string()),
+        ("played_at", pa.timestamp("ms")),
+        ("duration_played", pa.float64()),
+        ("completed", pa.bool_()),
+        ("impression_id", pa.string()),
+    ]), {"user_id", "track_id"}),
+    "likes": ("liked_at", pa.schema([
+        ("user_id", pa.string()),
+        ("track_id", pa.string()),
+        ("liked_at", pa.timestamp("ms")),
+        ("impression_id", pa.string()),
+    ]), {"user_id", "track_id"}),
+    "skips": ("skipped_at", pa.schema([
+        ("event_id", pa.string()),
+        ("user_id", pa.string()),
+        ("track_id", pa.string()),
+        ("skipped_at", pa.timestamp("ms")),
+        ("position", pa.float64()),
+        ("impression_id", pa.string()),
+    ]), {"user_id", "track_id"}),
+    "recommendation_feedback": ("timestamp", pa.schema([
+        ("user_id", pa.string()),
+        ("track_id", pa.string()),
+        ("action", pa.string()),
+        ("algorithm", pa.string()),
+        ("impression_id", pa.string()),
+        ("timestamp", pa.timestamp("ms")),
+    ]), {"user_id", "track_id", "action", "algorithm"}),
+    "tracks": ("updated_at", pa.schema([
+        ("track_id", pa.string()),
+        ("title", pa.string()),
+        ("artist", pa.string()),
+        ("album", pa.string()),
+        ("genre", pa.string()),
+        ("year", pa.int32()),
+        ("duration", pa.float64()),
+        ("tempo", pa.float64()),
+        ("energy", pa.float64()),
+        ("danceability", pa.float64()),
+        ("valence", pa.float64()),
+        ("acousticness", pa.float64()),
+        ("instrumentalness", pa.float64()),
+        ("liveness", pa.float64()),
+        ("speechiness", pa.float64()),
+        ("loudness", pa.float64()),
+        ("created_at", pa.timestamp("ms")),
+        ("updated_at", pa.timestamp("ms")),
+    ]), {"artist", "album", "genre"}),
+}
+
+
+def default_export_dir() -> Path:
+    return Path(__file__).parent.parent / "data" / "export"
+
+
+class PartitionWriter:
+    """
+    Writes one dataset as date=YYYY-MM-DD/part-<run>.parquet partitions
+    Rows arrive in timestamp order, so at most one file is open at a time;
+    files are written under a hidden temp name and renamed on commit
+    """
+
+    def __init__(self, root: Path, dataset: str, run_id: str):
+        timestamp_column, schema, dictionary_columns = DATASETS[dataset]
+        self.root = root / dataset
+        self.run_id = run_id
+        self.timestamp_column = timestamp_column
+        self.schema = schema
+        self.dictionary_columns = dictionary_columns
+        self.current_date: Optional[str] = None
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.pending: List[Path] = []
+        self.rows = 0
+
+    def _table(self, rows: List[Dict]) -> pa.Table:
+        arrays = []
+        for field in self.schema:
+            array = pa.array([row.get(field.name) for row in rows], type=field.type)
+            if field.name in self.dictionary_columns:
+                array = array.dictionary_encode()
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, names=self.schema.names)
+
+    def _open(self, date: str, table: pa.Table):
+        directory = self.root / f"date={date}"
+        directory.mkdir(parents=True, exist_ok=True)
+        temp_path = directory / f".part-{self.run_id}.parquet.tmp"
+        self.writer = pq.ParquetWriter(
+            temp_path,
+            table.schema,
+            compression="zstd",
+            use_dictionary=True
+        )
+        self.pending.append(temp_path)
+        self.current_date = date
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.current_date = None
+
+    def write(self, rows: List[Dict]):
+        """Write a chunk, splitting it at date boundaries"""
+
+        start = 0
+        while start < len(rows):
+            date = rows[start][self.timestamp_column].strftime("%Y-%m-%d")
+            end = start
+            while end < len(rows) and rows[end][self.timestamp_column].strftime("%Y-%m-%d") == date:
+                end += 1
+
+            table = self._table(rows[start:end])
+            if date != self.current_date:
+                self._close()
+                self._open(date, table)
+            self.writer.write_table(table)
+            self.rows += end - start
+            start = end
+
+    def commit(self):
+        """Close the last file and move every part to its final name"""
+        self._close()
+        for temp_path in self.pending:
+            os.replace(temp_path, temp_path.with_name(temp_path.name[1:].removesuffix(".tmp")))
+        self.pending.clear()
+
+    def abort(self):
+        self._close()
+        for temp_path in self.pending:
+            temp_path.unlink(missing_ok=True)
+        self.pending.clear()
+
+
+class ParquetExporter:
+    """
+    Incremental, bounded-memory export of activity and catalog to Parquet
+    Each run exports rows written in [watermark, now - lag) per dataset
+    (see DATASETS), streaming rows from
+    MongoDB/Postgres cursors in chunks; watermarks only advance after the
+    run's files are committed, so a failed run is simply repeated
+    """
+
+    def __init__(self, out_dir: Path, chunk_size: int = 50000):
+        self.out_dir = out_dir
+        self.chunk_size = chunk_size
+        self.run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+    def load_watermarks(self) -> Dict[str, datetime]:
+        path = self.out_dir / WATERMARK_FILE
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return {name: datetime.fromisoformat(value) for name, value in json.load(f).items()}
+
+    def save_watermarks(self, watermarks: Dict[str, datetime]):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / WATERMARK_FILE
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({name: value.isoformat() for name, value in watermarks.items()}, f, indent=2)
+        os.replace(temp_path, path)
+
+    async def _mongo_rows(
+        self,
+        db: AsyncIOMotorDatabase,
+        dataset: str,
+        since: Optional[datetime],
+        until: datetime
+    ) -> AsyncIterator[List[Dict]]:
+        timestamp_column = DATASETS[dataset][0]
+        id_range = {"$lt": ObjectId.from_datetime(until)}
+        if since:
+            id_range["$gte"] = ObjectId.from_datetime(since)
+
+        # Document ids double as event ids, except for bucket documents
+        synthesize_ids = True
+        store = get_play_history_store()
+        if dataset == "play_history" and store.bucketed:
+            collection = store.collection(db)
+            pipeline = store.ingested_play_stages(since, until)
+            synthesize_ids = False
+        else:
+            collection = store.collection(db) if dataset == "play_history" else db[dataset]
+            pipeline = [{"$match": {"_id": id_range}}]
+
+        pipeline.append({"$sort": {timestamp_column: 1}})
+        cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=min(self.chunk_size, 10000))
+
+        chunk = []
+        async for document in cursor:
+            if synthesize_ids and "event_id" not in document:
+                document["event_id"] = str(document["_id"])
+            chunk.append(document)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def _track_rows(
+        self,
+        conn: asyncpg.Connection,
+        since: Optional[datetime],
+        until: datetime
+    ) -> AsyncIterator[List[Dict]]:
+        columns = ", ".join(DATASETS["tracks"][1].names)
+        if since:
+            query = f"SELECT {columns} FROM tracks WHERE updated_at >= $1 AND updated_at < $2 ORDER BY updated_at"
+            args = (since, until)
+        else:
+            query = f"SELECT {columns} FROM tracks WHERE updated_at < $1 ORDER BY updated_at"
+            args = (until,)
+
+        chunk = []
+        # Server-side cursor: rows are fetched chunk_size at a time
+        async with conn.transaction():
+            async for record in conn.cursor(query, *args, prefetch=self.chunk_size):
+                chunk.append(dict(record))
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    async def export(
+        self,
+        db: AsyncIOMotorDatabase,
+        pool: Optional[asyncpg.Pool],
+        datasets: List[str],
+        full: bool = False
+    ) -> Dict[str, int]:
+        """Export the given datasets; returns rows written per dataset"""
+
+        watermarks = {} if full else self.load_watermarks()
+        if full and self.load_watermarks():
+            print("⚠️ Full export: parts from earlier runs are kept; remove them to avoid duplicates")
+        until = datetime.utcnow() - EXPORT_LAG
+        written = {}
+
+        for dataset in datasets:
+            since = watermarks.get(dataset)
+            writer = PartitionWriter(self.out_dir, dataset, self.run_id)
+            print(f"📦 Exporting {dataset} from {since.isoformat() if since else 'the beginning'}...")
+
+            try:
+                if dataset == "tracks":
+                    async with pool.acquire() as conn:
+                        async for chunk in self._track_rows(conn, since, until):
+                            writer.write(chunk)
+                            print(f"  ✅ {writer.rows} rows...")
+                else:
+                    async for chunk in self._mongo_rows(db, dataset, since, until):
+                        writer.write(chunk)
+                        print(f"  ✅ {writer.rows} rows...")
+                writer.commit()
+            except BaseException:
+                writer.abort()
+                raise
+
+            watermarks[dataset] = until
+            self.save_watermarks(watermarks)
+            written[dataset] = writer.rows
+
+        return written
+
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export activity and catalog to partitioned Parquet")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--out", default=None, help="Output directory")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks and export everything")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("📦 PARQUET EXPORT")
+    print("="*50)
+
+    exporter = ParquetExporter(Path(args.out) if args.out else default_export_dir(), args.chunk_size)
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    pool = await asyncpg.create_pool(settings.POSTGRES_URL, min_size=1, max_size=2) if "tracks" in args.datasets else None
+
+    try:
+        written = await exporter.export(client.music_recommender, pool, args.datasets, full=args.full)
+        print(f"\n✅ Export complete: {written}")
+    finally:
+        client.close()
+        if pool:
+            await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,440 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from .config import settings
+
+DOCUMENTS = "documents"
+BUCKETS = "buckets"
+
+# Parallel arrays held by each bucket document
+BUCKET_FIELDS = ["track_ids", "played_at", "duration_played", "completed", "event_ids"]
+# Also pushed with every play, but missing for plays written before it
+# existed: it covers a bucket's most recent plays only
+INGESTED_FIELD = "ingested_at"
+
+DUPLICATE_KEY = 11000
+
+
+def bucket_day(played_at: datetime) -> datetime:
+    """Start of the UTC day a play belongs to"""
+    return datetime(played_at.year, played_at.month, played_at.day)
+
+
+def _bucket_push(plays: List[Dict]) -> Dict:
+    """
+    $push/$inc update appending plays to a bucket's arrays
+    Each play also records when it was written (ingested_at, unless the
+    play carries one), and the bucket its latest write (updated_at)
+    """
+    now = datetime.utcnow()
+    ingested_at = [p.get("ingested_at") or now for p in plays]
+    return {
+        "$push": {
+            "track_ids": {"$each": [p["track_id"] for p in plays]},
+            "played_at": {"$each": [p["played_at"] for p in plays]},
+            "duration_played": {"$each": [p.get("duration_played", 0) for p in plays]},
+            "completed": {"$each": [p.get("completed", False) for p in plays]},
+            "event_ids": {"$each": [p.get("event_id") or str(p.get("_id")) for p in plays]},
+            INGESTED_FIELD: {"$each": ingested_at},
+        },
+        "$inc": {"count": len(plays)},
+        "$max": {"updated_at": max(ingested_at)}
+    }
+
+
+def _unpack_bucket(bucket: Dict) -> List[Dict]:
+    """Expand a bucket into play dicts shaped like play_history documents"""
+    return [
+        {
+            "user_id": bucket["user_id"],
+            "track_id": track_id,
+            "played_at": played_at,
+            "duration_played": duration,
+            "completed": completed,
+            "event_id": event_id
+        }
+        for track_id, played_at, duration, completed, event_id in zip(
+            *[bucket.get(field, []) for field in BUCKET_FIELDS]
+        )
+    ]
+
+
+class PlayHistoryStore:
+    """
+    Play history access for both storage modes:
+    - documents: one play_history document per play
+    - buckets: one play_buckets document per user per day, holding
+      compact parallel arrays (track id, timestamp, duration, completion)
+    """
+
+    def __init__(self, mode: str = DOCUMENTS):
+        if mode not in (DOCUMENTS, BUCKETS):
+            raise ValueError(f"Unknown play history storage mode: {mode}")
+        self.mode = mode
+
+    @property
+    def bucketed(self) -> bool:
+        return self.mode == BUCKETS
+
+    @property
+    def collection_name(self) -> str:
+        return "play_buckets" if self.bucketed else "play_history"
+
+    def collection(self, db: AsyncIOMotorDatabase):
+        return db[self.collection_name]
+
+    def write_operations(self, plays: List[Dict]) -> List:
+        """
+        Bulk write operations for new plays
+        In bucket mode plays are grouped into one $push upsert per user-day
+        """
+
+        if not self.bucketed:
+            return [InsertOne(play) for play in plays]
+
+        grouped = defaultdict(list)
+        for play in plays:
+            grouped[(play["user_id"], bucket_day(play["played_at"]))].append(play)
+
+        return [
+            UpdateOne({"user_id": user_id, "day": day}, _bucket_push(day_plays), upsert=True)
+            for (user_id, day), day_plays in grouped.items()
+        ]
+
+    def replay_operation(self, play: Dict):
+        """
+        Idempotent upsert for a single journaled play
+        In bucket mode an already-present event id makes the filter miss,
+        so the upsert hits the unique (user_id, day) index and is rejected
+        """
+
+        if not self.bucketed:
+            return UpdateOne({"event_id": play["event_id"]}, {"$setOnInsert": play}, upsert=True)
+
+        return UpdateOne(
+            {
+                "user_id": play["user_id"],
+                "day": bucket_day(play["played_at"]),
+                "event_ids": {"$ne": play["event_id"]}
+            },
+            _bucket_push([play]),
+            upsert=True
+        )
+
+    async def recent_plays(
+        self,
+        user_id: str,
+        db: AsyncIOMotorDatabase,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Most recent plays for a user, newest first"""
+
+        if not self.bucketed:
+            return await db.play_history.find(
+                {"user_id": user_id}
+            ).sort("played_at", -1).limit(limit).to_list(length=limit)
+
+        plays = []
+        cursor = db.play_buckets.find({"user_id": user_id}).sort("day", -1)
+        async for bucket in cursor:
+            day_plays = _unpack_bucket(bucket)
+            day_plays.sort(key=lambda p: p["played_at"], reverse=True)
+            plays.extend(day_plays)
+            if len(plays) >= limit:
+                break
+
+        return plays[:limit]
+
+    async def history_page(
+        self,
+        user_id: str,
+        db: AsyncIOMotorDatabase,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None
+    ) -> List[Dict]:
+        """
+        A page of plays, newest first, ordered by (played_at, id)
+        `before` is the (played_at, id) of the last play on the previous page;
+        the id is the document _id, or the event id in bucket mode
+        """
+
+        if not self.bucketed:
+            query = {"user_id": user_id}
+            if before:
+                played_at, last_id = before
+                query["$or"] = [
+                    {"played_at": {"$lt": played_at}},
+                    {"played_at": played_at, "_id": {"$lt": ObjectId(last_id)}}
+                ]
+            plays = await db.play_history.find(query).sort(
+                [("played_at", -1), ("_id", -1)]
+            ).limit(limit).to_list(length=limit)
+
+            for play in plays:
+                play["_id"] = str(play["_id"])
+            return plays
+
+        query = {"user_id": user_id}
+        if before:
+            query["day"] = {"$lte": bucket_day(before[0])}
+
+        plays = []
+        cursor = db.play_buckets.find(query).sort("day", -1)
+        async for bucket in cursor:
+            day_plays = _unpack_bucket(bucket)
+            if before:
+                day_plays = [p for p in day_plays if (p["played_at"], p["event_id"]) < before]
+            day_plays.sort(key=lambda p: (p["played_at"], p["event_id"]), reverse=True)
+            plays.extend(day_plays)
+            if len(plays) >= limit:
+                break
+
+        return plays[:limit]
+
+    def page_position(self, play: Dict) -> Tuple[datetime, str]:
+        """(played_at, id) keyset position of a play returned by history_page"""
+        return play["played_at"], play["event_id"] if self.bucketed else play["_id"]
+
+    async def count_plays(
+        self,
+        user_id: str,
+        db: AsyncIOMotorDatabase,
+        since: Optional[datetime] = None
+    ) -> int:
+        """Number of plays by a user (optionally since a point in time)"""
+
+        if not self.bucketed:
+            query = {"user_id": user_id}
+            if since:
+                query["played_at"] = {"$gte": since}
+            return await db.play_history.count_documents(query)
+
+        match = {"user_id": user_id}
+        if since:
+            match["day"] = {"$gte": bucket_day(since)}
+            plays_in_bucket = {"$size": {"$filter": {
+                "input": "$played_at",
+                "cond": {"$gte": ["$$this", since]}
+            }}}
+        else:
+            plays_in_bucket = "$count"
+
+        result = await db.play_buckets.aggregate([
+            {"$match": match},
+            {"$group": {"_id": None, "total": {"$sum": plays_in_bucket}}}
+        ]).to_list(length=1)
+
+        return result[0]["total"] if result else 0
+
+    async def count_all(self, db: AsyncIOMotorDatabase) -> int:
+        """Total plays across all users"""
+
+        if not self.bucketed:
+            return await db.play_history.count_documents({})
+
+        result = await db.play_buckets.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": "$count"}}}
+        ]).to_list(length=1)
+
+        return result[0]["total"] if result else 0
+
+    async def played_track_ids(self, user_id: str, db: AsyncIOMotorDatabase) -> List[str]:
+        """Distinct track ids a user has played"""
+        field = "track_ids" if self.bucketed else "track_id"
+        return await self.collection(db).distinct(field, {"user_id": user_id})
+
+    async def active_user_ids(self, db: AsyncIOMotorDatabase, since: datetime) -> List[str]:
+        """Distinct users with a play since the given time"""
+
+        if not self.bucketed:
+            return await db.play_history.distinct("user_id", {"played_at": {"$gte": since}})
+
+        return await db.play_buckets.distinct(
+            "user_id",
+            {"day": {"$gte": bucket_day(since)}, "played_at": {"$gte": since}}
+        )
+
+    def play_stages(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        Aggregation stages producing one flat document per play
+        ({user_id, track_id, played_at, duration_played, completed})
+        """
+
+        if not self.bucketed:
+            match = {}
+            if user_id:
+                match["user_id"] = user_id
+            if since:
+                match["played_at"] = {"$gte": since}
+            return [{"$match": match}]
+
+        match = {}
+        if user_id:
+            match["user_id"] = user_id
+        if since:
+            match["day"] = {"$gte": bucket_day(since)}
+
+        stages = [
+            {"$match": match},
+            {"$project": {
+                "user_id": 1,
+                "plays": {"$zip": {"inputs": [
+                    "$track_ids", "$played_at", "$duration_played", "$completed"
+                ]}}
+            }},
+            {"$unwind": "$plays"},
+            {"$project": {
+                "user_id": 1,
+                "track_id": {"$arrayElemAt": ["$plays", 0]},
+                "played_at": {"$arrayElemAt": ["$plays", 1]},
+                "duration_played": {"$arrayElemAt": ["$plays", 2]},
+                "completed": {"$arrayElemAt": ["$plays", 3]}
+            }}
+        ]
+        if since:
+            stages.append({"$match": {"played_at": {"$gte": since}}})
+
+        return stages
+
+    def ingested_play_stages(self, since: Optional[datetime], until: datetime) -> List[Dict]:
+        """
+        Bucket mode: one flat document per play (with its event_id) written
+        in [since, until), whenever it was played
+        Plays written before ingest times were recorded count as written
+        before any `since`
+        """
+
+        if since:
+            ingested = {"$gte": since, "$lt": until}
+        else:
+            ingested = {"$not": {"$gte": until}}
+
+        # ingested_at lines up with the last len(ingested_at) plays
+        offset = {"$subtract": [{"$size": "$track_ids"}, {"$size": {"$ifNull": [f"${INGESTED_FIELD}", []]}}]}
+
+        return [
+            {"$match": {"updated_at": {"$gte": since}} if since else {}},
+            {"$project": {
+                "user_id": 1,
+                "plays": {"$let": {"vars": {"offset": offset}, "in": {"$map": {
+                    "input": {"$range": [0, {"$size": "$track_ids"}]},
+                    "as": "i",
+                    "in": {
+                        "track_id": {"$arrayElemAt": ["$track_ids", "$$i"]},
+                        "played_at": {"$arrayElemAt": ["$played_at", "$$i"]},
+                        "duration_played": {"$arrayElemAt": ["$duration_played", "$$i"]},
+                        "completed": {"$arrayElemAt": ["$completed", "$$i"]},
+                        "event_id": {"$arrayElemAt": ["$event_ids", "$$i"]},
+                        "ingested_at": {"$cond": [
+                            {"$gte": ["$$i", "$$offset"]},
+                            {"$arrayElemAt": [f"${INGESTED_FIELD}", {"$subtract": ["$$i", "$$offset"]}]},
+                            None
+                        ]}
+                    }
+                }}}}
+            }},
+            {"$unwind": "$plays"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$plays", {"user_id": "$user_id"}]}}},
+            {"$match": {"ingested_at": ingested}}
+        ]
+
+
+async def migrate_to_buckets(db: AsyncIOMotorDatabase, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Copy play_history documents into play_buckets (safe to re-run)
+    A user-day whose plays are already present is skipped as a whole
+    """
+
+    store = PlayHistoryStore(BUCKETS)
+    stats = {"plays": 0, "buckets": 0, "skipped_buckets": 0}
+    operations = []
+
+    async def flush():
+        if not operations:
+            return
+        try:
+            result = await db.play_buckets.bulk_write(operations, ordered=False)
+            stats["buckets"] += result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            stats["skipped_buckets"] += len(errors)
+            stats["buckets"] += len(operations) - len(errors)
+        operations.clear()
+        print(f"  ✅ {stats['plays']} plays migrated...")
+
+    def bucket_operation(key, plays):
+        user_id, day = key
+        plays.sort(key=lambda p: p["played_at"])
+        event_ids = [p.get("event_id") or str(p["_id"]) for p in plays]
+        return UpdateOne(
+            {"user_id": user_id, "day": day, "event_ids": {"$nin": event_ids}},
+            _bucket_push(plays),
+            upsert=True
+        )
+
+    current_key = None
+    current_plays: List[Dict] = []
+
+    cursor = db.play_history.find({}).sort([("user_id", 1), ("played_at", -1)])
+    async for play in cursor:
+        # Written when the document was: already exported in documents mode
+        play["ingested_at"] = play["_id"].generation_time.replace(tzinfo=None)
+        key = (play["user_id"], bucket_day(play["played_at"]))
+        if key != current_key and current_plays:
+            operations.append(bucket_operation(current_key, current_plays))
+            current_plays = []
+            if len(operations) >= batch_size:
+                await flush()
+        current_key = key
+        current_plays.append(play)
+        stats["plays"] += 1
+
+    if current_plays:
+        operations.append(bucket_operation(current_key, current_plays))
+    await flush()
+
+    return stats
+
+
+# Singleton instance
+_store_instance = None
+
+def get_play_history_store() -> PlayHistoryStore:
+    """Get or create play history store instance"""
+    global _store_instance
+    if _store_instance is None:
+        _store_instance = PlayHistoryStore(settings.PLAY_HISTORY_STORAGE)
+    return _store_instance
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    print("="*50)
+    print("🎵 PLAY HISTORY → DAILY BUCKETS MIGRATION")
+    print("="*50)
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client.music_recommender
+
+    try:
+        await db.play_buckets.create_index([("user_id", 1), ("day", -1)], unique=True)
+        stats = await migrate_to_buckets(db)
+        print(f"\n✅ Migration complete: {stats}")
+        print("💡 Set PLAY_HISTORY_STORAGE=buckets to read and write buckets")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
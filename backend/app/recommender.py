@@ -1,11 +1,17 @@
+import asyncio
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics.pairwise import cosine_similarity
 import asyncpg
 from .config import settings
+from .search_index import get_search_index
 from typing import List, Dict
 import json
 
+# Failed search index builds are retried this many times, backing off
+SEARCH_INDEX_BUILD_RETRIES = 3
+SEARCH_INDEX_RETRY_DELAY_S = 5.0
+
 class ContentBasedRecommender:
     """
     Content-based recommendation engine
@@ -22,6 +28,18 @@ class ContentBasedRecommender:
         self.tracks_cache = None
         self.features_cache = None
         self.track_ids_cache = None
+        self.feature_mask = None
+        self.track_index = {}
+        # Catalog tracks with no tempo/energy: served by lookups, never scored
+        self.unscored_tracks = {}
+        self.track_fragments = {}
+        self.genre_counts = {}
+        self.catalog_watermark = None
+        self.catalog_version = 0
+        # SELECT list of a catalog track (set at load); Postgres fallbacks
+        # use it too, so a lookup returns the same fields wherever it hits
+        self.track_columns = None
+        self._search_index_build = None
     
     async def load_all_tracks(self, conn):
         """Load all tracks and their features into memory for fast computation"""
@@ -31,9 +49,27 @@ class ContentBasedRecommender:
         
         print("🔄 Loading track features into memory...")
         
+        # Read the watermark first: anything created after it may be missing
+        watermark = await conn.fetchval("SELECT MAX(created_at) FROM tracks")
+        
+        # Databases created before has_audio_features existed: every track
+        # with tempo/energy is taken to have real features
+        has_flag = await conn.fetchval("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'tracks' AND column_name = 'has_audio_features'
+            )
+        """)
+        if not has_flag:
+            print("⚠️ tracks.has_audio_features is missing (run init_db); treating all tracks as featured")
+        flag_column = "has_audio_features" if has_flag else "TRUE AS has_audio_features"
+        track_columns = (
+            f"track_id, title, artist, album, genre, year, duration, "
+            f"{', '.join(self.feature_columns)}, {flag_column}, created_at"
+        )
+        
         query = f"""
-            SELECT track_id, title, artist, album, genre, year,
-                   {', '.join(self.feature_columns)}
+            SELECT {track_columns}
             FROM tracks
             WHERE tempo IS NOT NULL 
             AND energy IS NOT NULL
@@ -45,8 +81,29 @@ class ContentBasedRecommender:
         if not tracks:
             raise Exception("No tracks found in database!")
         
+        unscored = await conn.fetch(f"""
+            SELECT {track_columns}
+            FROM tracks
+            WHERE tempo IS NULL
+            OR energy IS NULL
+            ORDER BY track_id
+        """)
+        
         self.tracks_cache = [dict(track) for track in tracks]
         self.track_ids_cache = [track['track_id'] for track in self.tracks_cache]
+        self.track_index = {track_id: i for i, track_id in enumerate(self.track_ids_cache)}
+        self.track_fragments = {}
+        self.unscored_tracks = {track['track_id']: dict(track) for track in unscored}
+        
+        genre_counts = {}
+        for track in self.tracks_cache + list(self.unscored_tracks.values()):
+            if track['genre']:
+                genre_counts[track['genre']] = genre_counts.get(track['genre'], 0) + 1
+        self.genre_counts = dict(sorted(genre_counts.items()))
+        
+        self.catalog_watermark = watermark
+        self.track_columns = track_columns
+        self.catalog_version += 1
         
         # Extract feature matrix
         features = []
@@ -55,12 +112,66 @@ class ContentBasedRecommender:
             features.append(feature_vector)
         
         features_array = np.array(features)
+        self.feature_mask = np.array([bool(track['has_audio_features']) for track in self.tracks_cache])
         
-        # Normalize features
-        self.features_cache = self.scaler.fit_transform(features_array)
+        # Normalize features (scaled on real features only, when there are any,
+        # so the pile of default rows doesn't squash the distribution)
+        fit_rows = features_array[self.feature_mask] if self.feature_mask.any() else features_array
+        self.scaler.fit(fit_rows)
+        self.features_cache = self.scaler.transform(features_array)
         
-        print(f"✅ Loaded {len(self.tracks_cache)} tracks")
+        print(f"✅ Loaded {len(self.tracks_cache)} tracks ({len(self.unscored_tracks)} more without features, lookup only)")
         print(f"📊 Feature matrix shape: {self.features_cache.shape}")
+        print(f"🎛️  Tracks with real audio features: {int(self.feature_mask.sum())}")
+        
+        # Build the search index off the event loop; search falls back
+        # to Postgres until it's ready
+        self._build_search_index(self.tracks_cache + list(self.unscored_tracks.values()), self.catalog_version)
+    
+    def _build_search_index(self, tracks: List[Dict], version: int, attempt: int = 1):
+        """
+        Run a search index build in the executor; a failure is logged,
+        counted in the index stats and retried unless the catalog has
+        been reloaded since
+        """
+        
+        if version != self.catalog_version:
+            return
+        
+        loop = asyncio.get_running_loop()
+        index = get_search_index()
+        
+        def done(future: asyncio.Future):
+            if future.cancelled() or future.exception() is None:
+                return
+            error = future.exception()
+            index.record_failure(error)
+            if attempt > SEARCH_INDEX_BUILD_RETRIES:
+                print(f"❌ Search index build failed ({attempt} attempts), search stays on PostgreSQL: {error}")
+                return
+            delay = SEARCH_INDEX_RETRY_DELAY_S * attempt
+            print(f"⚠️ Search index build failed, retrying in {delay:.0f}s: {error}")
+            loop.call_later(delay, self._build_search_index, tracks, version, attempt + 1)
+        
+        self._search_index_build = loop.run_in_executor(None, index.build, tracks)
+        self._search_index_build.add_done_callback(done)
+    
+    def _apply_feature_policy(self, similarities: np.ndarray) -> np.ndarray:
+        """
+        Exclude (-inf) or down-weight tracks without real audio features,
+        per settings.FEATURELESS_TRACKS (a no-op when no track has any)
+        """
+        
+        policy = settings.FEATURELESS_TRACKS
+        if policy == "include" or self.feature_mask is None or self.feature_mask.all() or not self.feature_mask.any():
+            return similarities
+        
+        featureless = ~self.feature_mask
+        if policy == "exclude":
+            return np.where(featureless, -np.inf, similarities)
+        
+        # Only scale positive scores, so down-weighting never raises one
+        return np.where(featureless & (similarities > 0), similarities * settings.FEATURELESS_WEIGHT, similarities)
     
     async def get_similar_tracks(
         self,
@@ -78,16 +189,15 @@ class ContentBasedRecommender:
         await self.load_all_tracks(conn)
         
         # Find the track index
-        if track_id not in self.track_ids_cache:
+        track_idx = self.track_index.get(track_id)
+        if track_idx is None:
             return []
         
-        track_idx = self.track_ids_cache.index(track_id)
-        
         # Get feature vector for this track
         query_features = self.features_cache[track_idx].reshape(1, -1)
         
         # Calculate cosine similarity with all tracks
-        similarities = cosine_similarity(query_features, self.features_cache)[0]
+        similarities = self._apply_feature_policy(cosine_similarity(query_features, self.features_cache)[0])
         
         # Get indices of most similar tracks (excluding the query track itself)
         similar_indices = np.argsort(similarities)[::-1]
@@ -160,12 +270,14 @@ class ContentBasedRecommender:
         query_normalized = self.scaler.transform(query_vector)
         
         # Calculate similarities
-        similarities = cosine_similarity(query_normalized, self.features_cache)[0]
+        similarities = self._apply_feature_policy(cosine_similarity(query_normalized, self.features_cache)[0])
         similar_indices = np.argsort(similarities)[::-1]
         
         # Get top matches
         recommendations = []
         for idx in similar_indices[:limit]:
+            if not np.isfinite(similarities[idx]):
+                break
             track = self.tracks_cache[idx].copy()
             track['similarity_score'] = float(similarities[idx])
             recommendations.append(track)
@@ -207,10 +319,11 @@ class ContentBasedRecommender:
         await self.load_all_tracks(conn)
         
         # Get features for all seed tracks
-        seed_indices = []
-        for track_id in seed_track_ids:
-            if track_id in self.track_ids_cache:
-                seed_indices.append(self.track_ids_cache.index(track_id))
+        seed_indices = [
+            self.track_index[track_id]
+            for track_id in seed_track_ids
+            if track_id in self.track_index
+        ]
         
         if not seed_indices:
             return await self.get_popular_tracks(conn, limit)
@@ -220,12 +333,14 @@ class ContentBasedRecommender:
         avg_features = np.mean(seed_features, axis=0).reshape(1, -1)
         
         # Find similar tracks
-        similarities = cosine_similarity(avg_features, self.features_cache)[0]
+        similarities = self._apply_feature_policy(cosine_similarity(avg_features, self.features_cache)[0])
         similar_indices = np.argsort(similarities)[::-1]
         
         # Exclude seed tracks from recommendations
         recommendations = []
         for idx in similar_indices:
+            if not np.isfinite(similarities[idx]):
+                break
             if idx in seed_indices:
                 continue
             
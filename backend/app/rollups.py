@@ -0,0 +1,370 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from .config import settings
+from .database import get_mongodb, get_postgres
+from .catalog import get_catalog
+from .play_history_store import bucket_day, get_play_history_store
+
+HOURLY_COLLECTION = "analytics_hourly"
+DAILY_COLLECTION = "analytics_daily"
+STATE_COLLECTION = "analytics_state"
+STATE_ID = "rollups"
+
+# (collection, timestamp field) for the simple per-hour counters
+EVENT_SOURCES = {
+    "likes": ("likes", "liked_at"),
+    "skips": ("skips", "skipped_at"),
+}
+
+GenreResolver = Callable[[List[str]], Awaitable[Dict[str, Optional[str]]]]
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_of(field: str) -> Dict:
+    """Aggregation expression truncating a date field to its hour"""
+    return {"$dateFromParts": {
+        "year": {"$year": f"${field}"},
+        "month": {"$month": f"${field}"},
+        "day": {"$dayOfMonth": f"${field}"},
+        "hour": {"$hour": f"${field}"}
+    }}
+
+
+async def catalog_genres(track_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Default genre resolver: the in-memory catalog (Postgres for misses)"""
+    tracks = await get_catalog().fetch_tracks(track_ids, get_postgres())
+    return {track_id: track.get('genre') for track_id, track in tracks.items()}
+
+
+def _empty_rollup(start: datetime, granularity: str) -> Dict:
+    return {
+        "start": start,
+        "granularity": granularity,
+        "plays": 0,
+        "likes": 0,
+        "skips": 0,
+        "unique_users": 0,
+        "genres": [],
+        "algorithms": []
+    }
+
+
+class RollupCompactor:
+    """
+    Pre-aggregated hourly and daily analytics rollups
+    A periodic job compacts raw events of closed hours (behind a watermark)
+    into one document per hour, and each closed day into one document per
+    day; rollups are recomputed with $set, so overlapping runs are harmless
+    Unique users are exact per hour and per day (never summed across hours)
+    """
+
+    def __init__(
+        self,
+        interval: float = 300.0,
+        lag: float = 120.0,
+        backfill_days: int = 90,
+        resolve_genres: GenreResolver = catalog_genres
+    ):
+        self.interval = interval
+        self.lag = timedelta(seconds=lag)
+        self.backfill_days = backfill_days
+        self.resolve_genres = resolve_genres
+        self._runner: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the periodic compaction job (called from the app lifespan)"""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.compact(get_mongodb())
+            except Exception as e:
+                print(f"⚠️ Rollup compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def get_state(self, db: AsyncIOMotorDatabase) -> Optional[Dict]:
+        return await db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+
+    async def compact(self, db: AsyncIOMotorDatabase, now: Optional[datetime] = None) -> int:
+        """
+        Roll up every closed hour since the watermark
+        Returns the number of hours processed
+        """
+
+        now = now or datetime.utcnow()
+        until = floor_hour(now - self.lag)
+
+        state = await self.get_state(db)
+        if state:
+            watermark = state["hourly_until"]
+        else:
+            watermark = bucket_day(now) - timedelta(days=self.backfill_days)
+
+        hours = 0
+        while watermark < until:
+            # One day (or the rest of it) per pass keeps each aggregation bounded
+            day_end = bucket_day(watermark) + timedelta(days=1)
+            chunk_end = min(day_end, until)
+
+            await self._compact_hours(db, watermark, chunk_end)
+            hours += int((chunk_end - watermark).total_seconds() // 3600)
+
+            if chunk_end == day_end:
+                await self._compact_day(db, bucket_day(watermark))
+
+            watermark = chunk_end
+            await db[STATE_COLLECTION].update_one(
+                {"_id": STATE_ID},
+                {"$set": {"hourly_until": watermark, "daily_until": bucket_day(watermark), "updated_at": now}},
+                upsert=True
+            )
+
+        return hours
+
+    async def rebuild(self, db: AsyncIOMotorDatabase, since: datetime, now: Optional[datetime] = None) -> int:
+        """
+        Rewind the watermark to the start of `since`'s day and compact again,
+        e.g. after history was written behind it (generated or imported)
+        Returns the number of hours processed
+        """
+
+        now = now or datetime.utcnow()
+        start = bucket_day(since)
+        state = await self.get_state(db)
+        watermark = state["hourly_until"] if state else bucket_day(now) - timedelta(days=self.backfill_days)
+        if start < watermark:
+            await db[STATE_COLLECTION].update_one(
+                {"_id": STATE_ID},
+                {"$set": {"hourly_until": start, "daily_until": start, "updated_at": now}},
+                upsert=True
+            )
+        return await self.compact(db, now)
+
+    async def _compact_hours(self, db: AsyncIOMotorDatabase, start: datetime, end: datetime):
+        """Hourly rollups for [start, end)"""
+
+        play_store = get_play_history_store()
+        rollups: Dict[datetime, Dict] = {}
+
+        def rollup(hour: datetime) -> Dict:
+            if hour not in rollups:
+                rollups[hour] = _empty_rollup(hour, "hour")
+            return rollups[hour]
+
+        in_range = {"played_at": {"$gte": start, "$lt": end}}
+
+        # Plays per (hour, track) -> plays and per-genre plays
+        track_plays = await play_store.collection(db).aggregate(
+            play_store.play_stages(since=start) + [
+                {"$match": in_range},
+                {"$group": {"_id": {"hour": _hour_of("played_at"), "track_id": "$track_id"}, "count": {"$sum": 1}}}
+            ],
+            allowDiskUse=True
+        ).to_list(length=None)
+
+        genres = await self.resolve_genres(list({row["_id"]["track_id"] for row in track_plays}))
+        genre_plays = defaultdict(lambda: defaultdict(int))
+        for row in track_plays:
+            hour = row["_id"]["hour"]
+            rollup(hour)["plays"] += row["count"]
+            genre_plays[hour][genres.get(row["_id"]["track_id"]) or "Unknown"] += row["count"]
+
+        for hour, counts in genre_plays.items():
+            rollup(hour)["genres"] = [
+                {"genre": genre, "plays": count}
+                for genre, count in sorted(counts.items(), key=lambda g: -g[1])
+            ]
+
+        # Distinct users per hour (two-stage group: no per-hour user arrays)
+        user_counts = await play_store.collection(db).aggregate(
+            play_store.play_stages(since=start) + [
+                {"$match": in_range},
+                {"$group": {"_id": {"hour": _hour_of("played_at"), "user_id": "$user_id"}}},
+                {"$group": {"_id": "$_id.hour", "users": {"$sum": 1}}}
+            ],
+            allowDiskUse=True
+        ).to_list(length=None)
+        for row in user_counts:
+            rollup(row["_id"])["unique_users"] = row["users"]
+
+        for key, (collection, field) in EVENT_SOURCES.items():
+            rows = await db[collection].aggregate([
+                {"$match": {field: {"$gte": start, "$lt": end}}},
+                {"$group": {"_id": _hour_of(field), "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+            for row in rows:
+                rollup(row["_id"])[key] = row["count"]
+
+        feedback = await db.recommendation_feedback.aggregate([
+            {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {"hour": _hour_of("timestamp"), "algorithm": "$algorithm", "action": "$action"},
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(length=None)
+        for row in feedback:
+            rollup(row["_id"]["hour"])["algorithms"].append({
+                "algorithm": row["_id"]["algorithm"],
+                "action": row["_id"]["action"],
+                "count": row["count"]
+            })
+
+        for hour, document in rollups.items():
+            await db[HOURLY_COLLECTION].update_one(
+                {"_id": f"{hour:%Y-%m-%dT%H}"},
+                {"$set": document},
+                upsert=True
+            )
+
+    async def _compact_day(self, db: AsyncIOMotorDatabase, day: datetime):
+        """Daily rollup from the day's hourly rollups, plus exact daily unique users"""
+
+        end = day + timedelta(days=1)
+        daily = _empty_rollup(day, "day")
+        genre_plays = defaultdict(int)
+        algorithm_counts = defaultdict(int)
+
+        async for hourly in db[HOURLY_COLLECTION].find({"start": {"$gte": day, "$lt": end}}):
+            for key in ("plays", "likes", "skips"):
+                daily[key] += hourly.get(key, 0)
+            for entry in hourly.get("genres", []):
+                genre_plays[entry["genre"]] += entry["plays"]
+            for entry in hourly.get("algorithms", []):
+                algorithm_counts[(entry["algorithm"], entry["action"])] += entry["count"]
+
+        play_store = get_play_history_store()
+        users = await play_store.collection(db).aggregate(
+            play_store.play_stages(since=day) + [
+                {"$match": {"played_at": {"$gte": day, "$lt": end}}},
+                {"$group": {"_id": "$user_id"}},
+                {"$count": "users"}
+            ],
+            allowDiskUse=True
+        ).to_list(length=1)
+
+        daily["unique_users"] = users[0]["users"] if users else 0
+        daily["genres"] = [
+            {"genre": genre, "plays": count}
+            for genre, count in sorted(genre_plays.items(), key=lambda g: -g[1])
+        ]
+        daily["algorithms"] = [
+            {"algorithm": algorithm, "action": action, "count": count}
+            for (algorithm, action), count in algorithm_counts.items()
+        ]
+
+        await db[DAILY_COLLECTION].update_one(
+            {"_id": f"{day:%Y-%m-%d}"},
+            {"$set": daily},
+            upsert=True
+        )
+
+    async def window(self, db: AsyncIOMotorDatabase, since: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Totals for [since, watermark): closed days from the daily rollups,
+        the rest of the current day from hourly ones
+        None until the first compaction has run
+        """
+
+        state = await self.get_state(db)
+        if not state:
+            return None
+
+        daily_until = state["daily_until"]
+        totals = {
+            "plays": 0, "likes": 0, "skips": 0,
+            "genres": defaultdict(int), "algorithms": defaultdict(int),
+            "days": [],
+            "until": state["hourly_until"]
+        }
+
+        def add(document: Dict):
+            for key in ("plays", "likes", "skips"):
+                totals[key] += document.get(key, 0)
+            for entry in document.get("genres", []):
+                totals["genres"][entry["genre"]] += entry["plays"]
+            for entry in document.get("algorithms", []):
+                totals["algorithms"][(entry["algorithm"], entry["action"])] += entry["count"]
+
+        daily_range = {"$lt": daily_until}
+        if since:
+            daily_range["$gte"] = bucket_day(since)
+
+        async for daily in db[DAILY_COLLECTION].find({"start": daily_range}).sort("start", 1):
+            add(daily)
+            totals["days"].append({
+                "day": daily["start"].date().isoformat(),
+                "plays": daily["plays"],
+                "likes": daily["likes"],
+                "skips": daily["skips"],
+                "unique_users": daily["unique_users"]
+            })
+
+        hourly_start = max(since, daily_until) if since else daily_until
+        async for hourly in db[HOURLY_COLLECTION].find({"start": {"$gte": hourly_start}}):
+            add(hourly)
+
+        return totals
+
+
+# Singleton instance
+_compactor_instance = None
+
+def get_rollup_compactor() -> RollupCompactor:
+    """Get or create rollup compactor instance"""
+    global _compactor_instance
+    if _compactor_instance is None:
+        _compactor_instance = RollupCompactor(
+            interval=settings.ROLLUP_INTERVAL_S,
+            lag=settings.ROLLUP_LAG_S,
+            backfill_days=settings.ROLLUP_BACKFILL_DAYS
+        )
+    return _compactor_instance
+
+
+async def main():
+    import argparse
+    from .database import connect_mongodb, close_mongodb, connect_postgres, close_postgres
+
+    parser = argparse.ArgumentParser(description="Compact analytics rollups")
+    parser.add_argument("--rebuild-days", type=int, default=None,
+                        help="Recompute the last N days even if already rolled up")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("📊 ANALYTICS ROLLUP COMPACTION")
+    print("="*50)
+
+    await connect_mongodb()
+    await connect_postgres()
+
+    try:
+        compactor = get_rollup_compactor()
+        if args.rebuild_days is not None:
+            since = datetime.utcnow() - timedelta(days=args.rebuild_days)
+            hours = await compactor.rebuild(get_mongodb(), since)
+        else:
+            hours = await compactor.compact(get_mongodb())
+        print(f"✅ Rolled up {hours} hours")
+    finally:
+        await close_mongodb()
+        await close_postgres()
+
+if __name__ == "__main__":
+    asyncio.run(main())
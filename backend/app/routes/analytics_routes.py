@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from ..auth import get_current_user
-from ..database import get_mongodb
+from ..database import get_mongodb, get_postgres
 from ..analytics import get_analytics
+from ..catalog import get_catalog
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -11,6 +12,8 @@ async def get_my_stats(current_user: dict = Depends(get_current_user)):
     db = get_mongodb()
     analytics = get_analytics()
     
+    # Top tracks and genres are resolved against the in-memory catalog
+    await get_catalog().ensure_loaded(get_postgres())
     stats = await analytics.get_user_stats(current_user["user_id"], db)
     
     return {
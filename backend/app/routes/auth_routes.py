@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from ..models import UserCreate, UserLogin, Token, User
-from ..auth import get_password_hash, verify_password, create_access_token, get_current_user
+from ..auth import get_password_hasher, create_access_token, get_current_user
 from ..database import get_mongodb
 from datetime import datetime
 import uuid
@@ -18,7 +18,7 @@ async def signup(user: UserCreate):
     
     # Create user
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hasher().hash(user.password)
     
     new_user = {
         "user_id": user_id,
@@ -41,12 +41,28 @@ async def login(user: UserLogin):
     
     # Find user
     db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
     
+    valid, new_hash = await get_password_hasher().verify_and_update(
+        user.password, db_user["hashed_password"]
+    )
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+        )
+    
+    # Stored hash used an older bcrypt cost: upgrade it transparently
+    if new_hash:
+        await db.users.update_one(
+            {"user_id": db_user["user_id"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+    
     # Create access token
     access_token = create_access_token(
         data={"sub": db_user["user_id"], "email": db_user["email"]}
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from ..models import PlayEvent, LikeEvent, SkipEvent
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from ..models import PlayEvent, LikeEvent, SkipEvent, TrackBatchRequest
 from ..auth import get_current_user
 from ..database import get_mongodb, get_postgres
+from ..ingest import record_event
+from ..play_history_store import get_play_history_store
+from ..pagination import encode_cursor, decode_cursor
+from ..cache_manager import get_cache_manager
+from ..catalog import get_catalog
+from ..search_index import get_search_index
+from ..metrics import span
+from ..http_cache import make_etag, not_modified, cache_headers, CATALOG_CACHE_CONTROL
+from bson import ObjectId
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/music", tags=["Music"])
 
+# Largest page /history and /tracks will return
+MAX_PAGE_SIZE = 500
+
 @router.post("/play")
 async def log_play(event: PlayEvent, current_user: dict = Depends(get_current_user)):
-    db = get_mongodb()
-    
     play_data = {
         "user_id": current_user["user_id"],
         "track_id": event.track_id,
@@ -17,82 +29,149 @@ async def log_play(event: PlayEvent, current_user: dict = Depends(get_current_us
         "duration_played": event.duration_played,
         "completed": event.completed
     }
+    if event.impression_id:
+        play_data["impression_id"] = event.impression_id
     
-    await db.play_history.insert_one(play_data)
+    await record_event("play", play_data)
     return {"status": "success", "message": "Play logged"}
 
 @router.post("/like")
 async def log_like(event: LikeEvent, current_user: dict = Depends(get_current_user)):
-    db = get_mongodb()
-    
     like_data = {
         "user_id": current_user["user_id"],
         "track_id": event.track_id,
         "liked_at": datetime.utcnow()
     }
-    # Idempotent like: don't error on duplicate likes
-    result = await db.likes.update_one(
-        {"user_id": like_data["user_id"], "track_id": like_data["track_id"]},
-        {"$setOnInsert": like_data},
-        upsert=True
-    )
-
-    # If document already existed, matchedCount will be 1 and no upsert
-    if getattr(result, "upserted_id", None) is None and getattr(result, "matched_count", 0) > 0:
-        return {"status": "success", "message": "Already liked"}
+    if event.impression_id:
+        like_data["impression_id"] = event.impression_id
     
+    # Idempotent like: the buffer upserts on (user_id, track_id)
+    await record_event("like", like_data)
     return {"status": "success", "message": "Like logged"}
 
 @router.post("/skip")
 async def log_skip(event: SkipEvent, current_user: dict = Depends(get_current_user)):
-    db = get_mongodb()
-    
     skip_data = {
         "user_id": current_user["user_id"],
         "track_id": event.track_id,
         "skipped_at": datetime.utcnow(),
         "position": event.position
     }
+    if event.impression_id:
+        skip_data["impression_id"] = event.impression_id
     
-    await db.skips.insert_one(skip_data)
+    await record_event("skip", skip_data)
     return {"status": "success", "message": "Skip logged"}
 
 @router.get("/history")
-async def get_history(limit: int = 50, current_user: dict = Depends(get_current_user)):
+async def get_history(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    hydrate: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get listening history, newest first (pass next_cursor to page back)
+    With hydrate=true each entry embeds its track metadata as `track`
+    """
     db = get_mongodb()
+    store = get_play_history_store()
+    
+    before = None
+    position = decode_cursor(cursor)
+    if position:
+        if not isinstance(position.get("t"), datetime) or not position.get("id"):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not store.bucketed and not ObjectId.is_valid(position["id"]):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before = (position["t"], position["id"])
+    
+    history = await store.history_page(
+        current_user["user_id"], db, limit=limit, before=before
+    )
+    
+    if hydrate and history:
+        tracks = await get_catalog().fetch_tracks(
+            list({play["track_id"] for play in history}), get_postgres()
+        )
+        for play in history:
+            play["track"] = tracks.get(play["track_id"])
     
-    history = await db.play_history.find(
-        {"user_id": current_user["user_id"]}
-    ).sort("played_at", -1).limit(limit).to_list(length=limit)
+    next_cursor = None
+    if len(history) == limit:
+        played_at, last_id = store.page_position(history[-1])
+        next_cursor = encode_cursor({"t": played_at, "id": last_id})
     
-    return {"history": history}
+    return {"history": history, "next_cursor": next_cursor}
 
 @router.get("/tracks")
 async def get_tracks(
-    limit: int = 20,
-    offset: int = 0,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     genre: str = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get list of tracks with pagination"""
+    """
+    Get list of tracks ordered by track_id
+    Pass next_cursor back as `cursor` for keyset paging; `offset` is
+    still accepted but gets slower the deeper it goes
+    """
     pool = get_postgres()
     
+    position = decode_cursor(cursor)
+    after = position.get("after") if position else None
+    if position and not isinstance(after, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    conditions = []
+    params = []
+    if genre:
+        params.append(f"%{genre}%")
+        conditions.append(f"genre ILIKE ${len(params)}")
+    if after is not None:
+        params.append(after)
+        conditions.append(f"track_id > ${len(params)}")
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Fetch one extra row to know whether there is a next page
+    params.append(limit + 1)
+    query = f"SELECT * FROM tracks {where} ORDER BY track_id LIMIT ${len(params)}"
+    if after is None and offset:
+        params.append(offset)
+        query += f" OFFSET ${len(params)}"
+    
     async with pool.acquire() as conn:
+        tracks = await conn.fetch(query, *params)
+        total = await get_track_count(conn, genre) if include_total else None
+    
+    has_more = len(tracks) > limit
+    tracks = tracks[:limit]
+    next_cursor = encode_cursor({"after": tracks[-1]["track_id"]}) if has_more else None
+    
+    return {
+        "tracks": [dict(track) for track in tracks],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor
+    }
+
+async def get_track_count(conn, genre: Optional[str] = None) -> int:
+    """Catalog size (per genre filter), cached and refreshed on TTL expiry"""
+    cache = get_cache_manager()
+    key = genre.lower() if genre else "*"
+    
+    total = cache.get("track_count", key)
+    if total is None:
         if genre:
-            query = "SELECT * FROM tracks WHERE genre ILIKE $1 ORDER BY track_id LIMIT $2 OFFSET $3"
-            tracks = await conn.fetch(query, f"%{genre}%", limit, offset)
             total = await conn.fetchval("SELECT COUNT(*) FROM tracks WHERE genre ILIKE $1", f"%{genre}%")
         else:
-            query = "SELECT * FROM tracks ORDER BY track_id LIMIT $1 OFFSET $2"
-            tracks = await conn.fetch(query, limit, offset)
             total = await conn.fetchval("SELECT COUNT(*) FROM tracks")
-        
-        return {
-            "tracks": [dict(track) for track in tracks],
-            "total": total,
-            "limit": limit,
-            "offset": offset
-        }
+        cache.set("track_count", key, total)
+    
+    return total
 
 @router.get("/tracks/{track_id}")
 async def get_track(
@@ -100,30 +179,45 @@ async def get_track(
     current_user: dict = Depends(get_current_user)
 ):
     """Get specific track details"""
-    pool = get_postgres()
+    track = await get_catalog().fetch_track(track_id, get_postgres())
     
-    async with pool.acquire() as conn:
-        track = await conn.fetchrow(
-            "SELECT * FROM tracks WHERE track_id = $1",
-            track_id
-        )
-        
-        if not track:
-            raise HTTPException(status_code=404, detail="Track not found")
-        
-        return {"track": dict(track)}
+    if not track:
+        raise HTTPException(status_code=404, detail="Track not found")
+    
+    return {"track": track}
+
+@router.post("/tracks/batch")
+async def get_tracks_batch(
+    request: TrackBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get many tracks in one call (order preserved, unknown ids listed in `missing`)"""
+    track_ids = list(dict.fromkeys(request.track_ids))
+    found = await get_catalog().fetch_tracks(track_ids, get_postgres())
+    
+    return {
+        "tracks": [found[track_id] for track_id in track_ids if track_id in found],
+        "missing": [track_id for track_id in track_ids if track_id not in found]
+    }
 
 @router.get("/genres")
-async def get_genres(current_user: dict = Depends(get_current_user)):
+async def get_genres(request: Request, current_user: dict = Depends(get_current_user)):
     """Get list of available genres"""
-    pool = get_postgres()
+    catalog = get_catalog()
+    await catalog.ensure_loaded(get_postgres())
     
-    async with pool.acquire() as conn:
-        genres = await conn.fetch(
-            "SELECT DISTINCT genre FROM tracks WHERE genre IS NOT NULL ORDER BY genre"
-        )
-        
-        return {"genres": [g['genre'] for g in genres]}
+    etag = make_etag("genres", catalog.version)
+    cached = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    
+    return ORJSONResponse(
+        {
+            "genres": catalog.genres(),
+            "counts": catalog.genre_counts()
+        },
+        headers=cache_headers(etag, CATALOG_CACHE_CONTROL)
+    )
 
 @router.get("/search")
 async def search_tracks(
@@ -133,7 +227,20 @@ async def search_tracks(
 ):
     """Search tracks by title, artist, or album"""
     pool = get_postgres()
+    index = get_search_index()
+    
+    await get_catalog().ensure_loaded(pool)
+    
+    if index.ready:
+        with span("search"):
+            results = index.search(q, limit=limit)
+        return {
+            "query": q,
+            "results": results,
+            "count": len(results)
+        }
     
+    # Index still building: fall back to a Postgres scan
     async with pool.acquire() as conn:
         query = """
             SELECT * FROM tracks 
@@ -149,4 +256,23 @@ async def search_tracks(
             "query": q,
             "results": [dict(track) for track in tracks],
             "count": len(tracks)
-        }
\ No newline at end of file
+        }
+
+@router.get("/search/suggest")
+async def suggest(
+    q: str,
+    limit: int = 8,
+    current_user: dict = Depends(get_current_user)
+):
+    """Typeahead suggestions (artists, titles, completed terms)"""
+    index = get_search_index()
+    
+    await get_catalog().ensure_loaded(get_postgres())
+    
+    with span("search"):
+        suggestions = index.suggest(q, limit=limit)
+    
+    return {
+        "query": q,
+        "suggestions": suggestions
+    }
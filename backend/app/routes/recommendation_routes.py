@@ -1,8 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from ..auth import get_current_user
 from ..database import get_postgres, get_mongodb
 from ..recommender import get_recommender
+from ..catalog import get_catalog
 from ..hybrid_recommender import get_hybrid_recommender
+from ..play_history_store import get_play_history_store
+from ..fast_json import track_list_response
+from ..impressions import log_impression
+from ..cache_manager import get_cache_manager
+from ..metrics import scoring
+from ..http_cache import (
+    make_etag, not_modified, cache_headers,
+    POPULAR_CACHE_CONTROL, PERSONALIZED_CACHE_CONTROL
+)
 
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
 
@@ -13,29 +23,27 @@ async def get_similar_tracks(
     current_user: dict = Depends(get_current_user)
 ):
     """Get tracks similar to a specific track"""
-    pool = get_postgres()
     recommender = get_recommender()
     
-    async with pool.acquire() as conn:
-        track = await conn.fetchrow(
-            "SELECT * FROM tracks WHERE track_id = $1",
-            track_id
-        )
-        
-        if not track:
-            raise HTTPException(status_code=404, detail="Track not found")
-        
+    # Catalog is in memory once loaded: no pool checkout on this path
+    track = await get_catalog().fetch_track(track_id, get_postgres())
+    
+    if not track:
+        raise HTTPException(status_code=404, detail="Track not found")
+    
+    with scoring():
         similar_tracks = await recommender.get_similar_tracks(
             track_id=track_id,
-            conn=conn,
+            conn=None,
             limit=limit
         )
-        
-        return {
-            "based_on": dict(track),
-            "recommendations": similar_tracks,
-            "algorithm": "content_based_similarity"
-        }
+    
+    return track_list_response({
+        "based_on": track,
+        "recommendations": similar_tracks,
+        "algorithm": "content_based_similarity",
+        "impression_id": log_impression(current_user["user_id"], "content_based_similarity", similar_tracks)
+    })
 
 @router.get("/genre/{genre}")
 async def get_genre_recommendations(
@@ -48,40 +56,54 @@ async def get_genre_recommendations(
     recommender = get_recommender()
     
     async with pool.acquire() as conn:
-        recommendations = await recommender.get_recommendations_by_genre(
-            genre=genre,
-            conn=conn,
-            limit=limit
-        )
+        with scoring():
+            recommendations = await recommender.get_recommendations_by_genre(
+                genre=genre,
+                conn=conn,
+                limit=limit
+            )
         
-        return {
+        return track_list_response({
             "genre": genre,
             "recommendations": recommendations,
-            "algorithm": "genre_based"
-        }
+            "algorithm": "genre_based",
+            "impression_id": log_impression(current_user["user_id"], "genre_based", recommendations)
+        })
 
 @router.get("/popular")
 async def get_popular_recommendations(
+    request: Request,
     limit: int = 50,
     current_user: dict = Depends(get_current_user)
 ):
     """Get popular tracks (for cold start)"""
     pool = get_postgres()
     recommender = get_recommender()
+    catalog = get_catalog()
+    
+    # Popularity only changes when the catalog does
+    await catalog.ensure_loaded(pool)
+    etag = make_etag("popular", catalog.version, limit)
+    cached = not_modified(request, etag, POPULAR_CACHE_CONTROL)
+    if cached:
+        return cached
     
     async with pool.acquire() as conn:
-        recommendations = await recommender.get_popular_tracks(
-            conn=conn,
-            limit=limit
-        )
+        with scoring():
+            recommendations = await recommender.get_popular_tracks(
+                conn=conn,
+                limit=limit
+            )
         
-        return {
+        return track_list_response({
             "recommendations": recommendations,
-            "algorithm": "popularity_based"
-        }
+            "algorithm": "popularity_based",
+            "impression_id": log_impression(current_user["user_id"], "popularity_based", recommendations)
+        }, headers=cache_headers(etag, POPULAR_CACHE_CONTROL))
 
 @router.get("/for-you")
 async def get_personalized_recommendations(
+    request: Request,
     limit: int = 20,
     current_user: dict = Depends(get_current_user)
 ):
@@ -89,35 +111,47 @@ async def get_personalized_recommendations(
     pool = get_postgres()
     db = get_mongodb()
     recommender = get_recommender()
+    catalog = get_catalog()
+    user_id = current_user["user_id"]
     
-    recent_plays = await db.play_history.find(
-        {"user_id": current_user["user_id"]}
-    ).sort("played_at", -1).limit(10).to_list(length=10)
+    # Deterministic for a given catalog and listening history
+    await catalog.ensure_loaded(pool)
+    etag = make_etag("for-you", catalog.version, get_cache_manager().get_generation(user_id), limit)
+    cached = not_modified(request, etag, PERSONALIZED_CACHE_CONTROL)
+    if cached:
+        return cached
+    
+    recent_plays = await get_play_history_store().recent_plays(
+        user_id, db, limit=10
+    )
     
     async with pool.acquire() as conn:
-        if recent_plays:
-            seed_track_ids = [play["track_id"] for play in recent_plays]
-            recommendations = await recommender.get_diverse_recommendations(
-                seed_track_ids=seed_track_ids,
-                conn=conn,
-                limit=limit
-            )
-            algorithm = "personalized_content_based"
-        else:
-            recommendations = await recommender.get_popular_tracks(
-                conn=conn,
-                limit=limit
-            )
-            algorithm = "cold_start_popular"
+        with scoring():
+            if recent_plays:
+                seed_track_ids = [play["track_id"] for play in recent_plays]
+                recommendations = await recommender.get_diverse_recommendations(
+                    seed_track_ids=seed_track_ids,
+                    conn=conn,
+                    limit=limit
+                )
+                algorithm = "personalized_content_based"
+            else:
+                recommendations = await recommender.get_popular_tracks(
+                    conn=conn,
+                    limit=limit
+                )
+                algorithm = "cold_start_popular"
         
-        return {
+        return track_list_response({
             "recommendations": recommendations,
             "algorithm": algorithm,
-            "based_on_tracks": len(recent_plays)
-        }
+            "based_on_tracks": len(recent_plays),
+            "impression_id": log_impression(user_id, algorithm, recommendations)
+        }, headers=cache_headers(etag, PERSONALIZED_CACHE_CONTROL))
     
 @router.get("/hybrid")
 async def get_hybrid_recommendations(
+    request: Request,
     limit: int = 20,
     exclude_played: bool = True,
     current_user: dict = Depends(get_current_user)
@@ -138,19 +172,40 @@ async def get_hybrid_recommendations(
     pool = get_postgres()
     db = get_mongodb()
     hybrid = get_hybrid_recommender()
+    catalog = get_catalog()
+    cache = get_cache_manager()
+    user_id = current_user["user_id"]
     
-    async with pool.acquire() as conn:
-        recommendations = await hybrid.get_hybrid_recommendations(
-            user_id=current_user["user_id"],
-            db=db,
-            conn=conn,
-            limit=limit,
-            exclude_played=exclude_played
-        )
-        
-        return {
-            "recommendations": recommendations,
-            "algorithm": "hybrid_multi_strategy",
-            "user_id": current_user["user_id"],
-            "count": len(recommendations)
-        }
\ No newline at end of file
+    # Results are cached per (catalog version, user generation): a revisit
+    # with nothing new played/liked/skipped is a 304 or a cache hit
+    await catalog.ensure_loaded(pool)
+    generation = cache.get_generation(user_id)
+    etag = make_etag("hybrid", catalog.version, generation, limit, exclude_played)
+    cached = not_modified(request, etag, PERSONALIZED_CACHE_CONTROL)
+    if cached:
+        return cached
+    
+    # One entry per user, holding the ETag it was computed for: a newer
+    # generation overwrites it instead of piling up new keys
+    entry = cache.get("hybrid", user_id)
+    recommendations = entry["recommendations"] if entry and entry["etag"] == etag else None
+    
+    if recommendations is None:
+        async with pool.acquire() as conn:
+            with scoring():
+                recommendations = await hybrid.get_hybrid_recommendations(
+                    user_id=user_id,
+                    db=db,
+                    conn=conn,
+                    limit=limit,
+                    exclude_played=exclude_played
+                )
+        cache.set("hybrid", user_id, {"etag": etag, "recommendations": recommendations})
+    
+    return track_list_response({
+        "recommendations": recommendations,
+        "algorithm": "hybrid_multi_strategy",
+        "user_id": user_id,
+        "count": len(recommendations),
+        "impression_id": log_impression(user_id, "hybrid_multi_strategy", recommendations)
+    }, headers=cache_headers(etag, PERSONALIZED_CACHE_CONTROL))
@@ -0,0 +1,351 @@
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Relative weight of a match in each searchable field
+FIELD_WEIGHTS = {"title": 3.0, "artist": 3.0, "album": 1.0}
+SEARCH_FIELDS = list(FIELD_WEIGHTS)
+
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+SUBSTRING_MATCH = 0.4
+FULL_FIELD_BONUS = 2.0
+
+# Caps that keep worst-case queries (one-letter prefixes, very common
+# tokens) bounded; postings are in rank order so truncation keeps the best
+MAX_PREFIX_TERMS = 64
+MAX_POSTINGS_PER_TERM = 20000
+MAX_POSTINGS_PER_TOKEN = 40000
+MAX_SUBSTRING_CANDIDATES = 5000
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IndexState(NamedTuple):
+    """One complete build of the index; replaced as a whole, never mutated"""
+    tracks: List[Dict]
+    normalized: List[Tuple[str, str, str]]
+    postings: Dict[str, Dict[str, np.ndarray]]
+    document_frequency: Dict[str, int]
+    vocabulary: List[str]
+    prefix_completions: Dict[str, List[str]]
+    trigram_postings: Dict[str, np.ndarray]
+
+
+class SearchIndex:
+    """
+    In-memory full-text and typeahead index over the track catalog
+    - token postings per field for exact and prefix matches
+    - a sorted vocabulary (with precomputed short-prefix completions)
+      for autocomplete
+    - character trigram postings for substring matches (ILIKE '%q%')
+    Documents are numbered in popularity order (newest first), so lower
+    doc ids rank higher on ties and truncated postings keep the best hits
+    Each query reads one IndexState snapshot, so a rebuild running in
+    another thread never mixes old and new tables under it
+    """
+
+    def __init__(self):
+        self.state: Optional[IndexState] = None
+        self.stats = {"builds": 0, "build_failures": 0}
+        self.last_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state is not None
+
+    def build(self, tracks: List[Dict]):
+        """(Re)build the index from catalog track dicts"""
+
+        ordered = sorted(
+            tracks,
+            key=lambda t: (-(t.get('year') or 0), t['track_id'])
+        )
+
+        normalized = []
+        field_postings = {field: defaultdict(list) for field in SEARCH_FIELDS}
+        trigram_postings = defaultdict(list)
+
+        for doc_id, track in enumerate(ordered):
+            fields = tuple(normalize(track.get(field)) for field in SEARCH_FIELDS)
+            normalized.append(fields)
+
+            for field, text in zip(SEARCH_FIELDS, fields):
+                for token in set(text.split()):
+                    field_postings[field][token].append(doc_id)
+
+            for gram in trigrams(" ".join(fields)):
+                trigram_postings[gram].append(doc_id)
+
+        postings = {
+            field: {
+                token: np.array(docs, dtype=np.int32)
+                for token, docs in tokens.items()
+            }
+            for field, tokens in field_postings.items()
+        }
+
+        document_frequency = defaultdict(int)
+        for tokens in postings.values():
+            for token, docs in tokens.items():
+                document_frequency[token] += len(docs)
+
+        vocabulary = sorted(document_frequency)
+
+        prefix_terms = defaultdict(list)
+        for token in vocabulary:
+            for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+                if len(token) >= length:
+                    prefix_terms[token[:length]].append(token)
+
+        prefix_completions = {
+            prefix: sorted(terms, key=lambda t: -document_frequency[t])[:MAX_PREFIX_TERMS]
+            for prefix, terms in prefix_terms.items()
+        }
+
+        state = IndexState(
+            tracks=ordered,
+            normalized=normalized,
+            postings=postings,
+            document_frequency=dict(document_frequency),
+            vocabulary=vocabulary,
+            prefix_completions=prefix_completions,
+            trigram_postings={
+                gram: np.array(docs, dtype=np.int32)
+                for gram, docs in trigram_postings.items()
+            }
+        )
+        # Published with a single assignment: searches see the old index or the new one
+        self.state = state
+        self.stats["builds"] += 1
+
+        print(f"🔎 Search index built: {len(ordered)} tracks, {len(vocabulary)} terms, {len(state.trigram_postings)} trigrams")
+
+    def complete(self, prefix: str, limit: int = MAX_PREFIX_TERMS, state: Optional[IndexState] = None) -> List[str]:
+        """Vocabulary terms starting with prefix, most frequent first"""
+
+        state = state or self.state
+        if not prefix or state is None:
+            return []
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            return state.prefix_completions.get(prefix, [])[:limit]
+
+        start = bisect.bisect_left(state.vocabulary, prefix)
+        end = bisect.bisect_left(state.vocabulary, prefix + "\uffff", lo=start)
+        terms = state.vocabulary[start:min(end, start + MAX_PREFIX_TERMS * 8)]
+        terms.sort(key=lambda t: -state.document_frequency[t])
+        return terms[:limit]
+
+    def _token_scores(self, state: IndexState, token: str, prefix: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Matching doc ids and their best per-field score for one query token"""
+
+        terms = [(token, EXACT_MATCH)]
+        if prefix:
+            terms += [(t, PREFIX_MATCH) for t in self.complete(token, state=state) if t != token]
+
+        doc_parts, score_parts = [], []
+        budget = MAX_POSTINGS_PER_TOKEN
+        for term, match_weight in terms:
+            for field, weight in FIELD_WEIGHTS.items():
+                docs = state.postings[field].get(term)
+                if docs is None:
+                    continue
+                docs = docs[:min(MAX_POSTINGS_PER_TERM, budget)]
+                doc_parts.append(docs)
+                score_parts.append(np.full(len(docs), weight * match_weight, dtype=np.float32))
+                budget -= len(docs)
+            if budget <= 0:
+                break
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        docs = np.concatenate(doc_parts)
+        scores = np.concatenate(score_parts)
+
+        # Keep the best score per doc
+        order = np.lexsort((-scores, docs))
+        docs, scores = docs[order], scores[order]
+        first = np.ones(len(docs), dtype=bool)
+        first[1:] = docs[1:] != docs[:-1]
+        return docs[first], scores[first]
+
+    def _token_matches(self, state: IndexState, tokens: List[str], prefix_last: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Docs matching every token (AND), with summed scores"""
+
+        # Every token may be a word prefix ("bohem rhap"), except a
+        # finished last word (query ends with a space)
+        per_token = [
+            self._token_scores(state, token, prefix=prefix_last or i < len(tokens) - 1)
+            for i, token in enumerate(tokens)
+        ]
+        per_token.sort(key=lambda pair: len(pair[0]))
+
+        docs, scores = per_token[0]
+        for other_docs, other_scores in per_token[1:]:
+            if len(docs) == 0:
+                break
+            docs, left, right = np.intersect1d(docs, other_docs, assume_unique=True, return_indices=True)
+            scores = scores[left] + other_scores[right]
+
+        return docs, scores
+
+    def _substring_matches(self, state: IndexState, query: str, exclude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Docs containing query as a substring of some field (trigram filtered)"""
+
+        grams = sorted(trigrams(query), key=lambda g: len(state.trigram_postings.get(g, ())))
+        if not grams or grams[0] not in state.trigram_postings:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        candidates = state.trigram_postings[grams[0]]
+        for gram in grams[1:]:
+            candidates = np.intersect1d(candidates, state.trigram_postings.get(gram, ()), assume_unique=True)
+            if len(candidates) == 0:
+                break
+        candidates = np.setdiff1d(candidates, exclude, assume_unique=True)[:MAX_SUBSTRING_CANDIDATES]
+
+        docs, scores = [], []
+        for doc_id in candidates:
+            best = 0.0
+            for field, text in zip(SEARCH_FIELDS, state.normalized[doc_id]):
+                if query in text:
+                    best = max(best, FIELD_WEIGHTS[field] * SUBSTRING_MATCH)
+            if best:
+                docs.append(doc_id)
+                scores.append(best)
+
+        return np.array(docs, dtype=np.int32), np.array(scores, dtype=np.float32)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Ranked search over title, artist and album
+        All tokens must match as words or word prefixes (for typeahead);
+        substring matches fill in when token matches run short
+        """
+
+        state = self.state
+        normalized_query = normalize(query)
+        tokens = normalized_query.split()
+        if not tokens or state is None:
+            return []
+
+        prefix_last = not query.endswith(" ")
+        docs, scores = self._token_matches(state, tokens, prefix_last)
+
+        if len(docs) < limit and len(normalized_query) >= 3:
+            extra_docs, extra_scores = self._substring_matches(state, normalized_query, docs)
+            docs = np.concatenate([docs, extra_docs])
+            scores = np.concatenate([scores, extra_scores])
+
+        if len(docs) == 0:
+            return []
+
+        # Small rank-order tie-breaker: lower doc id (newer track) wins
+        ranked = scores.astype(np.float64) - docs / (len(state.tracks) * 10.0)
+
+        k = min(limit * 4, len(docs))
+        top = np.argpartition(-ranked, k - 1)[:k]
+
+        results = []
+        for i in top:
+            doc_id = int(docs[i])
+            score = float(ranked[i])
+            # Bonus when the whole query is exactly the artist or title
+            title, artist, _ = state.normalized[doc_id]
+            if normalized_query in (title, artist):
+                score += FULL_FIELD_BONUS
+            results.append((score, doc_id))
+
+        results.sort(key=lambda r: (-r[0], r[1]))
+
+        return [
+            {**state.tracks[doc_id], "search_score": round(score, 4)}
+            for score, doc_id in results[:limit]
+        ]
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """Typeahead suggestions: matching artists and titles, then terms"""
+
+        normalized_query = normalize(query)
+        if not normalized_query or not self.ready:
+            return []
+
+        tokens = normalized_query.split()
+        suggestions = []
+        seen = set()
+
+        for track in self.search(query, limit=limit * 2):
+            artist = track.get('artist')
+            artist_key = ("artist", normalize(artist))
+            if artist and artist_key not in seen and all(
+                any(word.startswith(token) for word in artist_key[1].split())
+                for token in tokens
+            ):
+                seen.add(artist_key)
+                suggestions.append({"text": artist, "type": "artist"})
+            else:
+                title_key = ("title", normalize(track.get('title')))
+                if title_key not in seen:
+                    seen.add(title_key)
+                    suggestions.append({
+                        "text": track.get('title'),
+                        "type": "title",
+                        "track_id": track['track_id']
+                    })
+            if len(suggestions) >= limit:
+                return suggestions
+
+        # Pad with vocabulary completions of the last word
+        head = " ".join(tokens[:-1])
+        for term in self.complete(tokens[-1], limit=limit):
+            text = f"{head} {term}".strip()
+            if ("term", text) not in seen:
+                seen.add(("term", text))
+                suggestions.append({"text": text, "type": "term"})
+            if len(suggestions) >= limit:
+                break
+
+        return suggestions
+
+
+    def record_failure(self, error: BaseException):
+        """Note a build that raised (the previous index, if any, stays live)"""
+        self.stats["build_failures"] += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "ready": self.ready,
+            "tracks": len(self.state.tracks) if self.state else 0,
+            "last_error": self.last_error
+        }
+
+
+# Singleton instance
+_search_index_instance = None
+
+def get_search_index() -> SearchIndex:
+    """Get or create search index instance"""
+    global _search_index_instance
+    if _search_index_instance is None:
+        _search_index_instance = SearchIndex()
+    return _search_index_instance
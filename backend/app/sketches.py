@@ -0,0 +1,374 @@
+import asyncio
+import hashlib
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from .config import settings
+from .database import get_mongodb
+from .play_history_store import bucket_day, get_play_history_store
+
+SKETCH_COLLECTION = "analytics_sketches"
+
+
+def _hash128(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=16).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Distinct counter in 2^precision one-byte registers
+    (precision 14: 16 KB, ~0.8% standard error); merge is register-wise max
+    """
+
+    def __init__(self, precision: int = 14, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, value: str):
+        h = _hash128(value) >> 64
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        # Small range correction (linear counting)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * np.log(self.m / zeros)
+
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, precision: int = 14) -> "HyperLogLog":
+        return cls(precision, np.frombuffer(data, dtype=np.uint8).copy())
+
+
+class CountMinSketch:
+    """
+    Frequency estimates that never undercount
+    depth rows x width counters, each row indexed by a different hash
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, table: Optional[np.ndarray] = None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.uint32)
+
+    def _indexes(self, item: str) -> List[int]:
+        h = _hash128(item)
+        h1, h2 = h & 0xFFFFFFFFFFFFFFFF, (h >> 64) | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1):
+        for row, column in enumerate(self._indexes(item)):
+            self.table[row, column] += count
+
+    def estimate(self, item: str) -> int:
+        return int(min(self.table[row, column] for row, column in enumerate(self._indexes(item))))
+
+    def merge(self, other: "CountMinSketch"):
+        self.table += other.table
+
+    def to_bytes(self) -> bytes:
+        return self.table.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, width: int = 2048, depth: int = 4) -> "CountMinSketch":
+        table = np.frombuffer(data, dtype=np.uint32).reshape(depth, width).copy()
+        return cls(width, depth, table)
+
+
+class SpaceSaving:
+    """
+    Heavy-hitter candidates in a fixed number of counters
+    Any item with frequency above total / capacity is guaranteed present
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+
+    def add(self, item: str, count: int = 1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+            return
+
+        # Replace the smallest counter; its count becomes the new error bound
+        victim, (floor, _) = min(self.counters.items(), key=lambda kv: kv[1][0])
+        del self.counters[victim]
+        self.counters[item] = [floor + count, floor]
+
+    def _floor(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def merge(self, other: "SpaceSaving"):
+        """Mergeable summary: sum counters, missing items may have up to the other's floor"""
+
+        own_floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(item, [own_floor, own_floor])
+            other_count, other_error = other.counters.get(item, [other_floor, other_floor])
+            merged[item] = [count + other_count, error + other_error]
+
+        top = sorted(merged.items(), key=lambda kv: -kv[1][0])[:self.capacity]
+        self.counters = {item: counter for item, counter in top}
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(item, counter[0]) for item, counter in ranked[:n]]
+
+    def to_list(self) -> List[List]:
+        return [[item, count, error] for item, (count, error) in self.counters.items()]
+
+    @classmethod
+    def from_list(cls, data: List[List], capacity: int = 256) -> "SpaceSaving":
+        sketch = cls(capacity)
+        sketch.counters = {item: [count, error] for item, count, error in data}
+        return sketch
+
+
+class DaySketch:
+    """All sketches for one UTC day: active users and track plays"""
+
+    def __init__(self):
+        self.users = HyperLogLog()
+        self.track_counts = CountMinSketch()
+        self.top_tracks = SpaceSaving()
+        self.plays = 0
+        self.first_event_at: Optional[datetime] = None
+
+    def add_play(self, user_id: str, track_id: str, played_at: datetime):
+        self.users.add(user_id)
+        self.track_counts.add(track_id)
+        self.top_tracks.add(track_id)
+        self.plays += 1
+        if self.first_event_at is None or played_at < self.first_event_at:
+            self.first_event_at = played_at
+
+    def merge(self, other: "DaySketch"):
+        self.users.merge(other.users)
+        self.track_counts.merge(other.track_counts)
+        self.top_tracks.merge(other.top_tracks)
+        self.plays += other.plays
+        if other.first_event_at and (self.first_event_at is None or other.first_event_at < self.first_event_at):
+            self.first_event_at = other.first_event_at
+
+    def to_document(self) -> Dict:
+        return {
+            "users_hll": self.users.to_bytes(),
+            "track_cms": self.track_counts.to_bytes(),
+            "top_tracks": self.top_tracks.to_list(),
+            "plays": self.plays,
+            "first_event_at": self.first_event_at
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict) -> "DaySketch":
+        sketch = cls()
+        sketch.users = HyperLogLog.from_bytes(document["users_hll"])
+        sketch.track_counts = CountMinSketch.from_bytes(document["track_cms"])
+        sketch.top_tracks = SpaceSaving.from_list(document["top_tracks"])
+        sketch.plays = document.get("plays", 0)
+        sketch.first_event_at = document.get("first_event_at")
+        return sketch
+
+
+class ActivitySketches:
+    """
+    Streaming approximate analytics fed by event ingestion
+    Each process keeps its own per-day sketches and periodically upserts
+    them as one document per (day, worker); readers merge all workers'
+    documents for the days in a window, so reads cost O(sketch size)
+    """
+
+    def __init__(self, flush_interval: float = 60.0, worker_id: Optional[str] = None):
+        self.flush_interval = flush_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.days: Dict[datetime, DaySketch] = {}
+        self._dirty: set = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def record(self, kind: str, document: Dict):
+        """Feed one ingested event (only plays count toward these sketches)"""
+
+        if kind != "play":
+            return
+
+        day = bucket_day(document["played_at"])
+        sketch = self.days.get(day)
+        if sketch is None:
+            sketch = self.days[day] = DaySketch()
+        sketch.add_play(document["user_id"], document["track_id"], document["played_at"])
+        self._dirty.add(day)
+
+    async def start(self):
+        """Start periodic persistence (called from the app lifespan)"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and persist whatever is still dirty"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.persist(get_mongodb())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.persist(get_mongodb())
+            except Exception as e:
+                print(f"⚠️ Sketch persistence failed: {e}")
+
+    async def persist(self, db: AsyncIOMotorDatabase):
+        """Upsert this worker's sketches for every day that changed"""
+
+        dirty, self._dirty = self._dirty, set()
+        try:
+            for day in sorted(dirty):
+                await db[SKETCH_COLLECTION].update_one(
+                    {"_id": f"{day:%Y-%m-%d}:{self.worker_id}"},
+                    {"$set": {
+                        "day": day,
+                        "worker": self.worker_id,
+                        "updated_at": datetime.utcnow(),
+                        **self.days[day].to_document()
+                    }},
+                    upsert=True
+                )
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+        # Days before yesterday no longer receive events; keep memory bounded
+        cutoff = bucket_day(datetime.utcnow()) - timedelta(days=1)
+        for day in [d for d in self.days if d < cutoff and d not in self._dirty]:
+            del self.days[day]
+
+    async def window(self, db: AsyncIOMotorDatabase, since: datetime) -> Optional[DaySketch]:
+        """
+        Merged sketch for every day from `since` through today
+        Uses the persisted sketches plus this worker's live ones; None when nothing has been recorded in the window
+        """
+
+        start = bucket_day(since)
+        merged = DaySketch()
+        found = False
+
+        cursor = db[SKETCH_COLLECTION].find({"day": {"$gte": start}})
+        async for document in cursor:
+            # Our own live days are fresher than what we last persisted
+            if document["worker"] == self.worker_id and document["day"] in self.days:
+                continue
+            merged.merge(DaySketch.from_document(document))
+            found = True
+
+        for day, sketch in self.days.items():
+            if day >= start:
+                merged.merge(sketch)
+                found = True
+
+        return merged if found else None
+
+    def top_tracks(self, sketch: DaySketch, n: int = 10) -> List[Dict]:
+        """Heavy hitters: Space-Saving candidates ranked by Count-Min estimates"""
+
+        candidates = [item for item, _ in sketch.top_tracks.top(n * 4)]
+        ranked = sorted(
+            ((track_id, sketch.track_counts.estimate(track_id)) for track_id in candidates),
+            key=lambda t: (-t[1], t[0])
+        )
+        return [{"track_id": track_id, "play_count": count} for track_id, count in ranked[:n]]
+
+
+async def backfill(db: AsyncIOMotorDatabase, days: int = 30) -> int:
+    """
+    Build sketches from stored play history for plays older than the
+    first live sketch, so windows are complete right after deployment
+    Written under a dedicated "backfill" worker id, safe to re-run
+    """
+
+    first_live = await db[SKETCH_COLLECTION].find_one(
+        {"worker": {"$ne": "backfill"}, "first_event_at": {"$ne": None}},
+        sort=[("first_event_at", 1)]
+    )
+    until = first_live["first_event_at"] if first_live else datetime.utcnow()
+    since = bucket_day(datetime.utcnow()) - timedelta(days=days)
+
+    sketches = ActivitySketches(worker_id="backfill")
+    store = get_play_history_store()
+    pipeline = store.play_stages(since=since) + [
+        {"$match": {"played_at": {"$gte": since, "$lt": until}}},
+        {"$project": {"_id": 0, "user_id": 1, "track_id": 1, "played_at": 1}}
+    ]
+
+    plays = 0
+    async for play in store.collection(db).aggregate(pipeline):
+        sketches.record("play", play)
+        plays += 1
+
+    sketches._dirty = set(sketches.days)
+    await sketches.persist(db)
+    return plays
+
+
+# Singleton instance
+_sketches_instance = None
+
+def get_activity_sketches() -> ActivitySketches:
+    """Get or create activity sketches instance"""
+    global _sketches_instance
+    if _sketches_instance is None:
+        _sketches_instance = ActivitySketches(flush_interval=settings.SKETCH_FLUSH_INTERVAL_S)
+    return _sketches_instance
+
+
+async def main():
+    import argparse
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Backfill analytics sketches from play history")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client.music_recommender
+
+    try:
+        await db[SKETCH_COLLECTION].create_index([("day", 1)])
+        plays = await backfill(db, days=args.days)
+        print(f"✅ Sketches backfilled from {plays} plays")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,171 @@
-import asyncpg
+import numpy as np
+import pandas as pd
 from .config import settings
+from .bulk_loader import BulkLoader, TRACK_COLUMNS, copy_tracks, create_loader_pool
 import asyncio
-import random
+import functools
+import itertools
+import secrets
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Realistic music data based on common patterns
+GENRES = ['Pop', 'Rock', 'Hip-Hop', 'Electronic', 'R&B', 'Country', 'Jazz', 'Classical', 'Indie', 'Latin']
+
+ARTISTS_BY_GENRE = {
+    'Pop': ['Taylor Swift', 'Ed Sheeran', 'Ariana Grande', 'Dua Lipa', 'The Weeknd', 'Billie Eilish', 'Harry Styles', 'Olivia Rodrigo', 'Selena Gomez', 'Justin Bieber'],
+    'Rock': ['Queen', 'The Beatles', 'Led Zeppelin', 'Pink Floyd', 'AC/DC', 'Nirvana', 'Foo Fighters', 'Imagine Dragons', 'Coldplay', 'Arctic Monkeys'],
+    'Hip-Hop': ['Drake', 'Kendrick Lamar', 'J. Cole', 'Travis Scott', 'Post Malone', 'Eminem', 'Kanye West', '21 Savage', 'Lil Baby', 'Future'],
+    'Electronic': ['Calvin Harris', 'The Chainsmokers', 'Marshmello', 'Kygo', 'Avicii', 'Deadmau5', 'Daft Punk', 'David Guetta', 'Martin Garrix', 'Tiësto'],
+    'R&B': ['The Weeknd', 'Frank Ocean', 'SZA', 'Khalid', 'H.E.R.', 'Bryson Tiller', 'Jhené Aiko', 'Summer Walker', 'Brent Faiyaz', 'Daniel Caesar'],
+    'Country': ['Luke Combs', 'Morgan Wallen', 'Kane Brown', 'Blake Shelton', 'Carrie Underwood', 'Luke Bryan', 'Thomas Rhett', 'Florida Georgia Line', 'Keith Urban', 'Miranda Lambert'],
+    'Jazz': ['Miles Davis', 'John Coltrane', 'Louis Armstrong', 'Billie Holiday', 'Duke Ellington', 'Ella Fitzgerald', 'Charlie Parker', 'Thelonious Monk', 'Nina Simone', 'Herbie Hancock'],
+    'Classical': ['Mozart', 'Beethoven', 'Bach', 'Chopin', 'Tchaikovsky', 'Vivaldi', 'Debussy', 'Brahms', 'Handel', 'Schubert'],
+    'Indie': ['Tame Impala', 'Arctic Monkeys', 'The 1975', 'Vampire Weekend', 'Mac DeMarco', 'MGMT', 'Foster the People', 'Two Door Cinema Club', 'Phoenix', 'The Strokes'],
+    'Latin': ['Bad Bunny', 'J Balvin', 'Rosalía', 'Karol G', 'Ozuna', 'Maluma', 'Daddy Yankee', 'Anuel AA', 'Rauw Alejandro', 'Peso Pluma']
+}
+
+# Share of the catalog per genre
+GENRE_WEIGHTS = {
+    'Pop': 0.18, 'Rock': 0.16, 'Hip-Hop': 0.14, 'Electronic': 0.13, 'R&B': 0.08,
+    'Country': 0.07, 'Jazz': 0.06, 'Classical': 0.05, 'Indie': 0.08, 'Latin': 0.05
+}
+
+# Genre-specific audio feature ranges
+GENRE_PROFILES = {
+    'Pop': {'tempo': (100, 130), 'energy': (0.6, 0.9), 'danceability': (0.6, 0.9), 'valence': (0.5, 0.9)},
+    'Rock': {'tempo': (110, 140), 'energy': (0.7, 1.0), 'danceability': (0.3, 0.6), 'valence': (0.4, 0.7)},
+    'Hip-Hop': {'tempo': (70, 100), 'energy': (0.6, 0.9), 'danceability': (0.7, 1.0), 'valence': (0.3, 0.7)},
+    'Electronic': {'tempo': (120, 140), 'energy': (0.7, 1.0), 'danceability': (0.7, 1.0), 'valence': (0.5, 0.9)},
+    'R&B': {'tempo': (80, 110), 'energy': (0.4, 0.7), 'danceability': (0.6, 0.8), 'valence': (0.3, 0.6)},
+    'Country': {'tempo': (90, 120), 'energy': (0.5, 0.8), 'danceability': (0.5, 0.8), 'valence': (0.5, 0.8)},
+    'Jazz': {'tempo': (60, 120), 'energy': (0.3, 0.7), 'danceability': (0.4, 0.7), 'valence': (0.4, 0.7)},
+    'Classical': {'tempo': (60, 100), 'energy': (0.2, 0.6), 'danceability': (0.1, 0.4), 'valence': (0.3, 0.7)},
+    'Indie': {'tempo': (100, 130), 'energy': (0.5, 0.8), 'danceability': (0.5, 0.7), 'valence': (0.4, 0.7)},
+    'Latin': {'tempo': (90, 120), 'energy': (0.7, 0.9), 'danceability': (0.7, 0.95), 'valence': (0.6, 0.9)}
+}
+
+TITLE_FIRST = ['Love', 'Night', 'Summer', 'Dream', 'Heart', 'Fire', 'Sky', 'Star', 'Hope', 'Time', 'Blue', 'Gold', 'Wild', 'Sweet', 'Lost', 'Free', 'Dark', 'Light']
+TITLE_SECOND = ['Song', 'Anthem', 'Melody', 'Beat', 'Rhythm', 'Vibes', 'Dreams', 'Nights', 'Days', 'Life', 'Soul', 'Way', 'Road', 'City', 'World']
+
+# Ranges for features the genre profiles don't set: (default, per-genre overrides)
+DEFAULT_RANGES = {
+    'acousticness': ((0.0, 0.7), {}),
+    'instrumentalness': ((0.0, 0.3), {'Classical': (0.5, 1.0)}),
+    'liveness': ((0.05, 0.35), {}),
+    'speechiness': ((0.03, 0.15), {'Hip-Hop': (0.15, 0.5)}),
+    'loudness': ((-12, -3), {}),
+}
+
+# Catalog shape: tracks per artist (long tail), albums per artist
+TRACKS_PER_ARTIST = 12
+ARTIST_ZIPF_EXPONENT = 0.8
+ALBUM_GEOMETRIC_P = 0.3
+MAX_ALBUMS = 20
+
+SAMPLE_CHUNK_SIZE = 50000
+JOB_PREFIX = "sample:"
+
+# Generated tracks always carry a full set of audio features
+SAMPLE_COLUMNS = TRACK_COLUMNS + ["has_audio_features"]
+
+FEATURE_RANGES = {
+    feature: (
+        np.array([GENRE_PROFILES[genre][feature][0] for genre in GENRES], dtype=float),
+        np.array([GENRE_PROFILES[genre][feature][1] for genre in GENRES], dtype=float)
+    )
+    for feature in ('tempo', 'energy', 'danceability', 'valence')
+}
+FEATURE_RANGES.update({
+    feature: (
+        np.array([overrides.get(genre, default)[0] for genre in GENRES], dtype=float),
+        np.array([overrides.get(genre, default)[1] for genre in GENRES], dtype=float)
+    )
+    for feature, (default, overrides) in DEFAULT_RANGES.items()
+})
+
+
+class SyntheticCatalog:
+    """
+    Seeded artist pool for a generated catalog of `size` tracks
+    Each genre gets about size * weight / TRACKS_PER_ARTIST artists (curated
+    names first) with Zipf-distributed popularity, so a few artists have
+    hundreds of tracks and most have a handful, as in real catalogs
+    """
+    
+    def __init__(self, size: int, seed: int):
+        rng = np.random.default_rng([seed, size])
+        weights = np.array([GENRE_WEIGHTS[genre] for genre in GENRES])
+        self.genre_p = weights / weights.sum()
+        
+        names = []
+        self.artist_offsets = []
+        self.artist_cdfs = []
+        for g, genre in enumerate(GENRES):
+            curated = ARTISTS_BY_GENRE[genre]
+            count = max(len(curated), int(size * self.genre_p[g] / TRACKS_PER_ARTIST))
+            self.artist_offsets.append(len(names))
+            names.extend(curated)
+            names.extend(f"{genre} Artist {n:06d}" for n in range(count - len(curated)))
+            
+            # Popularity by rank, with the ranks shuffled past the curated head
+            popularity = 1.0 / np.arange(1, count + 1) ** ARTIST_ZIPF_EXPONENT
+            popularity[len(curated):] = rng.permutation(popularity[len(curated):])
+            self.artist_cdfs.append(np.cumsum(popularity) / popularity.sum())
+        
+        self.artists = np.array(names, dtype=object)
+        self.artist_offsets = np.array(self.artist_offsets)
+        self.genres = np.array(GENRES, dtype=object)
+        self.title_first = np.array(TITLE_FIRST, dtype=object)
+        self.title_second = np.array(TITLE_SECOND, dtype=object)
+    
+    def generate(self, rng: np.random.Generator, first_number: int, count: int) -> pd.DataFrame:
+        """`count` tracks numbered from first_number, as TRACK_COLUMNS"""
+        
+        genre_idx = rng.choice(len(GENRES), size=count, p=self.genre_p)
+        
+        artist_idx = np.empty(count, dtype=np.int64)
+        draws = rng.random(count)
+        for g in range(len(GENRES)):
+            mask = genre_idx == g
+            local = np.searchsorted(self.artist_cdfs[g], draws[mask], side="right")
+            artist_idx[mask] = self.artist_offsets[g] + np.minimum(local, len(self.artist_cdfs[g]) - 1)
+        
+        artists = self.artists[artist_idx]
+        album_numbers = np.minimum(rng.geometric(ALBUM_GEOMETRIC_P, size=count), MAX_ALBUMS)
+        numbers = pd.Series(np.arange(first_number, first_number + count))
+        
+        tracks = pd.DataFrame({
+            "track_id": "track_" + numbers.astype(str).str.zfill(6),
+            "title": pd.Series(self.title_first[rng.integers(len(TITLE_FIRST), size=count)])
+                     + " " + self.title_second[rng.integers(len(TITLE_SECOND), size=count)],
+            "artist": artists,
+            "album": pd.Series(artists) + " - Album " + pd.Series(album_numbers).astype(str),
+            "genre": self.genres[genre_idx],
+            "year": rng.integers(1990, 2025, size=count),
+            "duration": rng.uniform(120, 300, size=count),
+        })
+        
+        # Audio features based on genre: one uniform draw per column,
+        # scaled into each row's genre range
+        for feature, (low, high) in FEATURE_RANGES.items():
+            tracks[feature] = low[genre_idx] + rng.random(count) * (high[genre_idx] - low[genre_idx])
+        
+        return tracks[TRACK_COLUMNS]
+
+
+def frame_records(tracks: pd.DataFrame) -> List[Tuple]:
+    """Rows as tuples of plain Python values for COPY, in SAMPLE_COLUMNS order"""
+    columns = [tracks[column].tolist() for column in TRACK_COLUMNS]
+    return list(zip(*columns, itertools.repeat(True, len(tracks))))
+
+
+def chunk_rng(seed: int, index: int) -> np.random.Generator:
+    """Independent, reproducible stream per chunk (resume regenerates the same rows)"""
+    return np.random.default_rng([seed, index])
+
 
 class MusicDatasetLoader:
     """
@@ -9,100 +173,66 @@ class MusicDatasetLoader:
     No external API needed - uses generated realistic data
     """
     
-    async def load_sample_dataset(self, target_count=5000):
-        """Load realistic sample music data"""
+    async def load_sample_dataset(
+        self,
+        target_count=5000,
+        chunk_size: int = SAMPLE_CHUNK_SIZE,
+        concurrency: int = settings.LOADER_CONCURRENCY,
+        seed: Optional[int] = None,
+        restart: bool = False
+    ):
+        """
+        Load realistic sample music data
+        Chunks are generated from the job's seed, so an interrupted job
+        resumes with exactly the tracks it would have loaded
+        """
         print(f"🎯 Target: {target_count} tracks")
         print("🔄 Connecting to PostgreSQL...")
         
-        conn = await asyncpg.connect(settings.POSTGRES_URL)
-        loaded_count = 0
+        pool = await create_loader_pool(concurrency)
         
         try:
-            existing_count = await conn.fetchval("SELECT COUNT(*) FROM tracks")
+            async with pool.acquire() as conn:
+                existing_count = await conn.fetchval("SELECT COUNT(*) FROM tracks")
+                job_id = None if restart else await BulkLoader.find_unfinished(conn, JOB_PREFIX)
             print(f"📊 Existing tracks: {existing_count}")
             
-            # Realistic music data based on common patterns
-            genres = ['Pop', 'Rock', 'Hip-Hop', 'Electronic', 'R&B', 'Country', 'Jazz', 'Classical', 'Indie', 'Latin']
-            
-            artists_by_genre = {
-                'Pop': ['Taylor Swift', 'Ed Sheeran', 'Ariana Grande', 'Dua Lipa', 'The Weeknd', 'Billie Eilish', 'Harry Styles', 'Olivia Rodrigo', 'Selena Gomez', 'Justin Bieber'],
-                'Rock': ['Queen', 'The Beatles', 'Led Zeppelin', 'Pink Floyd', 'AC/DC', 'Nirvana', 'Foo Fighters', 'Imagine Dragons', 'Coldplay', 'Arctic Monkeys'],
-                'Hip-Hop': ['Drake', 'Kendrick Lamar', 'J. Cole', 'Travis Scott', 'Post Malone', 'Eminem', 'Kanye West', '21 Savage', 'Lil Baby', 'Future'],
-                'Electronic': ['Calvin Harris', 'The Chainsmokers', 'Marshmello', 'Kygo', 'Avicii', 'Deadmau5', 'Daft Punk', 'David Guetta', 'Martin Garrix', 'Tiësto'],
-                'R&B': ['The Weeknd', 'Frank Ocean', 'SZA', 'Khalid', 'H.E.R.', 'Bryson Tiller', 'Jhené Aiko', 'Summer Walker', 'Brent Faiyaz', 'Daniel Caesar'],
-                'Country': ['Luke Combs', 'Morgan Wallen', 'Kane Brown', 'Blake Shelton', 'Carrie Underwood', 'Luke Bryan', 'Thomas Rhett', 'Florida Georgia Line', 'Keith Urban', 'Miranda Lambert'],
-                'Jazz': ['Miles Davis', 'John Coltrane', 'Louis Armstrong', 'Billie Holiday', 'Duke Ellington', 'Ella Fitzgerald', 'Charlie Parker', 'Thelonious Monk', 'Nina Simone', 'Herbie Hancock'],
-                'Classical': ['Mozart', 'Beethoven', 'Bach', 'Chopin', 'Tchaikovsky', 'Vivaldi', 'Debussy', 'Brahms', 'Handel', 'Schubert'],
-                'Indie': ['Tame Impala', 'Arctic Monkeys', 'The 1975', 'Vampire Weekend', 'Mac DeMarco', 'MGMT', 'Foster the People', 'Two Door Cinema Club', 'Phoenix', 'The Strokes'],
-                'Latin': ['Bad Bunny', 'J Balvin', 'Rosalía', 'Karol G', 'Ozuna', 'Maluma', 'Daddy Yankee', 'Anuel AA', 'Rauw Alejandro', 'Peso Pluma']
-            }
+            # Job ids carry everything needed to regenerate a chunk:
+            # sample:<first number>:<count>:<chunk size>:<seed>
+            if job_id:
+                _, first_number, job_count, job_chunk_size, job_seed = (job_id.split(":") + [None])[:5]
+                first_number, job_count, job_chunk_size = int(first_number), int(job_count), int(job_chunk_size)
+                job_seed = int(job_seed) if job_seed else 0
+                # Only resume the job that was asked for (a missing --seed matches any)
+                if (job_count, job_chunk_size) != (target_count, chunk_size) or seed not in (None, job_seed):
+                    raise ValueError(
+                        f"Unfinished job {job_id} was started with --count {job_count} "
+                        f"--chunk-size {job_chunk_size} --seed {job_seed}; rerun with those "
+                        f"to resume it, or pass --restart to start a new job"
+                    )
+                seed = job_seed
+                print(f"⏩ Resuming unfinished job {job_id}")
+            else:
+                first_number = existing_count + 1
+                seed = seed if seed is not None else secrets.randbelow(2**31)
+                job_id = f"{JOB_PREFIX}{first_number}:{target_count}:{chunk_size}:{seed}"
             
-            # Genre-specific audio feature ranges
-            genre_profiles = {
-                'Pop': {'tempo': (100, 130), 'energy': (0.6, 0.9), 'danceability': (0.6, 0.9), 'valence': (0.5, 0.9)},
-                'Rock': {'tempo': (110, 140), 'energy': (0.7, 1.0), 'danceability': (0.3, 0.6), 'valence': (0.4, 0.7)},
-                'Hip-Hop': {'tempo': (70, 100), 'energy': (0.6, 0.9), 'danceability': (0.7, 1.0), 'valence': (0.3, 0.7)},
-                'Electronic': {'tempo': (120, 140), 'energy': (0.7, 1.0), 'danceability': (0.7, 1.0), 'valence': (0.5, 0.9)},
-                'R&B': {'tempo': (80, 110), 'energy': (0.4, 0.7), 'danceability': (0.6, 0.8), 'valence': (0.3, 0.6)},
-                'Country': {'tempo': (90, 120), 'energy': (0.5, 0.8), 'danceability': (0.5, 0.8), 'valence': (0.5, 0.8)},
-                'Jazz': {'tempo': (60, 120), 'energy': (0.3, 0.7), 'danceability': (0.4, 0.7), 'valence': (0.4, 0.7)},
-                'Classical': {'tempo': (60, 100), 'energy': (0.2, 0.6), 'danceability': (0.1, 0.4), 'valence': (0.3, 0.7)},
-                'Indie': {'tempo': (100, 130), 'energy': (0.5, 0.8), 'danceability': (0.5, 0.7), 'valence': (0.4, 0.7)},
-                'Latin': {'tempo': (90, 120), 'energy': (0.7, 0.9), 'danceability': (0.7, 0.95), 'valence': (0.6, 0.9)}
-            }
+            catalog = SyntheticCatalog(target_count, seed)
+            total_chunks = (target_count + chunk_size - 1) // chunk_size
+            loader = BulkLoader(job_id, concurrency=concurrency, total_chunks=total_chunks, total_rows=target_count)
             
-            print(f"\n🎵 Generating {target_count} realistic tracks...\n")
+            def prepare(index: int) -> List[Tuple]:
+                start = index * chunk_size
+                return frame_records(catalog.generate(
+                    chunk_rng(seed, index), first_number + start, min(chunk_size, target_count - start)
+                ))
             
-            track_counter = existing_count + 1
+            print(f"\n🎵 Generating {target_count} realistic tracks ({len(catalog.artists)} artists, seed {seed})...\n")
+            loaded_count = await loader.run(
+                pool, range(total_chunks), prepare, load=functools.partial(copy_tracks, columns=SAMPLE_COLUMNS)
+            )
             
-            for i in range(target_count):
-                genre = random.choice(genres)
-                artist = random.choice(artists_by_genre[genre])
-                profile = genre_profiles[genre]
-                
-                # Generate track data
-                track_id = f"track_{track_counter:06d}"
-                title = f"{random.choice(['Love', 'Night', 'Summer', 'Dream', 'Heart', 'Fire', 'Sky', 'Star', 'Hope', 'Time', 'Blue', 'Gold', 'Wild', 'Sweet', 'Lost', 'Free', 'Dark', 'Light'])} {random.choice(['Song', 'Anthem', 'Melody', 'Beat', 'Rhythm', 'Vibes', 'Dreams', 'Nights', 'Days', 'Life', 'Soul', 'Way', 'Road', 'City', 'World'])}"
-                album = f"{artist} - Album {random.randint(1, 10)}"
-                year = random.randint(1990, 2024)
-                duration = random.uniform(120, 300)
-                
-                # Audio features based on genre
-                tempo = random.uniform(*profile['tempo'])
-                energy = random.uniform(*profile['energy'])
-                danceability = random.uniform(*profile['danceability'])
-                valence = random.uniform(*profile['valence'])
-                acousticness = random.uniform(0.0, 0.7)
-                instrumentalness = random.uniform(0.0, 0.3) if genre != 'Classical' else random.uniform(0.5, 1.0)
-                liveness = random.uniform(0.05, 0.35)
-                speechiness = random.uniform(0.03, 0.15) if genre != 'Hip-Hop' else random.uniform(0.15, 0.5)
-                loudness = random.uniform(-12, -3)
-                
-                try:
-                    await conn.execute("""
-                        INSERT INTO tracks (
-                            track_id, title, artist, album, genre, year, duration,
-                            tempo, energy, danceability, valence, acousticness,
-                            instrumentalness, liveness, speechiness, loudness
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
-                        ON CONFLICT (track_id) DO NOTHING
-                    """,
-                        track_id, title, artist, album, genre, year, duration,
-                        tempo, energy, danceability, valence, acousticness,
-                        instrumentalness, liveness, speechiness, loudness
-                    )
-                    
-                    loaded_count += 1
-                    track_counter += 1
-                    
-                    if loaded_count % 500 == 0:
-                        print(f"  ✅ {loaded_count}/{target_count} tracks loaded...")
-                
-                except Exception as e:
-                    print(f"  ⚠️ Error loading track: {e}")
-                    continue
-            
-            total_count = await conn.fetchval("SELECT COUNT(*) FROM tracks")
+            total_count = await pool.fetchval("SELECT COUNT(*) FROM tracks")
             
             print(f"\n" + "="*50)
             print(f"✅ Loading complete!")
@@ -114,15 +244,81 @@ class MusicDatasetLoader:
             print(f"\n❌ Error: {e}")
             raise
         finally:
-            await conn.close()
+            await pool.close()
+    
+    def write_parquet(
+        self,
+        path: Path,
+        target_count: int,
+        chunk_size: int = SAMPLE_CHUNK_SIZE,
+        seed: int = 0,
+        first_number: int = 1
+    ) -> int:
+        """
+        Write a generated catalog straight to a Parquet file (tracks export
+        schema, one row group per chunk) without touching Postgres
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from .parquet_export import DATASETS
+        
+        _, schema, dictionary_columns = DATASETS["tracks"]
+        catalog = SyntheticCatalog(target_count, seed)
+        created_at = datetime.utcnow().replace(microsecond=0)
+        started = time.perf_counter()
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        written = 0
+        
+        with pq.ParquetWriter(temp_path, schema, compression="zstd") as writer:
+            for index, start in enumerate(range(0, target_count, chunk_size)):
+                tracks = catalog.generate(chunk_rng(seed, index), first_number + start, min(chunk_size, target_count - start))
+                tracks["created_at"] = created_at
+                tracks["updated_at"] = created_at
+                table = pa.Table.from_pandas(tracks, schema=schema, preserve_index=False)
+                writer.write_table(table)
+                written += len(tracks)
+                elapsed = time.perf_counter() - started
+                print(f"  ✅ {written}/{target_count} tracks, {written / elapsed:.0f} rows/s")
+        
+        temp_path.replace(path)
+        return written
 
 async def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog into PostgreSQL or a Parquet file")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=None, help="Default: random for a new job (0 for Parquet)")
+    parser.add_argument("--out", default=None, help="Write a .parquet file instead of loading PostgreSQL")
+    parser.add_argument("--chunk-size", type=int, default=SAMPLE_CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.LOADER_CONCURRENCY, help="Chunks loaded in parallel")
+    parser.add_argument("--restart", action="store_true", help="Start a new job even if one is unfinished")
+    args = parser.parse_args()
+    
     print("="*50)
     print("🎵 MUSIC DATASET LOADER")
     print("="*50)
     
     loader = MusicDatasetLoader()
-    await loader.load_sample_dataset(target_count=5000)
+    
+    if args.out:
+        started = time.perf_counter()
+        written = loader.write_parquet(Path(args.out), args.count, args.chunk_size, seed=args.seed or 0)
+        print(f"\n✅ Wrote {written} tracks to {args.out} in {time.perf_counter() - started:.1f}s")
+        return
+    
+    try:
+        await loader.load_sample_dataset(
+            target_count=args.count,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            restart=args.restart
+        )
+    except ValueError:
+        raise SystemExit(1)
     
     print("\n✅ All done! Tracks are ready in PostgreSQL.")
     print("💡 Run this script again to load more tracks.")
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 import asyncpg
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from .play_history_store import get_play_history_store
 
 class UserProfiler:
     """
@@ -29,9 +30,7 @@ class UserProfiler:
         print(f"🔄 Building profile for user: {user_id}")
         
         # Get user's listening history (last 100 plays)
-        plays = await db.play_history.find(
-            {"user_id": user_id}
-        ).sort("played_at", -1).limit(100).to_list(length=100)
+        plays = await get_play_history_store().recent_plays(user_id, db, limit=100)
         
         # Get user's likes
         likes = await db.likes.find(
@@ -223,7 +222,7 @@ class UserProfiler:
         # Get tracks to compare against
         # Exclude already played tracks if requested
         if exclude_played:
-            played_tracks = await db.play_history.distinct("track_id", {"user_id": user_id})
+            played_tracks = await get_play_history_store().played_track_ids(user_id, db)
             
             if played_tracks:
                 query = f"""
@@ -0,0 +1,225 @@
+"""
+In-process stand-ins for an asyncpg connection and a motor database,
+backed by synthetic data, so the engines run without Postgres or MongoDB
+Only the query shapes the engines issue are implemented; anything else
+raises NotImplementedError rather than returning wrong data
+"""
+
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from app.bulk_loader import TRACK_COLUMNS
+
+
+class FakeConnection:
+    """asyncpg.Connection stand-in over an in-memory tracks table"""
+
+    def __init__(self, tracks: pd.DataFrame, seed: int = 0):
+        tracks = tracks.copy()
+        if "has_audio_features" not in tracks.columns:
+            tracks["has_audio_features"] = True
+        if "created_at" not in tracks.columns:
+            tracks["created_at"] = pd.Timestamp("2024-01-01")
+        columns = TRACK_COLUMNS + ["has_audio_features", "created_at"]
+        if tracks[columns].isna().values.any():
+            # NULLs come back from asyncpg as None, not NaN
+            tracks = tracks.astype(object).where(tracks.notna(), None)
+        self.rows: List[Dict] = [
+            dict(zip(columns, values))
+            for values in zip(*(tracks[column].tolist() for column in columns))
+        ]
+        self.by_id = {row["track_id"]: row for row in self.rows}
+        self.random = random.Random(seed)
+        self.queries = 0
+
+    @staticmethod
+    def _columns(query: str) -> Optional[List[str]]:
+        match = re.search(r"SELECT\s+(.*?)\s+FROM\s+(\w+)", query, re.S | re.I)
+        if not match or match.group(1).strip() == "*":
+            return None
+        return [column.strip() for column in match.group(1).split(",")]
+
+    @staticmethod
+    def _project(row: Dict, columns: Optional[List[str]]) -> Dict:
+        return dict(row) if columns is None else {column: row[column] for column in columns}
+
+    async def fetchval(self, query: str, *args):
+        self.queries += 1
+        if "MAX(created_at)" in query:
+            return max(row["created_at"] for row in self.rows) if self.rows else None
+        if "information_schema.columns" in query:
+            return True
+        if "COUNT(*)" in query:
+            return len(self.rows)
+        raise NotImplementedError(query)
+
+    async def fetchrow(self, query: str, *args):
+        self.queries += 1
+        if "WHERE track_id = $1" in query:
+            row = self.by_id.get(args[0])
+            return self._project(row, self._columns(query)) if row else None
+        raise NotImplementedError(query)
+
+    async def fetch(self, query: str, *args) -> List[Dict]:
+        self.queries += 1
+        flat = " ".join(query.split())
+
+        if "ROW_NUMBER() OVER (PARTITION BY genre" in flat:
+            # Hybrid cold start: newest 5 per genre
+            excluded = set(args[0])
+            per_genre = defaultdict(list)
+            for row in sorted(self.rows, key=lambda r: (-(r["year"] or 0), r["track_id"])):
+                if row["genre"] is not None and row["track_id"] not in excluded and len(per_genre[row["genre"]]) < 5:
+                    per_genre[row["genre"]].append(row)
+            columns = self._columns("SELECT " + flat.split(") SELECT ", 1)[1])
+            ranked = [row for rows in per_genre.values() for row in rows]
+            return [self._project(row, columns) for row in ranked[:args[1]]]
+
+        columns = self._columns(flat)
+        if "WHERE tempo IS NOT NULL AND energy IS NOT NULL" in flat:
+            rows = sorted(
+                (row for row in self.rows if row["tempo"] is not None and row["energy"] is not None),
+                key=lambda r: r["track_id"]
+            )
+            return [self._project(row, columns) for row in rows]
+
+        if "WHERE tempo IS NULL OR energy IS NULL" in flat:
+            return [
+                self._project(row, columns) for row in sorted(self.rows, key=lambda r: r["track_id"])
+                if row["tempo"] is None or row["energy"] is None
+            ]
+
+        if "WHERE track_id = ANY($1)" in flat:
+            return [self._project(self.by_id[track_id], columns) for track_id in args[0] if track_id in self.by_id]
+
+        limit_match = re.search(r"LIMIT (\$\d|\d+)", flat)
+        if limit_match:
+            token = limit_match.group(1)
+            limit = args[int(token[1:]) - 1] if token.startswith("$") else int(token)
+            excluded = set(args[0]) if "!= ALL($1)" in flat else set()
+            if "ORDER BY RANDOM()" in flat:
+                picks = []
+                attempts = 0
+                while len(picks) < limit and attempts < limit * 20:
+                    row = self.rows[self.random.randrange(len(self.rows))]
+                    attempts += 1
+                    if row["track_id"] not in excluded:
+                        picks.append(row)
+                return [self._project(row, columns) for row in picks]
+            picks = []
+            for row in self.rows:
+                if row["track_id"] not in excluded:
+                    picks.append(row)
+                    if len(picks) >= limit:
+                        break
+            return [self._project(row, columns) for row in picks]
+
+        raise NotImplementedError(query)
+
+
+def _matches(document: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$gte" and not (value is not None and value >= operand):
+                    return False
+                elif operator == "$lt" and not (value is not None and value < operand):
+                    return False
+                elif operator not in ("$gte", "$lt"):
+                    raise NotImplementedError(operator)
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict]):
+        self.documents = documents
+        self._limit = None
+
+    def sort(self, key, direction: int = 1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda d: d.get(field), reverse=order < 0)
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        documents = self.documents[:self._limit] if self._limit else self.documents
+        if length is not None:
+            documents = documents[:length]
+        return [dict(document) for document in documents]
+
+    def __aiter__(self):
+        self._iter = iter(self.documents[:self._limit] if self._limit else self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._iter))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """motor collection stand-in, indexed by user_id"""
+
+    def __init__(self):
+        self.by_user: Dict[Any, List[Dict]] = defaultdict(list)
+
+    def _candidates(self, query: Dict) -> Iterable[Dict]:
+        if "user_id" in query and not isinstance(query["user_id"], dict):
+            return self.by_user.get(query["user_id"], [])
+        return (document for documents in self.by_user.values() for document in documents)
+
+    def _select(self, query: Optional[Dict]) -> List[Dict]:
+        query = query or {}
+        return [document for document in self._candidates(query) if _matches(document, query)]
+
+    async def insert_many(self, documents: List[Dict], ordered: bool = True):
+        for document in documents:
+            self.by_user[document.get("user_id")].append(document)
+
+    def find(self, query: Optional[Dict] = None) -> FakeCursor:
+        return FakeCursor(self._select(query))
+
+    async def find_one(self, query: Optional[Dict] = None) -> Optional[Dict]:
+        documents = self._select(query)
+        return dict(documents[0]) if documents else None
+
+    async def count_documents(self, query: Dict) -> int:
+        return len(self._select(query))
+
+    async def distinct(self, field: str, query: Optional[Dict] = None) -> List:
+        seen = {}
+        for document in self._select(query):
+            value = document.get(field)
+            for item in value if isinstance(value, list) else [value]:
+                seen[item] = None
+        return list(seen)
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        documents = self._select(query)
+        if documents:
+            documents[0].update(update.get("$set", {}))
+        elif upsert:
+            document = {**query, **update.get("$set", {})}
+            self.by_user[document.get("user_id")].append(document)
+
+
+class FakeDatabase(defaultdict):
+    """motor database stand-in: attribute or item access gives a FakeCollection"""
+
+    def __init__(self):
+        super().__init__(FakeCollection)
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        return self[name]
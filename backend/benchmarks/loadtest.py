@@ -0,0 +1,312 @@
+"""
+Concurrent load generator for the API
+
+    cd backend && python -m benchmarks.loadtest --users 50 --duration 60
+    python -m benchmarks.loadtest --in-process --synthetic-seed 42
+
+Each virtual user logs in, then loops: pick a scenario from the mix,
+run its requests, sleep an exponentially distributed think time.
+Reports per-endpoint p50/p95/p99 latency, throughput and error rate
+With --in-process the app runs inside this process over httpx's ASGI
+transport (its lifespan still connects to the configured databases)
+"""
+
+import asyncio
+import contextlib
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.activity_generator import SYNTHETIC_EMAIL_DOMAIN, SYNTHETIC_PASSWORD
+
+SCENARIOS = ["browse", "search", "play", "like", "hybrid"]
+DEFAULT_MIX = "browse=3,search=2,play=3,like=1,hybrid=1"
+LOADTEST_PASSWORD = "loadtest-password"
+SEARCH_FALLBACK_TERMS = ["love", "night", "blue", "dream", "fire", "rock", "the"]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'browse=3,play=1' -> scenario weights"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r} (expected one of {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadStats:
+    """Per-endpoint latencies, status codes and errors"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        self.latencies[endpoint].append(seconds)
+        if error:
+            self.errors[endpoint][error] += 1
+
+    def summary(self) -> Dict[str, Dict]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        summary = {}
+        for endpoint in sorted(self.latencies):
+            timings = np.array(self.latencies[endpoint]) * 1000
+            errors = sum(self.errors[endpoint].values())
+            p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+            summary[endpoint] = {
+                "requests": len(timings),
+                "throughput_rps": round(len(timings) / elapsed, 2),
+                "error_rate": round(errors / len(timings), 4),
+                "errors": dict(self.errors[endpoint]),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(timings.max()), 2),
+            }
+        return summary
+
+
+class VirtualUser:
+    """One logged-in client running scenarios in a loop"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: LoadStats, email: str, password: str,
+                 shared: Dict, rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self.shared = shared
+        self.rng = rng
+        self.user_id: Optional[str] = None
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, method: str, endpoint: str, url: str, expected: Tuple[int, ...] = (),
+                      **kwargs) -> Optional[httpx.Response]:
+        """
+        Timed request; `endpoint` is the route template the result is grouped under
+        Error statuses listed in `expected` are returned (and not counted as errors)
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(endpoint, time.perf_counter() - started, type(e).__name__)
+            return None
+        failed = response.status_code >= 400 and response.status_code not in expected
+        self.stats.record(endpoint, time.perf_counter() - started, str(response.status_code) if failed else None)
+        return None if failed else response
+
+    async def login(self, signup: bool) -> bool:
+        credentials = {"email": self.email, "password": self.password}
+        response = None
+        if signup:
+            # Sign up first; 400 "already registered" (an earlier run) means log in
+            username = self.email.split("@")[0]
+            response = await self.request(
+                "POST", "POST /auth/signup", "/auth/signup", expected=(400,),
+                json={**credentials, "username": username}
+            )
+            if response is not None and response.status_code == 400:
+                response = None
+        if response is None:
+            response = await self.request("POST", "POST /auth/login", "/auth/login", json=credentials)
+        if response is None:
+            return False
+
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        me = await self.request("GET", "GET /auth/me", "/auth/me")
+        self.user_id = me.json()["id"] if me is not None else None
+        return self.user_id is not None
+
+    def _track_id(self) -> Optional[str]:
+        tracks = self.shared["track_ids"]
+        return self.rng.choice(tracks) if tracks else None
+
+    def _remember(self, tracks: List[Dict]):
+        known = self.shared["track_ids"]
+        for track in tracks:
+            if len(known) >= 5000:
+                known[self.rng.randrange(len(known))] = track["track_id"]
+            else:
+                known.append(track["track_id"])
+
+    async def browse(self):
+        params = {"limit": 20}
+        genres = self.shared["genres"]
+        if genres and self.rng.random() < 0.5:
+            params["genre"] = self.rng.choice(genres)
+        response = await self.request("GET", "GET /music/tracks", "/music/tracks", params=params)
+        if response is None:
+            return
+        tracks = response.json()["tracks"]
+        self._remember(tracks)
+        if tracks:
+            track_id = self.rng.choice(tracks)["track_id"]
+            await self.request("GET", "GET /music/tracks/{track_id}", f"/music/tracks/{track_id}")
+
+    async def search(self):
+        titles = self.shared["titles"]
+        words = self.rng.choice(titles).split() if titles else []
+        query = self.rng.choice(words) if words else self.rng.choice(SEARCH_FALLBACK_TERMS)
+        response = await self.request("GET", "GET /music/search", "/music/search", params={"q": query, "limit": 20})
+        if response is not None:
+            self._remember(response.json()["results"])
+
+    async def play(self):
+        track_id = self._track_id()
+        if track_id is None:
+            return await self.browse()
+        duration = self.rng.uniform(10, 240)
+        await self.request("POST", "POST /music/play", "/music/play", json={
+            "user_id": self.user_id,
+            "track_id": track_id,
+            "duration_played": round(duration, 1),
+            "completed": duration > 180
+        })
+
+    async def like(self):
+        track_id = self._track_id()
+        if track_id is None:
+            return await self.browse()
+        await self.request("POST", "POST /music/like", "/music/like", json={
+            "user_id": self.user_id, "track_id": track_id
+        })
+
+    async def hybrid(self):
+        response = await self.request(
+            "GET", "GET /recommendations/hybrid", "/recommendations/hybrid", params={"limit": 20}
+        )
+        if response is not None:
+            self._remember(response.json()["recommendations"])
+
+    async def run(self, mix: Dict[str, float], think_time: float, deadline: float):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            await getattr(self, scenario)()
+            if think_time > 0:
+                await asyncio.sleep(min(self.rng.expovariate(1 / think_time), max(deadline - time.perf_counter(), 0)))
+
+
+async def bootstrap(user: VirtualUser):
+    """Seed the shared pools (genres, track ids, title words) the scenarios draw from"""
+    response = await user.request("GET", "GET /music/genres", "/music/genres")
+    if response is not None:
+        user.shared["genres"].extend(response.json()["genres"])
+    response = await user.request("GET", "GET /music/tracks", "/music/tracks", params={"limit": 200})
+    if response is not None:
+        tracks = response.json()["tracks"]
+        user.shared["titles"].extend(track["title"] for track in tracks if track.get("title"))
+        user._remember(tracks)
+
+
+def print_report(summary: Dict[str, Dict], elapsed: float):
+    total = sum(result["requests"] for result in summary.values())
+    errors = sum(result["error_rate"] * result["requests"] for result in summary.values())
+
+    print(f"\n📊 {total} requests in {elapsed:.1f}s: {total / max(elapsed, 1e-9):.1f} req/s, "
+          f"{errors / max(total, 1):.2%} errors")
+    print(f"{'endpoint':36} {'reqs':>7} {'req/s':>8} {'err%':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, result in summary.items():
+        print(f"{endpoint:36} {result['requests']:>7} {result['throughput_rps']:>8.1f} "
+              f"{result['error_rate']:>7.2%} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+              f"{result['p99_ms']:>7.1f}ms")
+        if result["errors"]:
+            print(f"{'':36} ⚠️  {result['errors']}")
+
+
+@contextlib.asynccontextmanager
+async def open_client(base_url: str, in_process: bool, users: int, timeout: float):
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    if not in_process:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    from app.main import app
+    # ASGITransport does not run the lifespan: start the app's pools ourselves
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            yield client
+
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent API load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process over ASGI")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load after ramp-up starts")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between scenarios (0 = none)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--synthetic-seed", type=int, default=None,
+                        help="Log in as activity_generator users synth-<seed>-* instead of signing up loadtest users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", default=None, help="Write the per-endpoint summary to this file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    stats = LoadStats()
+    shared = {"track_ids": [], "genres": [], "titles": []}
+
+    print("="*50)
+    print("🔥 LOAD TEST")
+    print("="*50)
+    print(f"👥 {args.users} users, {args.duration:.0f}s, think time {args.think_time}s, mix {mix}")
+
+    async with open_client(args.base_url, args.in_process, args.users, args.timeout) as client:
+        virtual_users = []
+        for n in range(args.users):
+            if args.synthetic_seed is not None:
+                email = f"synth-{args.synthetic_seed}-{n:07d}@{SYNTHETIC_EMAIL_DOMAIN}"
+                password = SYNTHETIC_PASSWORD
+            else:
+                email = f"loadtest-{n:05d}@loadtest.example.com"
+                password = LOADTEST_PASSWORD
+            virtual_users.append(
+                VirtualUser(client, stats, email, password, shared, random.Random(args.seed * 100003 + n))
+            )
+
+        if not await virtual_users[0].login(signup=args.synthetic_seed is None):
+            raise SystemExit(f"❌ Could not log in as {virtual_users[0].email}")
+        await bootstrap(virtual_users[0])
+        print(f"🎵 Seeded {len(shared['track_ids'])} track ids, {len(shared['genres'])} genres")
+
+        stats.started = time.perf_counter()
+        deadline = stats.started + args.duration
+
+        async def start(n: int, user: VirtualUser):
+            await asyncio.sleep(args.ramp_up * n / max(args.users, 1))
+            if user.user_id is None and not await user.login(signup=args.synthetic_seed is None):
+                print(f"⚠️ Login failed for {user.email}")
+                return
+            await user.run(mix, args.think_time, deadline)
+
+        await asyncio.gather(*(start(n, user) for n, user in enumerate(virtual_users)))
+        stats.finished = time.perf_counter()
+
+    summary = stats.summary()
+    print_report(summary, stats.finished - stats.started)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": summary}, f, indent=2)
+        print(f"💾 Summary written to {args.json}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,279 @@
+"""
+Offline micro-benchmarks for the recommendation engines
+
+    cd backend && python -m benchmarks.run --sizes 10000 100000 1000000
+
+Each engine runs against in-process asyncpg/motor stand-ins (benchmarks.fakes)
+filled with a synthetic catalog and synthetic activity. Per public method
+it records load time, per-call latency (min/median/p95), retained memory
+and blocks, and peak traced memory, writes the results to benchmarks/results/ keyed by
+commit, and compares them with the previous run
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app import play_history_store
+from app.activity_generator import ActivityGenerator, ActivityProfile
+from app.hybrid_recommender import HybridRecommender
+from app.play_history_store import DOCUMENTS, PlayHistoryStore
+from app.recommender import ContentBasedRecommender
+from app.spotify_loader import SyntheticCatalog, chunk_rng
+from app.user_profiler import UserProfiler
+from benchmarks.fakes import FakeConnection, FakeDatabase
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_SIZES = [10000, 100000]
+
+Call = Callable[[], Awaitable]
+
+
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the engines' progress prints while measuring"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+async def measure_allocations(call: Call) -> Dict[str, float]:
+    """One traced call: memory and allocated blocks still held afterwards, peak traced memory"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        with quiet():
+            await call()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    return {
+        "retained_kb": round(sum(stat.size_diff for stat in stats if stat.size_diff > 0) / 1024, 1),
+        "retained_blocks": sum(stat.count_diff for stat in stats if stat.count_diff > 0),
+        "peak_traced_kb": round(peak / 1024, 1),
+    }
+
+
+async def measure_latency(call: Call, min_time: float, max_repeats: int) -> Dict[str, float]:
+    """Warm up once, then repeat for at least min_time seconds (capped at max_repeats)"""
+    timings: List[float] = []
+    with quiet():
+        await call()
+        started = time.perf_counter()
+        while len(timings) < max_repeats and (len(timings) < 3 or time.perf_counter() - started < min_time):
+            t0 = time.perf_counter()
+            await call()
+            timings.append(time.perf_counter() - t0)
+
+    timings.sort()
+    return {
+        "repeats": len(timings),
+        "min_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+    }
+
+
+async def build_fixture(size: int, users: int, seed: int):
+    """Catalog of `size` tracks plus activity for `users` users in the stand-ins"""
+
+    # The stand-ins model one document per play: generate and read in that
+    # mode whatever PLAY_HISTORY_STORAGE says
+    play_history_store._store_instance = PlayHistoryStore(DOCUMENTS)
+
+    catalog = SyntheticCatalog(size, seed).generate(chunk_rng(seed, 0), 1, size)
+    conn = FakeConnection(catalog, seed=seed)
+    db = FakeDatabase()
+
+    generator = ActivityGenerator(catalog, ActivityProfile(plays_per_user=150), seed=seed, storage=DOCUMENTS)
+    with quiet():
+        await generator.run(db, users, batch_users=max(1, users // 4))
+
+    # One user per hybrid strategy: no plays, 3-9 plays, the heaviest user
+    plays_by_user = {user_id: len(plays) for user_id, plays in db.play_history.by_user.items()}
+    heavy = max(plays_by_user, key=plays_by_user.get)
+    warm = next((user for user, count in plays_by_user.items() if 3 <= count < 10), None)
+    if warm is None:
+        warm = "bench-warm-user"
+        await db.play_history.insert_many([
+            dict(play, user_id=warm) for play in db.play_history.by_user[heavy][:5]
+        ])
+    return catalog, conn, db, {"cold": "bench-cold-user", "warm": warm, "heavy": heavy}
+
+
+async def run_size(size: int, args) -> Dict[str, Dict]:
+    print(f"\n📦 {size} tracks: building fixture...")
+    catalog, conn, db, users = await build_fixture(size, args.users, args.seed)
+    rng = np.random.default_rng(args.seed)
+    track_ids = catalog["track_id"].to_numpy()
+
+    recommender = ContentBasedRecommender()
+    profiler = UserProfiler()
+    hybrid = HybridRecommender()
+    hybrid.content_recommender = recommender
+    hybrid.user_profiler = profiler
+
+    results: Dict[str, Dict] = {}
+
+    # Load: a fresh recommender each time, so every call does the full load
+    async def load():
+        fresh = ContentBasedRecommender()
+        await fresh.load_all_tracks(conn)
+        await fresh._search_index_build
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["ContentBasedRecommender.load_all_tracks"] = {
+        **await measure_latency(load, min_time=0, max_repeats=args.load_repeats),
+        **await measure_allocations(load),
+    }
+    results["ContentBasedRecommender.load_all_tracks"]["max_rss_growth_mb"] = round(
+        (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1
+    )
+
+    with quiet():
+        await recommender.load_all_tracks(conn)
+        await recommender._search_index_build
+
+    def seed_track() -> str:
+        return str(track_ids[rng.integers(len(track_ids))])
+
+    calls: Dict[str, Call] = {
+        "ContentBasedRecommender.get_similar_tracks":
+            lambda: recommender.get_similar_tracks(seed_track(), conn, limit=20),
+        "ContentBasedRecommender.get_recommendations_by_genre":
+            lambda: recommender.get_recommendations_by_genre("Rock", conn, limit=20),
+        "ContentBasedRecommender.get_recommendations_by_features":
+            lambda: recommender.get_recommendations_by_features({"energy": 0.8, "danceability": 0.7, "tempo": 125}, conn, limit=20),
+        "ContentBasedRecommender.get_popular_tracks":
+            lambda: recommender.get_popular_tracks(conn, limit=50),
+        "ContentBasedRecommender.get_diverse_recommendations":
+            lambda: recommender.get_diverse_recommendations([seed_track() for _ in range(5)], conn, limit=20),
+        "UserProfiler.build_user_vector":
+            lambda: profiler.build_user_vector(users["heavy"], db, conn),
+        "UserProfiler.get_user_vector":
+            lambda: profiler.get_user_vector(users["heavy"], db),
+        "UserProfiler.get_personalized_recommendations":
+            lambda: profiler.get_personalized_recommendations(users["heavy"], db, conn, limit=20),
+        "HybridRecommender.get_hybrid_recommendations[cold]":
+            lambda: hybrid.get_hybrid_recommendations(users["cold"], db, conn, limit=20),
+        "HybridRecommender.get_hybrid_recommendations[warm]":
+            lambda: hybrid.get_hybrid_recommendations(users["warm"], db, conn, limit=20),
+        "HybridRecommender.get_hybrid_recommendations[heavy]":
+            lambda: hybrid.get_hybrid_recommendations(users["heavy"], db, conn, limit=20),
+    }
+
+    for name, call in calls.items():
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        results[name] = {
+            **await measure_latency(call, args.min_time, args.max_repeats),
+            **await measure_allocations(call),
+        }
+        print(f"  ⏱️  {name}: median {results[name]['median_ms']} ms, p95 {results[name]['p95_ms']} ms, "
+              f"{results[name]['retained_kb']} KB retained")
+
+    load_result = results["ContentBasedRecommender.load_all_tracks"]
+    print(f"  ⏱️  ContentBasedRecommender.load_all_tracks: median {load_result['median_ms']} ms, "
+          f"peak traced {load_result['peak_traced_kb'] / 1024:.1f} MB")
+    return results
+
+
+def latest_result(exclude: Optional[Path] = None) -> Optional[Path]:
+    files = sorted(RESULTS_DIR.glob("*.json"))
+    files = [path for path in files if path != exclude]
+    return files[-1] if files else None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print median-latency changes; returns the benchmarks that regressed"""
+
+    regressions = []
+    print(f"\n📊 Compared with {baseline['commit']} ({baseline['timestamp']}):")
+    for key, result in current["results"].items():
+        before = baseline["results"].get(key)
+        if not before or not before.get("median_ms"):
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"]
+        marker = "⚠️ " if change > threshold else ("✅" if change < -threshold else "  ")
+        print(f"  {marker} {key}: {before['median_ms']} -> {result['median_ms']} ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline recommender benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes (e.g. 10000 100000 1000000)")
+    parser.add_argument("--users", type=int, default=200, help="Synthetic users with activity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds spent repeating each call")
+    parser.add_argument("--max-repeats", type=int, default=200)
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=None, help="Run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=None, help="Results file to compare with (default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Median slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    print("="*50)
+    print("⏱️  RECOMMENDER BENCHMARKS")
+    print("="*50)
+
+    current = {
+        "commit": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "results": {},
+    }
+
+    for size in args.sizes:
+        for name, result in (await run_size(size, args)).items():
+            current["results"][f"{size}/{name}"] = result
+
+    saved = None
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        saved = RESULTS_DIR / f"{current['timestamp'].replace(':', '')}_{current['commit']}.json"
+        with open(saved, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\n💾 Results written to {saved}")
+
+    baseline_path = Path(args.baseline) if args.baseline else latest_result(exclude=saved)
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"❌ {len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
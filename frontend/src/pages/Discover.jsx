@@ -5,7 +5,7 @@ import { musicAPI } from '../services/api';
 import TrackCard from '../components/TrackCard';
 
 const Discover = () => {
-    const { tracks, loading, fetchTracks } = useMusicStore();
+    const { tracks, loading, fetchTracks, fetchMoreTracks, nextCursor } = useMusicStore();
     const [genres, setGenres] = useState([]);
     const [selectedGenre, setSelectedGenre] = useState('');
     const [searchQuery, setSearchQuery] = useState('');
@@ -108,6 +108,16 @@ const Discover = () => {
                                 <TrackCard key={track.track_id} track={track} />
                             ))}
                         </div>
+                        {nextCursor && (
+                            <div className="flex justify-center mt-8">
+                                <button
+                                    onClick={fetchMoreTracks}
+                                    className="px-6 py-3 bg-dark-card rounded-lg text-white border border-dark-lighter hover:border-primary transition-smooth"
+                                >
+                                    Load more
+                                </button>
+                            </div>
+                        )}
                     </>
                 )}
             </div>
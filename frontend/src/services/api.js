@@ -44,12 +44,15 @@ export const authAPI = {
 export const musicAPI = {
     getTracks: (params) => api.get('/music/tracks', { params }),
     getTrack: (trackId) => api.get(`/music/tracks/${trackId}`),
+    getTracksBatch: (trackIds) => api.post('/music/tracks/batch', { track_ids: trackIds }),
     getGenres: () => api.get('/music/genres'),
     search: (query) => api.get('/music/search', { params: { q: query } }),
+    suggest: (query, limit = 8) => api.get('/music/search/suggest', { params: { q: query, limit } }),
     logPlay: (data) => api.post('/music/play', data),
     logLike: (data) => api.post('/music/like', data),
     logSkip: (data) => api.post('/music/skip', data),
-    getHistory: (limit = 50) => api.get('/music/history', { params: { limit } }),
+    getHistory: (limit = 50, cursor, hydrate = true) =>
+        api.get('/music/history', { params: { limit, cursor, hydrate } }),
 };
 
 // Recommendation API
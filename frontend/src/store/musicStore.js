@@ -4,6 +4,8 @@ import toast from 'react-hot-toast';
 
 const useMusicStore = create((set, get) => ({
     tracks: [],
+    tracksQuery: {},
+    nextCursor: null,
     currentTrack: null,
     recommendations: [],
     loading: false,
@@ -13,13 +15,33 @@ const useMusicStore = create((set, get) => ({
         set({ loading: true, error: null });
         try {
             const response = await musicAPI.getTracks(params);
-            set({ tracks: response.data.tracks, loading: false });
+            set({
+                tracks: response.data.tracks,
+                tracksQuery: params,
+                nextCursor: response.data.next_cursor,
+                loading: false
+            });
         } catch (error) {
             set({ error: error.message, loading: false });
             toast.error('Failed to load tracks');
         }
     },
 
+    fetchMoreTracks: async () => {
+        const { nextCursor, tracksQuery } = get();
+        if (!nextCursor) return;
+
+        try {
+            const response = await musicAPI.getTracks({ ...tracksQuery, cursor: nextCursor });
+            set((state) => ({
+                tracks: [...state.tracks, ...response.data.tracks],
+                nextCursor: response.data.next_cursor
+            }));
+        } catch (error) {
+            toast.error('Failed to load more tracks');
+        }
+    },
+
     fetchRecommendations: async (type = 'hybrid', params = {}) => {
         set({ loading: true, error: null });
         try {
@@ -42,8 +64,14 @@ const useMusicStore = create((set, get) => ({
                     response = await recommendationAPI.getHybrid(params.limit);
             }
 
+            // Tag each track with the impression it was served in, so
+            // plays/likes/skips can be attributed to the algorithm
+            const impressionId = response.data.impression_id;
             set({
-                recommendations: response.data.recommendations,
+                recommendations: response.data.recommendations.map((track) => ({
+                    ...track,
+                    impression_id: impressionId,
+                })),
                 loading: false
             });
         } catch (error) {
@@ -52,6 +80,9 @@ const useMusicStore = create((set, get) => ({
         }
     },
 
+    impressionFor: (trackId) =>
+        get().recommendations.find((track) => track.track_id === trackId)?.impression_id,
+
     playTrack: async (track) => {
         set({ currentTrack: track });
 
@@ -62,6 +93,7 @@ const useMusicStore = create((set, get) => ({
                 track_id: track.track_id,
                 duration_played: 0,
                 completed: false,
+                impression_id: track.impression_id || get().impressionFor(track.track_id),
             });
         } catch (error) {
             console.error('Failed to log play:', error);
@@ -73,6 +105,7 @@ const useMusicStore = create((set, get) => ({
             await musicAPI.logLike({
                 user_id: 'frontend',
                 track_id: trackId,
+                impression_id: get().impressionFor(trackId),
             });
             toast.success('Added to liked songs ❤️');
         } catch (error) {
@@ -86,6 +119,7 @@ const useMusicStore = create((set, get) => ({
                 user_id: 'frontend',
                 track_id: trackId,
                 position: position,
+                impression_id: get().impressionFor(trackId),
             });
         } catch (error) {
             console.error('Failed to log skip:', error);